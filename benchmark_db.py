@@ -0,0 +1,130 @@
+import sys
+import os
+import datetime
+import tempfile
+import time
+import tracemalloc
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from src.db_manager import DBManager
+from src.models import Schedule
+
+START_DATE = datetime.date(2026, 1, 5) # Monday
+ROW_COUNTS = [730, 7300, 36500]
+PROFILE_EDITS = 200
+READ_ROWS = 100000
+
+
+def make_schedules(users, count):
+    """2 people per day, walking the user list."""
+    schedules = []
+    for i in range(count):
+        d = START_DATE + datetime.timedelta(days=i // 2)
+        user = users[(i // 2 + i % 2) % len(users)]
+        schedules.append(Schedule(date=d, user_id=user.id, is_locked=False))
+    return schedules
+
+
+def save_schedules_loop(db, schedules):
+    """Previous implementation: one SELECT per schedule before insert/update."""
+    with db.session_scope() as session:
+        for sch in schedules:
+            existing = session.query(Schedule).filter_by(date=sch.date, user_id=sch.user_id).first()
+            if not existing:
+                session.add(Schedule(date=sch.date, user_id=sch.user_id, is_locked=sch.is_locked))
+            else:
+                existing.is_locked = sch.is_locked
+
+
+def timed(func, *args):
+    t0 = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - t0
+
+
+def drag_drop_edits(db, users, edits):
+    """One committed add + delete per edit, like dragging a person onto a day and back."""
+    for i in range(edits):
+        d = START_DATE + datetime.timedelta(days=i % 365)
+        db.add_schedule(d, users[-1].id, is_locked=True)
+        db.delete_schedule(d, users[-1].id)
+
+
+def run_profile_benchmark():
+    print(f"{'profile':>12} {'drag-drop edit (ms)':>20} {'year plan save (ms)':>20} {'re-plan save (ms)':>18}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for profile in DBManager.PROFILES:
+            db = DBManager(os.path.join(tmp, f"{profile}.db"), profile=profile)
+            db.init_default_users()
+            users = db.get_all_users()
+            plan = make_schedules(users, 730)
+            replan = make_schedules(list(reversed(users)), 730)
+
+            edit_time = timed(drag_drop_edits, db, users, PROFILE_EDITS) / PROFILE_EDITS
+            save_time = timed(db.replace_schedules, plan)
+            replan_time = timed(db.replace_schedules, replan)
+            print(f"{profile:>12} {edit_time * 1000:>20.2f} {save_time * 1000:>20.2f} {replan_time * 1000:>18.2f}")
+            db.engine.dispose()
+
+
+def measured(func, *args):
+    """(seconds, peak traced MB); timed and traced in separate calls since tracing slows allocation down."""
+    elapsed = timed(func, *args)
+    tracemalloc.start()
+    result = func(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del result
+    return elapsed, peak / (1024 * 1024)
+
+
+def run_read_benchmark():
+    print(f"{'read path':>24} {'time (s)':>9} {'peak (MB)':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DBManager(os.path.join(tmp, "read.db"))
+        db.init_default_users()
+        users = db.get_all_users()
+        db.save_schedules(make_schedules(users, READ_ROWS))
+        user_map = {u.id: u for u in users}
+
+        paths = [
+            ("ORM get_all_schedules", db.get_all_schedules),
+            ("get_schedule_records", lambda: db.get_schedule_records(None, None, user_map)),
+            ("get_schedule_array", db.get_schedule_array),
+        ]
+        for label, func in paths:
+            elapsed, peak = measured(func)
+            print(f"{label:>24} {elapsed:>9.3f} {peak:>10.1f}")
+        db.engine.dispose()
+
+
+def run_benchmark():
+    print(f"{'rows':>7} {'loop (s)':>10} {'upsert (s)':>11} {'re-save loop':>13} {'re-save upsert':>15}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in ROW_COUNTS:
+            loop_db = DBManager(os.path.join(tmp, f"loop_{count}.db"))
+            bulk_db = DBManager(os.path.join(tmp, f"bulk_{count}.db"))
+            loop_db.init_default_users()
+            bulk_db.init_default_users()
+            users = loop_db.get_all_users()
+            schedules = make_schedules(users, count)
+
+            # First save inserts everything, the second one hits every conflict
+            loop_insert = timed(save_schedules_loop, loop_db, schedules)
+            bulk_insert = timed(bulk_db.save_schedules, schedules)
+            loop_update = timed(save_schedules_loop, loop_db, schedules)
+            bulk_update = timed(bulk_db.save_schedules, schedules)
+            print(f"{count:>7} {loop_insert:>10.3f} {bulk_insert:>11.3f} {loop_update:>13.3f} {bulk_update:>15.3f}")
+            loop_db.engine.dispose()
+            bulk_db.engine.dispose()
+
+    print()
+    run_profile_benchmark()
+    print()
+    run_read_benchmark()
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,137 @@
+import sys
+import os
+import datetime
+import time
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from src.models import User
+from src.scheduler import Scheduler, VectorizedScheduler
+from src.balanced_scheduler import BalancedScheduler
+from src.probabilistic_scheduler import ProbabilisticScheduler
+
+START_DATE = datetime.date(2026, 1, 5) # Monday
+YEARS = [1, 10, 50]
+USER_COUNTS = [40, 1000]
+BALANCED_USER_COUNTS = [40, 300, 1000]
+MONTE_CARLO_PLANS = 2000
+
+
+def make_users(count):
+    users = []
+    for i in range(count):
+        code = f"U{i:04d}"
+        users.append(User(id=i + 1, code=code, name=code, preferences={}))
+    return users
+
+
+def make_rules(users):
+    codes = [u.code for u in users]
+    return {
+        "days": {
+            "0": {"type": "fixed", "users": [codes[0]]},
+            "1": {"type": "fixed", "users": [codes[2]]},
+            "2": {"type": "fixed", "users": [codes[1]]},
+            "3": {"type": "fixed", "users": [codes[2]]},
+            "4": {"type": "rotation", "users": [codes[0], codes[1]]},
+            "5": {"type": "loop", "users": []},
+            "6": {"type": "follow_saturday", "users": []}
+        },
+        "loop_pool": codes[3:],
+        "rotation_start_date": "2026-01-09",
+        "loop_start_date": "2026-01-05"
+    }
+
+
+def run_weekly(users, rules, weeks):
+    """Baseline: one Scheduler and generate_schedule call per Monday."""
+    loop_index = 0
+    total = 0
+    for w in range(weeks):
+        monday = START_DATE + datetime.timedelta(weeks=w)
+        scheduler = Scheduler(users, monday, loop_index=loop_index, rules=rules)
+        total += len(scheduler.generate_schedule([]))
+        loop_index = scheduler.new_loop_index
+    return total
+
+
+def run_vectorized(users, rules, weeks):
+    scheduler = VectorizedScheduler(users, START_DATE, rules=rules)
+    end = START_DATE + datetime.timedelta(weeks=weeks, days=-1)
+    matrix = scheduler.generate_matrix(START_DATE, end)
+    return int((matrix >= 0).sum())
+
+
+def run_balanced(users, rules, weeks):
+    history_counts = {u.code: i % 17 for i, u in enumerate(users)}
+    weekend_history_counts = {u.code: i % 5 for i, u in enumerate(users)}
+    scheduler = BalancedScheduler(users, START_DATE, rules=rules, history_counts=history_counts,
+                                  weekend_history_counts=weekend_history_counts)
+    end = START_DATE + datetime.timedelta(weeks=weeks, days=-1)
+    return len(scheduler.generate_range(START_DATE, end))
+
+
+def run_monte_carlo(users, rules, weeks, n_plans):
+    scheduler = ProbabilisticScheduler(users, START_DATE, rules=rules, seed=0)
+    end = START_DATE + datetime.timedelta(weeks=weeks, days=-1)
+    return scheduler.sample_plans(START_DATE, end, n_plans).shape[0]
+
+
+def run_fairness_scoring(users, rules, weeks, n_plans):
+    """Time only the fairness scoring of a batch of sampled plans."""
+    scheduler = ProbabilisticScheduler(users, START_DATE, rules=rules, seed=0)
+    end = START_DATE + datetime.timedelta(weeks=weeks, days=-1)
+    plans = scheduler.sample_plans(START_DATE, end, n_plans)
+    _, score_time = timed(scheduler.score_plans, plans)
+    return score_time
+
+
+def timed(func, *args):
+    t0 = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - t0
+
+
+def run_benchmark():
+    print(f"{'users':>6} {'years':>6} {'weekly (s)':>12} {'vectorized (s)':>15} {'speedup':>9}")
+    for count in USER_COUNTS:
+        users = make_users(count)
+        rules = make_rules(users)
+        for years in YEARS:
+            weeks = years * 52
+            weekly_total, weekly_time = timed(run_weekly, users, rules, weeks)
+            vector_total, vector_time = timed(run_vectorized, users, rules, weeks)
+            assert weekly_total == vector_total, "Engines produced different slot counts"
+            print(f"{count:>6} {years:>6} {weekly_time:>12.4f} {vector_time:>15.4f} {weekly_time / vector_time:>8.1f}x")
+
+    # Balanced mode solves one min-cost flow per week, so it is run on a one-year horizon
+    print()
+    print(f"{'users':>6} {'years':>6} {'balanced (s)':>13}")
+    for count in BALANCED_USER_COUNTS:
+        users = make_users(count)
+        rules = make_rules(users)
+        _, balanced_time = timed(run_balanced, users, rules, 52)
+        print(f"{count:>6} {1:>6} {balanced_time:>13.4f}")
+
+    # Probabilistic mode: independent one-year plans drawn in one batch
+    print()
+    print(f"{'users':>6} {'plans':>6} {'sampling (s)':>13} {'plans/s':>9}")
+    for count in BALANCED_USER_COUNTS:
+        users = make_users(count)
+        rules = make_rules(users)
+        n_plans, mc_time = timed(run_monte_carlo, users, rules, 52, MONTE_CARLO_PLANS)
+        print(f"{count:>6} {n_plans:>6} {mc_time:>13.4f} {n_plans / mc_time:>9.0f}")
+
+    # Fairness objective over the sampled one-year plans
+    print()
+    print(f"{'users':>6} {'plans':>6} {'scoring (s)':>12} {'us/plan':>8}")
+    for count in BALANCED_USER_COUNTS:
+        users = make_users(count)
+        rules = make_rules(users)
+        score_time = run_fairness_scoring(users, rules, 52, MONTE_CARLO_PLANS)
+        print(f"{count:>6} {MONTE_CARLO_PLANS:>6} {score_time:>12.4f} {score_time / MONTE_CARLO_PLANS * 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
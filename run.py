@@ -1,5 +1,6 @@
 import sys
 import os
+import multiprocessing
 
 # 解决 Windows 下控制台输出乱码问题
 if sys.platform.startswith('win'):
@@ -25,6 +26,9 @@ from PyQt5.QtCore import Qt
 install_debugger()
 
 if __name__ == "__main__":
+    # Required for multi-process scheduling in frozen (PyInstaller) builds
+    multiprocessing.freeze_support()
+
     # Fix for Qt platform plugin "windows" not found
     dirname = os.path.dirname(PyQt5.__file__)
     plugin_path = os.path.join(dirname, 'Qt5', 'plugins')
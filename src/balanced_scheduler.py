@@ -0,0 +1,269 @@
+import datetime
+import numpy as np
+from typing import List, Dict, Any
+from src.models import User, Schedule
+from src.scheduler import Scheduler
+from src.rules_manager import CompiledRules
+from src.consts import MAX_SHIFTS_PER_WEEK
+
+
+def min_cost_assignment(cost: np.ndarray, eligible: np.ndarray,
+                        demand: np.ndarray, unit_cost: np.ndarray) -> np.ndarray:
+    """
+    Min-cost flow between users and days, solved by successive shortest paths.
+
+    cost:      (users x days) cost of placing a user on a day
+    eligible:  (users x days) bool, user may take a slot on that day
+    demand:    (days,) number of slots to fill per day
+    unit_cost: (users x k) marginal cost of a user's 1st..k-th slot, non-decreasing;
+               np.inf marks the user's capacity
+
+    Each user takes at most one slot per day. Shortest paths are found with a
+    Bellman-Ford relaxation over whole NumPy matrices (forward edges user->day,
+    residual edges day->user for slots already taken), so every augmentation
+    costs a handful of (users x days) array operations.
+    Returns a (users x days) bool assignment; days that cannot be reached stay short.
+    """
+    n_users, n_days = cost.shape
+    assigned = np.zeros((n_users, n_days), dtype=bool)
+    if n_users == 0:
+        return assigned
+
+    units = np.zeros(n_users, dtype=np.int64)
+    remaining = np.asarray(demand, dtype=np.int64).copy()
+    max_units = unit_cost.shape[1]
+    user_range = np.arange(n_users)
+    day_range = np.arange(n_days)
+    edge_cost = np.where(eligible, cost, np.inf)
+
+    while remaining.any():
+        capped = units >= max_units
+        dist_u = np.where(capped, np.inf, unit_cost[user_range, np.minimum(units, max_units - 1)])
+        pred_u = np.full(n_users, -1, dtype=np.int64)  # -1: reached from the source
+        dist_d = np.full(n_days, np.inf)
+        pred_d = np.full(n_days, -1, dtype=np.int64)
+
+        for _ in range(2 * n_days + 2):
+            forward = np.where(assigned, np.inf, dist_u[:, None] + edge_cost)
+            best_u = forward.argmin(axis=0)
+            cand_d = forward[best_u, day_range]
+            better_d = cand_d < dist_d - 1e-9
+            dist_d[better_d] = cand_d[better_d]
+            pred_d[better_d] = best_u[better_d]
+
+            backward = np.where(assigned, dist_d[None, :] - cost, np.inf)
+            best_d = backward.argmin(axis=1)
+            cand_u = backward[user_range, best_d]
+            better_u = cand_u < dist_u - 1e-9
+            dist_u[better_u] = cand_u[better_u]
+            pred_u[better_u] = best_d[better_u]
+
+            if not better_d.any() and not better_u.any():
+                break
+
+        target = np.where(remaining > 0, dist_d, np.inf)
+        day = int(target.argmin())
+        if not np.isfinite(target[day]):
+            break
+        remaining[day] -= 1
+
+        # Walk the augmenting path back to the source, flipping edges on the way
+        while True:
+            user = int(pred_d[day])
+            assigned[user, day] = True
+            prev_day = int(pred_u[user])
+            if prev_day < 0:
+                units[user] += 1
+                break
+            assigned[user, prev_day] = False
+            day = prev_day
+
+    return assigned
+
+
+class BalancedScheduler(Scheduler):
+    """
+    Fairness-driven fill mode.
+
+    Locked slots and fixed/rotation rules are applied as usual. The loop slots of
+    each week (Monday-Saturday; Sunday still copies Saturday) are then assigned to
+    loop pool users by a min-cost flow instead of the pool cursor. Costs come from:
+      - cumulative duty count (history_counts + shifts given so far in the range),
+        charged per slot with rising marginal cost so a week is spread out
+      - weekend duty count (weekend_history_counts) on Saturday slots
+      - a rest penalty when the day is less than REST_DAYS after the last duty
+    Shifts beyond max_shifts_per_week are allowed only at OVER_CAP_PENALTY.
+    Ties are broken in loop pool order starting at the cursor, so with no history
+    the pool is walked in its configured order.
+    """
+    TOTAL_WEIGHT = 1.0
+    WEEKEND_WEIGHT = 1.0
+    REST_WEIGHT = 0.5
+    REST_DAYS = 7
+    OVER_CAP_PENALTY = 1000.0
+    TIE_BREAK = 1e-3
+
+    def __init__(self, users: List[User], start_date: datetime.date,
+                 loop_index: int = 0, rules: Dict[str, Any] = None,
+                 compiled_rules: CompiledRules = None,
+                 history_counts: Dict[str, int] = None,
+                 weekend_history_counts: Dict[str, int] = None,
+                 last_duty_dates: Dict[str, datetime.date] = None,
+                 max_shifts_per_week: int = MAX_SHIFTS_PER_WEEK):
+        super().__init__(users, start_date, loop_index=loop_index, rules=rules,
+                         compiled_rules=compiled_rules)
+        self.max_shifts_per_week = max_shifts_per_week
+        self.warnings = []
+
+        # A user listed twice in the pool is still one flow node
+        self.pool = tuple(dict.fromkeys(self.compiled.loop_pool))
+        self.pool_pos = {id(u): i for i, u in enumerate(self.pool)}
+        history_counts = history_counts or {}
+        weekend_history_counts = weekend_history_counts or {}
+        last_duty_dates = last_duty_dates or {}
+
+        # Running state per pool user, advanced week by week
+        self.total_counts = np.array([history_counts.get(u.code, 0) for u in self.pool], dtype=np.float64)
+        self.weekend_counts = np.array([weekend_history_counts.get(u.code, 0) for u in self.pool], dtype=np.float64)
+        self.last_duty = np.array([self._to_ordinal(last_duty_dates.get(u.code)) for u in self.pool],
+                                  dtype=np.float64)
+
+    @staticmethod
+    def _to_ordinal(value) -> float:
+        if isinstance(value, datetime.datetime):
+            value = value.date()
+        if isinstance(value, datetime.date):
+            return float(value.toordinal())
+        if isinstance(value, str):
+            try:
+                return float(datetime.date.fromisoformat(value[:10]).toordinal())
+            except ValueError:
+                pass
+        return -np.inf
+
+    def generate_range(self, start: datetime.date, end: datetime.date,
+                       existing_schedules: List[Schedule] = None, mode: str = "all") -> List[Schedule]:
+        """
+        Generate every week touching [start, end]. Weeks depend on the counts
+        accumulated by earlier weeks, so they are filled one after another.
+        """
+        self.warnings = []
+        result_schedules = []
+        week_start = start - datetime.timedelta(days=start.weekday())
+        if week_start > end:
+            return result_schedules
+
+        range_end = end + datetime.timedelta(days=7 - end.weekday())
+        locked_slots = self._bucket_locked_slots(existing_schedules, week_start, range_end)
+        self.new_loop_index = self._calculate_anchor_loop_index(week_start)
+        is_odd_week_human = self._is_odd_rotation_week(week_start)
+
+        while week_start <= end:
+            result_schedules.extend(self._fill_week(week_start, locked_slots, is_odd_week_human))
+            is_odd_week_human = not is_odd_week_human
+            week_start += datetime.timedelta(days=7)
+
+        self.last_error = "\n".join(self.warnings) if self.warnings else None
+        return result_schedules
+
+    def _fill_week(self, week_start: datetime.date, locked_slots: Dict[datetime.date, List[str]],
+                   is_odd_week_human: bool) -> List[Schedule]:
+        target_count = CompiledRules.TARGET_COUNT
+        daily_assignments = {}
+        demand = np.zeros(6, dtype=np.int64)
+
+        # 1. Locked slots and fixed/rotation rules, Monday-Saturday
+        for day_idx in range(6):
+            current_date = week_start + datetime.timedelta(days=day_idx)
+            assigned_users = self._locked_users(locked_slots, current_date)
+            if len(assigned_users) < target_count:
+                rule_type, rule_users = self.compiled.days[day_idx]
+                if rule_type == "fixed":
+                    for user in rule_users:
+                        if len(assigned_users) >= target_count: break
+                        if user not in assigned_users:
+                            assigned_users.append(user)
+                elif rule_type == "rotation":
+                    user = rule_users[0] if is_odd_week_human else rule_users[1]
+                    if user and user not in assigned_users:
+                        assigned_users.append(user)
+                if self.pool:
+                    demand[day_idx] = target_count - len(assigned_users)
+            daily_assignments[day_idx] = assigned_users[:target_count]
+
+        # 2. Loop slots by min-cost assignment
+        if demand.any():
+            chosen = self._solve_week(week_start, daily_assignments, demand)
+            for user_pos, day_idx in zip(*np.nonzero(chosen)):
+                daily_assignments[int(day_idx)].append(self.pool[user_pos])
+            filled = chosen.sum(axis=0)
+            for day_idx in np.nonzero(filled < demand)[0].tolist():
+                self.warnings.append(f"{week_start + datetime.timedelta(days=day_idx)} 循环池可排人员不足")
+            self.new_loop_index += int(filled.sum())
+
+        # 3. Sunday copies Saturday (locked Sunday users are kept first)
+        sunday = week_start + datetime.timedelta(days=6)
+        assigned_users = self._locked_users(locked_slots, sunday)
+        for user in daily_assignments[5]:
+            if user not in assigned_users and len(assigned_users) < target_count:
+                assigned_users.append(user)
+        daily_assignments[6] = assigned_users[:target_count]
+
+        result_schedules = []
+        for day_idx in range(7):
+            current_date = week_start + datetime.timedelta(days=day_idx)
+            locked_codes = locked_slots.get(current_date, ())
+            for user in daily_assignments[day_idx]:
+                sch = Schedule(
+                    date=current_date,
+                    user_id=user.id,
+                    is_locked=user.code in locked_codes
+                )
+                sch.user = user
+                result_schedules.append(sch)
+
+                pos = self.pool_pos.get(id(user))
+                if pos is not None:
+                    self.total_counts[pos] += 1
+                    if day_idx >= 5:
+                        self.weekend_counts[pos] += 1
+                    self.last_duty[pos] = max(self.last_duty[pos], current_date.toordinal())
+        return result_schedules
+
+    def _locked_users(self, locked_slots: Dict[datetime.date, List[str]],
+                      current_date: datetime.date) -> List[User]:
+        assigned_users = []
+        for u_code in locked_slots.get(current_date, ()):
+            u = self._get_user(u_code)
+            if u and u not in assigned_users:
+                assigned_users.append(u)
+        return assigned_users
+
+    def _solve_week(self, week_start: datetime.date, daily_assignments: Dict[int, List[User]],
+                    demand: np.ndarray) -> np.ndarray:
+        """Build the week's cost matrices over the loop pool and solve them."""
+        pool_size = len(self.pool)
+        eligible = np.ones((pool_size, 6), dtype=bool)
+        week_shifts = np.zeros(pool_size, dtype=np.int64)
+        for day_idx, assigned_users in daily_assignments.items():
+            for user in assigned_users:
+                pos = self.pool_pos.get(id(user))
+                if pos is not None:
+                    eligible[pos, day_idx] = False
+                    week_shifts[pos] += 1
+
+        # Rest penalty: days short of REST_DAYS since the last duty before this week
+        day_ordinals = week_start.toordinal() + np.arange(6, dtype=np.float64)
+        gap = day_ordinals[None, :] - self.last_duty[:, None]
+        cost = self.REST_WEIGHT * np.clip(self.REST_DAYS - gap, 0, None)
+        cost[:, 5] += self.WEEKEND_WEIGHT * self.weekend_counts
+
+        # Marginal cost of each additional slot this week, plus a cursor-order tie-break
+        k = np.arange(6, dtype=np.int64)
+        shifts = week_shifts[:, None] + k[None, :]
+        unit_cost = self.TOTAL_WEIGHT * (self.total_counts[:, None] + shifts)
+        unit_cost = unit_cost + np.where(shifts >= self.max_shifts_per_week, self.OVER_CAP_PENALTY, 0.0)
+        order = (np.arange(pool_size) - self.new_loop_index) % pool_size
+        unit_cost = unit_cost + self.TIE_BREAK * order[:, None]
+
+        return min_cost_assignment(cost, eligible, demand, unit_cost)
@@ -263,6 +263,9 @@ class CalendarView(QWidget):
         
         self.cells = {} # (row, col) -> CalendarCell
         self.schedules_cache = [] # Cache for repainting on month change
+        # Optional callable(start_date, end_date) -> List[Schedule]; when set, each
+        # repaint loads only the visible 6 weeks instead of reusing schedules_cache
+        self.schedule_provider = None
         
         self.refresh_calendar()
 
@@ -275,6 +278,12 @@ class CalendarView(QWidget):
         # 计算该日期所在周的周一
         return self.current_date - datetime.timedelta(days=self.current_date.weekday())
 
+    @property
+    def visible_range(self):
+        """(第一个格子日期, 最后一个格子日期)，固定显示 6 周"""
+        start = self.current_week_start
+        return start, start + datetime.timedelta(days=6 * 7 - 1)
+
     def _init_header(self):
         header = QHBoxLayout()
         header.setContentsMargins(0, 10, 0, 10)
@@ -362,8 +371,10 @@ class CalendarView(QWidget):
                 
                 current_iter_date += datetime.timedelta(days=1)
 
-        # Restore schedules from cache
-        if self.schedules_cache:
+        # Load the visible window, or restore schedules from cache
+        if self.schedule_provider is not None:
+            self.update_schedule(self.schedule_provider(*self.visible_range))
+        elif self.schedules_cache:
             self.update_schedule(self.schedules_cache)
 
     def _prev_month(self):
@@ -396,12 +407,28 @@ class CalendarView(QWidget):
             
         for sch in schedules:
             if sch.date in self.cells:
-                # Prioritize user's custom color, fallback to default
-                color = sch.user.color if sch.user.color else "#007AFF"
-                
-                # Display name if available, otherwise code
-                display_text = sch.user.name if sch.user.name else sch.user.code
-                tooltip = f"{sch.user.name} ({sch.user.code})"
-                
-                # Use str(sch.user.id) to ensure consistency with signal signature
-                self.cells[sch.date].add_user(str(sch.user.id), display_text, color, tooltip)
+                self._add_schedule_to_cell(sch)
+
+    def update_days(self, schedules_by_date):
+        """
+        Repaint only the given days, e.g. after a manual edit.
+        :param schedules_by_date: Dict[date, List[Schedule]]
+        """
+        for date, schedules in schedules_by_date.items():
+            cell = self.cells.get(date)
+            if cell is None:
+                continue
+            cell.clear_users()
+            for sch in schedules:
+                self._add_schedule_to_cell(sch)
+
+    def _add_schedule_to_cell(self, sch):
+        # Prioritize user's custom color, fallback to default
+        color = sch.user.color if sch.user.color else "#007AFF"
+        
+        # Display name if available, otherwise code
+        display_text = sch.user.name if sch.user.name else sch.user.code
+        tooltip = f"{sch.user.name} ({sch.user.code})"
+        
+        # Use str(sch.user.id) to ensure consistency with signal signature
+        self.cells[sch.date].add_user(str(sch.user.id), display_text, color, tooltip)
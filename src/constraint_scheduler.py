@@ -0,0 +1,408 @@
+import datetime
+from typing import List, Dict, Optional, Tuple, Any
+from src.models import User, Schedule
+from src.scheduler import Scheduler
+from src.rules_manager import CompiledRules
+from src.consts import MAX_SHIFTS_PER_WEEK, FIXED_HOLIDAYS
+
+
+class ConstraintScheduler(Scheduler):
+    """
+    Preference-aware solver mode on top of the weekly rules.
+
+    User.preferences are compiled once per horizon into bitsets:
+      - availability: blackout_dates / unavailable_dates / avoid_holidays clear a
+        user's bit on those days (per-user day bitsets and per-day user masks)
+      - compatibility: pairing_preference.avoid / avoid_pairing are symmetric
+        "never on the same day" masks
+      - soft preferences: preferred_days / preferred_weekdays and
+        pairing_preference.prefer only order the candidates
+
+    Fixed and rotation rule users are kept when available. Remaining slots are
+    filled from the loop pool in cursor order, one week at a time, by
+    backtracking over the days with forward checking. Each user can hold at most
+    max_shifts_per_week loop-filled shifts per week; if a week cannot be solved
+    under that cap it is retried without it, and unfillable slots are reported
+    in self.warnings.
+    """
+    NODE_LIMIT = 20000
+
+    def __init__(self, users: List[User], start_date: datetime.date,
+                 loop_index: int = 0, rules: Dict[str, Any] = None,
+                 compiled_rules: CompiledRules = None,
+                 max_shifts_per_week: int = MAX_SHIFTS_PER_WEEK,
+                 holidays: Dict[datetime.date, str] = None):
+        super().__init__(users, start_date, loop_index=loop_index, rules=rules,
+                         compiled_rules=compiled_rules)
+        self.max_shifts_per_week = max_shifts_per_week
+        self.holidays = holidays
+        self.warnings = []
+
+        self.user_bit = {id(u): 1 << i for i, u in enumerate(self.users)}
+        self.all_mask = (1 << len(self.users)) - 1
+        self.pool_users = [self.user_bit[id(u)].bit_length() - 1 for u in self.compiled.loop_pool]
+        self.pool_mask = 0
+        for idx in self.pool_users:
+            self.pool_mask |= 1 << idx
+
+        self._compile_static_preferences()
+
+    # ------------------------------------------------------------------
+    # Preference compilation
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _prefs(user: User) -> Dict[str, Any]:
+        return user.preferences if isinstance(user.preferences, dict) else {}
+
+    def _codes_to_mask(self, codes) -> int:
+        mask = 0
+        for code in codes or []:
+            user = self._get_user(code)
+            if user:
+                mask |= self.user_bit[id(user)]
+        return mask
+
+    def _compile_static_preferences(self):
+        """Horizon-independent masks: pair compatibility and weekday preferences."""
+        n = len(self.users)
+        self.compat = [self.all_mask & ~(1 << i) for i in range(n)]
+        self.prefer_partner = [0] * n
+        self.prefers_weekday = [0] * 7
+
+        for i, user in enumerate(self.users):
+            prefs = self._prefs(user)
+            pairing = prefs.get("pairing_preference") or {}
+            avoid = self._codes_to_mask(pairing.get("avoid")) | self._codes_to_mask(prefs.get("avoid_pairing"))
+            for j in range(n):
+                if avoid >> j & 1:
+                    self.compat[i] &= ~(1 << j)
+                    self.compat[j] &= ~(1 << i)
+            self.prefer_partner[i] = self._codes_to_mask(pairing.get("prefer"))
+
+            weekdays = prefs.get("preferred_weekdays") or prefs.get("preferred_days") or []
+            for wd in weekdays:
+                if isinstance(wd, int) and 0 <= wd < 7:
+                    self.prefers_weekday[wd] |= 1 << i
+
+    def _holiday_name(self, d: datetime.date) -> Optional[str]:
+        if self.holidays is not None:
+            return self.holidays.get(d)
+        return FIXED_HOLIDAYS.get((d.month, d.day))
+
+    def compile_availability(self, horizon_start: datetime.date, n_days: int) -> Tuple[List[int], List[int]]:
+        """
+        :return: (user_avail, day_mask)
+                 user_avail[i] has bit d set if user i is available on day d
+                 day_mask[d] has bit i set if user i is available on day d
+        """
+        horizon_mask = (1 << n_days) - 1
+        user_avail = [horizon_mask] * len(self.users)
+        day_mask = [self.all_mask] * n_days
+
+        holiday_days = {}
+        for d in range(n_days):
+            name = self._holiday_name(horizon_start + datetime.timedelta(days=d))
+            if name:
+                holiday_days.setdefault(name, []).append(d)
+
+        for i, user in enumerate(self.users):
+            prefs = self._prefs(user)
+            blocked = []
+            for key in ("blackout_dates", "unavailable_dates"):
+                for date_str in prefs.get(key) or []:
+                    parsed = CompiledRules._parse_date(date_str)
+                    if parsed:
+                        blocked.append((parsed - horizon_start).days)
+            for name in prefs.get("avoid_holidays") or []:
+                blocked.extend(holiday_days.get(name, []))
+
+            for d in blocked:
+                if 0 <= d < n_days:
+                    user_avail[i] &= ~(1 << d)
+                    day_mask[d] &= ~(1 << i)
+
+        return user_avail, day_mask
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+    def _ordered_candidates(self, mask: int, cursor: int, weekday: int, partner: int = None):
+        """Yield (user_idx, pool_pos) from mask: preferred first, then pool order from cursor."""
+        if not mask or not self.pool_users:
+            return
+        pref_wd = self.prefers_weekday[weekday]
+        pref_partner = self.prefer_partner[partner] if partner is not None else 0
+        tiers = (mask & pref_wd & pref_partner, mask & pref_wd, mask & pref_partner, mask)
+
+        size = len(self.pool_users)
+        seen = 0
+        for tier in tiers:
+            tier &= ~seen
+            if not tier:
+                continue
+            for step in range(size):
+                pos = (cursor + step) % size
+                idx = self.pool_users[pos]
+                if tier >> idx & 1:
+                    tier &= ~(1 << idx)
+                    seen |= 1 << idx
+                    yield idx, pos
+                    if not tier:
+                        break
+
+    def _mandatory(self, day_idx: int, d: int, locked_users: List[User], is_odd_week_human: bool,
+                   day_mask: List[int], saturday: List[int]) -> List[int]:
+        """Locked users, then available rule users (or Saturday's users on Sunday)."""
+        target_count = CompiledRules.TARGET_COUNT
+        chosen = []
+        for u in locked_users:
+            idx = self.user_bit[id(u)].bit_length() - 1
+            if idx not in chosen:
+                chosen.append(idx)
+        if len(chosen) >= target_count:
+            return chosen
+
+        if day_idx == 6:
+            rule_users = saturday
+        else:
+            rule_type, users = self.compiled.days[day_idx]
+            if rule_type == "fixed":
+                rule_users = [self.user_bit[id(u)].bit_length() - 1 for u in users]
+            elif rule_type == "rotation":
+                user = users[0] if is_odd_week_human else users[1]
+                rule_users = [self.user_bit[id(user)].bit_length() - 1] if user else []
+            else:
+                rule_users = []
+
+        for idx in rule_users:
+            if len(chosen) >= target_count:
+                break
+            if idx in chosen or not (day_mask[d] >> idx & 1):
+                continue
+            if all(self.compat[c] >> idx & 1 for c in chosen):
+                chosen.append(idx)
+        return chosen
+
+    def _solve_week(self, week_start: datetime.date, day0: int, locked_slots, is_odd_week_human: bool,
+                    cursor: int, day_mask: List[int], cap: Optional[int]):
+        """
+        Backtracking over the 7 days of one week. Returns (days, cursor) or None.
+        With cap=None short days are accepted instead of failing the week.
+        """
+        target_count = CompiledRules.TARGET_COUNT
+        locked = []
+        for day_idx in range(7):
+            codes = locked_slots.get(week_start + datetime.timedelta(days=day_idx), [])
+            locked.append([u for u in (self._get_user(c) for c in codes) if u])
+
+        # Mon-Sat mandatory users do not depend on other days, so resolve them once
+        mandatory = [self._mandatory(day_idx, day0 + day_idx, locked[day_idx], is_odd_week_human, day_mask, [])
+                     for day_idx in range(6)]
+        open_mask = []
+        for day_idx in range(6):
+            mask = day_mask[day0 + day_idx] & self.pool_mask
+            for c in mandatory[day_idx]:
+                mask &= self.compat[c]
+            open_mask.append(mask)
+
+        counts = [0] * len(self.users)
+        days = [None] * 7
+        nodes = [0]
+
+        def capacity_mask():
+            if cap is None:
+                return self.all_mask
+            mask = 0
+            for idx in self.pool_users:
+                if counts[idx] < cap:
+                    mask |= 1 << idx
+            return mask
+
+        def can_fill(mask, need):
+            # need open slots of one day from mask (two slots need a compatible pair)
+            if need <= 0:
+                return True
+            if need == 1:
+                return mask != 0
+            if need > 2:
+                return bin(mask).count("1") >= need
+            rest = mask
+            while rest:
+                low = rest & -rest
+                if mask & self.compat[low.bit_length() - 1] & ~low:
+                    return True
+                rest ^= low
+            return False
+
+        def forward_ok(day_idx):
+            # With cap=None short days are accepted, so there is nothing to prune
+            if cap is None:
+                return True
+            free = capacity_mask()
+            demand = 0
+            open_days = {}
+            essential = {}
+            # Every later weekday (Sunday follows Saturday) must still be fillable
+            for later in range(day_idx + 1, 6):
+                need = target_count - len(mandatory[later])
+                if need <= 0:
+                    continue
+                mask = open_mask[later] & free
+                if not can_fill(mask, need):
+                    return False
+                demand += need
+                rest = mask
+                while rest:
+                    low = rest & -rest
+                    rest ^= low
+                    idx = low.bit_length() - 1
+                    open_days[idx] = open_days.get(idx, 0) + 1
+                    # Users without whom the day cannot be filled must work it
+                    if not can_fill(mask & ~low, need):
+                        essential[idx] = essential.get(idx, 0) + 1
+            # Weekly cap: the remaining slots must fit in what each user can still take
+            if demand > sum(min(cap - counts[idx], n) for idx, n in open_days.items()):
+                return False
+            return all(n <= cap - counts[idx] for idx, n in essential.items())
+
+        def assign(day_idx, cursor):
+            if day_idx == 7:
+                return cursor
+            nodes[0] += 1
+            if nodes[0] > self.NODE_LIMIT:
+                return None
+
+            if day_idx == 6:
+                chosen = self._mandatory(6, day0 + 6, locked[6], is_odd_week_human, day_mask, days[5])
+                base = day_mask[day0 + 6] & self.pool_mask
+                for c in chosen:
+                    base &= self.compat[c]
+            else:
+                chosen = list(mandatory[day_idx])
+                base = open_mask[day_idx]
+            base &= capacity_mask()
+            need = target_count - len(chosen)
+
+            if day_idx == 5:
+                # Prefer Saturday users who can also cover Sunday
+                options = self._weekend_options(base, day_mask[day0 + 6], chosen, need, cursor, cap is None)
+            else:
+                options = self._fill_options(base, chosen, need, cursor, day_idx, cap is None)
+
+            for picked, next_cursor in options:
+                days[day_idx] = chosen + picked
+                for idx in picked:
+                    counts[idx] += 1
+                if forward_ok(day_idx):
+                    result = assign(day_idx + 1, next_cursor)
+                    if result is not None:
+                        return result
+                for idx in picked:
+                    counts[idx] -= 1
+                if nodes[0] > self.NODE_LIMIT:
+                    return None
+            return None
+
+        # Weeks the cap makes infeasible fail here instead of exhausting NODE_LIMIT
+        if not forward_ok(-1):
+            return None
+        final_cursor = assign(0, cursor)
+        if final_cursor is None:
+            return None
+        return days, final_cursor
+
+    def _fill_options(self, base: int, chosen: List[int], need: int, cursor: int, weekday: int,
+                      allow_short: bool):
+        """Yield (picked users, cursor after picking) for the open slots of a day."""
+        if need <= 0 or not self.pool_users:
+            yield [], cursor
+            return
+
+        size = len(self.pool_users)
+        found = False
+        partner = chosen[0] if chosen else None
+        for first, pos in self._ordered_candidates(base, cursor, weekday, partner):
+            if need == 1:
+                found = True
+                yield [first], (pos + 1) % size
+                continue
+            second_mask = base & self.compat[first] & ~(1 << first)
+            for second, pos2 in self._ordered_candidates(second_mask, (pos + 1) % size, weekday, first):
+                found = True
+                yield [first, second], (pos2 + 1) % size
+
+        if not found and allow_short:
+            # Leave the day short rather than failing the whole week
+            partial = next(iter(self._ordered_candidates(base, cursor, weekday, partner)), None)
+            if partial:
+                yield [partial[0]], (partial[1] + 1) % size
+            else:
+                yield [], cursor
+
+    def _weekend_options(self, base: int, sunday_mask: int, chosen: List[int], need: int, cursor: int,
+                         allow_short: bool):
+        tried = set()
+        for mask, short in ((base & sunday_mask, False), (base, allow_short)):
+            for picked, next_cursor in self._fill_options(mask, chosen, need, cursor, 5, short):
+                if tuple(picked) not in tried:
+                    tried.add(tuple(picked))
+                    yield picked, next_cursor
+
+    def generate_schedule(self, existing_schedules: List[Schedule] = None, mode: str = "all") -> List[Schedule]:
+        return self.generate_range(self.start_date, self.start_date + datetime.timedelta(days=6),
+                                   existing_schedules, mode=mode)
+
+    def generate_range(self, start: datetime.date, end: datetime.date,
+                       existing_schedules: List[Schedule] = None, mode: str = "all") -> List[Schedule]:
+        result_schedules = []
+        self.warnings = []
+        week_start = start - datetime.timedelta(days=start.weekday())
+        if week_start > end:
+            return result_schedules
+
+        n_weeks = (end - week_start).days // 7 + 1
+        horizon_end = week_start + datetime.timedelta(weeks=n_weeks)
+        locked_slots = self._bucket_locked_slots(existing_schedules, week_start, horizon_end)
+        self.user_avail, day_mask = self.compile_availability(week_start, n_weeks * 7)
+
+        has_anchor = self.compiled.loop_start_date is not None
+        pool_size = len(self.pool_users)
+        is_odd_week_human = self._is_odd_rotation_week(week_start)
+        cursor = self._calculate_anchor_loop_index(week_start)
+
+        for w in range(n_weeks):
+            monday = week_start + datetime.timedelta(weeks=w)
+            if has_anchor:
+                cursor = self._calculate_anchor_loop_index(monday)
+            start_cursor = cursor % pool_size if pool_size else 0
+
+            solved = self._solve_week(monday, w * 7, locked_slots, is_odd_week_human,
+                                      start_cursor, day_mask, self.max_shifts_per_week)
+            if solved is None:
+                self.warnings.append(f"{monday} 所在周无法满足每周最多 {self.max_shifts_per_week} 班的限制，已放宽")
+                solved = self._solve_week(monday, w * 7, locked_slots, is_odd_week_human,
+                                          start_cursor, day_mask, None)
+
+            if solved is None:
+                self.warnings.append(f"{monday} 所在周无法生成满足约束的排班")
+                days = [[] for _ in range(7)]
+            else:
+                days, end_cursor = solved
+                cursor = cursor + (end_cursor - start_cursor) % pool_size if pool_size else cursor
+
+            for day_idx, members in enumerate(days):
+                current_date = monday + datetime.timedelta(days=day_idx)
+                if len(members) < CompiledRules.TARGET_COUNT:
+                    self.warnings.append(f"{current_date} 可排人员不足")
+                locked_codes = locked_slots.get(current_date, [])
+                for idx in members:
+                    user = self.users[idx]
+                    sch = Schedule(date=current_date, user_id=user.id, is_locked=user.code in locked_codes)
+                    sch.user = user
+                    result_schedules.append(sch)
+
+            is_odd_week_human = not is_odd_week_human
+
+        self.new_loop_index = cursor
+        self.last_error = "\n".join(self.warnings) if self.warnings else None
+        return result_schedules
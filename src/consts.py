@@ -17,3 +17,13 @@ class WeekDay(Enum):
 # 约束常量
 MAX_SHIFTS_PER_WEEK = 3
 SHIFTS_PER_DAY = 2
+
+# 固定日期的法定节假日 (month, day) -> 名称
+# 农历节日 (春节、端午、中秋) 日期逐年变化，需要通过 holidays 参数显式传入
+FIXED_HOLIDAYS = {
+    (1, 1): "元旦",
+    (5, 1): "劳动节",
+    (10, 1): "国庆节",
+    (10, 2): "国庆节",
+    (10, 3): "国庆节",
+}
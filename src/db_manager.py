@@ -1,28 +1,303 @@
 import os
+import json
+import threading
+import functools
 from contextlib import contextmanager
-from sqlalchemy import create_engine
+import numpy as np
+from sqlalchemy import create_engine, event, func, inspect, text, select, bindparam
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import sessionmaker, joinedload
 from sqlalchemy.orm.attributes import flag_modified
+from sqlalchemy.pool import QueuePool
 from datetime import date
-from src.models import Base, User, Schedule
+from src.models import Base, User, Schedule, UserDutyStats
 from src.consts import GroupType
+from src.schedule_delta import ScheduleDelta
+from src.schedule_records import ScheduleRecord, SCHEDULE_DTYPE
+
+def schedule_write(method):
+    """
+    Mark a DBManager method that changes schedules: bumps data_version once its
+    changes are committed, recording the months of the returned ScheduleDelta
+    (or every month when the method returns no delta). Inside write_batch the
+    bump waits for the batch commit.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        if isinstance(result, ScheduleDelta):
+            if not result.is_empty():
+                self._record_write(result.touched_dates())
+        else:
+            self._record_write()
+        return result
+    return wrapper
+
 
 class DBManager:
-    def __init__(self, db_path="schedule.db"):
-        # Increase timeout to 30 seconds to handle potential locks better
-        self.engine = create_engine(f'sqlite:///{db_path}', connect_args={'timeout': 30})
+    SETTINGS_FILE = "db_settings.json"
+    # 默认使用 WAL，DBWriter 批量写入期间读取不被阻塞；
+    # 数据库放在网络共享目录等不支持 WAL 的位置时可切换为 standard
+    DEFAULT_PROFILE = "performance"
+    # month_versions 最多保留的月份数；淘汰的月份按"全部月份已变更"处理
+    MAX_TRACKED_MONTHS = 240
+
+    # SQLite 连接配置：pragmas 在每个新连接上执行，pool 为连接池参数
+    PROFILES = {
+        "standard": {
+            "label": "标准 (兼容模式)",
+            "pragmas": {"journal_mode": "DELETE"},
+            "pool": {},
+        },
+        "performance": {
+            "label": "高性能 (WAL)",
+            "pragmas": {
+                "journal_mode": "WAL",
+                "synchronous": "NORMAL",
+                "cache_size": -65536,       # 64 MB (负数单位为 KB)
+                "mmap_size": 268435456,     # 256 MB
+                "temp_store": "MEMORY",
+            },
+            # Keep connections (and their page cache) open between UI actions.
+            # poolclass 需显式指定：SQLAlchemy 1.4 对文件型 SQLite 默认使用 NullPool，不接受 pool_size
+            "pool": {"poolclass": QueuePool, "pool_size": 5, "max_overflow": 5, "pool_recycle": -1},
+        },
+    }
+
+    def __init__(self, db_path="schedule.db", profile=None):
+        self.db_path = db_path
+        self.profile = profile if profile in self.PROFILES else self.load_profile()
+        self.engine = self._create_engine()
         self.Session = sessionmaker(bind=self.engine)
+        self._batch = threading.local()
+        # 排班数据版本号：每次排班写入后递增，统计缓存以此判断是否过期
+        self.data_version = 0
+        # (year, month) -> 最后一次写入该月时的版本号；full_change_version 为可能影响所有月份的写入
+        self.month_versions = {}
+        self.full_change_version = 0
+        self._version_lock = threading.Lock()
         self.init_db()
 
+    @classmethod
+    def load_profile(cls):
+        if not os.path.exists(cls.SETTINGS_FILE):
+            return cls.DEFAULT_PROFILE
+        try:
+            with open(cls.SETTINGS_FILE, 'r', encoding='utf-8') as f:
+                profile = json.load(f).get("profile", cls.DEFAULT_PROFILE)
+            return profile if profile in cls.PROFILES else cls.DEFAULT_PROFILE
+        except Exception as e:
+            print(f"Error loading db settings: {e}")
+            return cls.DEFAULT_PROFILE
+
+    @classmethod
+    def save_profile(cls, profile):
+        with open(cls.SETTINGS_FILE, 'w', encoding='utf-8') as f:
+            json.dump({"profile": profile}, f, indent=4, ensure_ascii=False)
+
+    def _create_engine(self):
+        config = self.PROFILES[self.profile]
+        # Increase timeout to 30 seconds to handle potential locks better.
+        # 连接池中的连接会被 DBWriter 线程取用；SQLAlchemy 1.4 不会自动关闭 check_same_thread
+        engine = create_engine(f'sqlite:///{self.db_path}',
+                               connect_args={'timeout': 30, 'check_same_thread': False}, **config["pool"])
+        pragmas = config["pragmas"]
+
+        @event.listens_for(engine, "connect")
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+            cursor.close()
+
+        return engine
+
+    def set_profile(self, profile):
+        """切换连接配置并保存；已有连接全部关闭后按新配置重建"""
+        if profile not in self.PROFILES:
+            raise ValueError(f"Unknown database profile: {profile}")
+        self.save_profile(profile)
+        if profile == self.profile:
+            return
+        self.profile = profile
+        self.engine.dispose()
+        self.engine = self._create_engine()
+        self.Session.configure(bind=self.engine)
+
+    # user_duty_stats 由触发器随 schedules 的增删改同步更新
+    # (日期以 'YYYY-MM-DD' 文本存储；strftime('%w'): 0=周日, 6=周六)
+    DUTY_STATS_TRIGGERS = {
+        "trg_schedules_stats_insert": """
+            CREATE TRIGGER IF NOT EXISTS trg_schedules_stats_insert AFTER INSERT ON schedules
+            BEGIN
+                INSERT INTO user_duty_stats (user_id, year, total, weekend, last_duty_date)
+                VALUES (NEW.user_id, CAST(substr(NEW.date, 1, 4) AS INTEGER), 1,
+                        strftime('%w', NEW.date) IN ('0', '6'), NEW.date)
+                ON CONFLICT (user_id, year) DO UPDATE SET
+                    total = total + 1,
+                    weekend = weekend + excluded.weekend,
+                    last_duty_date = MAX(COALESCE(last_duty_date, ''), excluded.last_duty_date);
+            END
+        """,
+        "trg_schedules_stats_delete": """
+            CREATE TRIGGER IF NOT EXISTS trg_schedules_stats_delete AFTER DELETE ON schedules
+            BEGIN
+                UPDATE user_duty_stats SET
+                    total = total - 1,
+                    weekend = weekend - (strftime('%w', OLD.date) IN ('0', '6')),
+                    last_duty_date = (
+                        SELECT MAX(date) FROM schedules
+                        WHERE user_id = OLD.user_id
+                          AND date BETWEEN substr(OLD.date, 1, 4) || '-01-01' AND substr(OLD.date, 1, 4) || '-12-31'
+                    )
+                WHERE user_id = OLD.user_id AND year = CAST(substr(OLD.date, 1, 4) AS INTEGER);
+                DELETE FROM user_duty_stats
+                WHERE user_id = OLD.user_id AND year = CAST(substr(OLD.date, 1, 4) AS INTEGER) AND total <= 0;
+            END
+        """,
+        # Only moves between days/users change the aggregates; lock flips do not
+        "trg_schedules_stats_update": """
+            CREATE TRIGGER IF NOT EXISTS trg_schedules_stats_update AFTER UPDATE OF date, user_id ON schedules
+            WHEN OLD.date IS NOT NEW.date OR OLD.user_id IS NOT NEW.user_id
+            BEGIN
+                UPDATE user_duty_stats SET
+                    total = total - 1,
+                    weekend = weekend - (strftime('%w', OLD.date) IN ('0', '6')),
+                    last_duty_date = (
+                        SELECT MAX(date) FROM schedules
+                        WHERE user_id = OLD.user_id
+                          AND date BETWEEN substr(OLD.date, 1, 4) || '-01-01' AND substr(OLD.date, 1, 4) || '-12-31'
+                    )
+                WHERE user_id = OLD.user_id AND year = CAST(substr(OLD.date, 1, 4) AS INTEGER);
+                DELETE FROM user_duty_stats
+                WHERE user_id = OLD.user_id AND year = CAST(substr(OLD.date, 1, 4) AS INTEGER) AND total <= 0;
+                INSERT INTO user_duty_stats (user_id, year, total, weekend, last_duty_date)
+                VALUES (NEW.user_id, CAST(substr(NEW.date, 1, 4) AS INTEGER), 1,
+                        strftime('%w', NEW.date) IN ('0', '6'), NEW.date)
+                ON CONFLICT (user_id, year) DO UPDATE SET
+                    total = total + 1,
+                    weekend = weekend + excluded.weekend,
+                    last_duty_date = MAX(COALESCE(last_duty_date, ''), excluded.last_duty_date);
+            END
+        """,
+    }
+
     def init_db(self):
+        had_stats = inspect(self.engine).has_table(UserDutyStats.__tablename__)
         Base.metadata.create_all(self.engine)
+        self._migrate_schedule_columns()
+        self._migrate_schedule_indexes()
+        self._install_duty_stats_triggers(backfill=not had_stats)
+
+    def _install_duty_stats_triggers(self, backfill=False):
+        with self.engine.begin() as conn:
+            existing = {row[0] for row in conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'trigger'"))}
+            for name, ddl in self.DUTY_STATS_TRIGGERS.items():
+                if name not in existing:
+                    conn.execute(text(ddl))
+                    backfill = True
+        if backfill:
+            self.rebuild_duty_stats()
+
+    def rebuild_duty_stats(self):
+        """从 schedules 全量重建 user_duty_stats (旧数据库迁移或数据校正时使用)"""
+        with self.engine.begin() as conn:
+            conn.execute(text("DELETE FROM user_duty_stats"))
+            conn.execute(text("""
+                INSERT INTO user_duty_stats (user_id, year, total, weekend, last_duty_date)
+                SELECT user_id, year, COUNT(*), SUM(weekday >= 5), MAX(date)
+                FROM schedules
+                GROUP BY user_id, year
+            """))
+
+    def _migrate_schedule_columns(self):
+        """旧数据库补建日期派生列 (VIRTUAL 生成列由 SQLite 按 date 计算，无需回填数据)"""
+        existing = {col['name'] for col in inspect(self.engine).get_columns(Schedule.__tablename__)}
+        missing = [col for col in Schedule.__table__.columns
+                   if col.computed is not None and col.name not in existing]
+        if not missing:
+            return
+        with self.engine.begin() as conn:
+            for col in missing:
+                conn.execute(text(
+                    f"ALTER TABLE {Schedule.__tablename__} ADD COLUMN {col.name} INTEGER "
+                    f"GENERATED ALWAYS AS ({col.computed.sqltext}) VIRTUAL"
+                ))
+
+    def _migrate_schedule_indexes(self):
+        """create_all 不会为已存在的表补建索引：旧数据库先去重，再补建缺失的索引"""
+        existing = {ix['name'] for ix in inspect(self.engine).get_indexes(Schedule.__tablename__)}
+        missing = [ix for ix in Schedule.__table__.indexes if ix.name not in existing]
+        if not missing:
+            return
+        with self.engine.begin() as conn:
+            if any(ix.name == 'uq_schedules_date_user' for ix in missing):
+                # 每组 (date, user_id) 保留一行：优先保留已锁定的行，其次 id 最小的行
+                removed = conn.execute(text(
+                    "DELETE FROM schedules WHERE id IN ("
+                    "SELECT id FROM (SELECT id, ROW_NUMBER() OVER ("
+                    "PARTITION BY date, user_id ORDER BY COALESCE(is_locked, 0) DESC, id) AS rn "
+                    "FROM schedules) WHERE rn > 1)"
+                )).rowcount
+                if removed:
+                    print(f"Removed {removed} duplicate schedule rows before creating the unique index")
+            for ix in missing:
+                ix.create(conn, checkfirst=True)
         
     def get_session(self):
         return self.Session()
 
+    def _record_write(self, dates=None):
+        """
+        Bump data_version for a committed write (dates None = any month).
+        Inside write_batch the months are collected on the batch and bumped
+        by write_batch after its commit, so readers never cache uncommitted data.
+        """
+        pending = getattr(self._batch, "pending", None)
+        if pending is None:
+            self._bump_data_version(dates)
+        elif dates is None:
+            pending.append(None)
+        else:
+            pending.append(list(dates))
+
+    def _bump_data_version(self, dates=None):
+        with self._version_lock:
+            self.data_version += 1
+            if dates is None:
+                # Every month is stale for older versions: per-month entries carry no information
+                self.full_change_version = self.data_version
+                self.month_versions.clear()
+                return
+            for d in dates:
+                self.month_versions[(d.year, d.month)] = self.data_version
+            excess = len(self.month_versions) - self.MAX_TRACKED_MONTHS
+            if excess > 0:
+                oldest = sorted(self.month_versions.items(), key=lambda item: item[1])[:excess]
+                for key, _ in oldest:
+                    del self.month_versions[key]
+                # Caches older than the dropped entries can no longer tell which months changed
+                self.full_change_version = max(self.full_change_version, oldest[-1][1])
+
+    def changed_months_since(self, version):
+        """(year, month) keys written after `version`; None if a write may have touched every month"""
+        with self._version_lock:
+            if self.full_change_version > version:
+                return None
+            return {key for key, v in self.month_versions.items() if v > version}
+
     @contextmanager
     def session_scope(self):
-        """Provide a transactional scope around a series of operations."""
+        """
+        Provide a transactional scope around a series of operations.
+        Inside write_batch on the same thread, the batch session is reused and
+        committed (or rolled back) by write_batch instead.
+        """
+        batch_session = getattr(self._batch, "session", None)
+        if batch_session is not None:
+            yield batch_session
+            return
+
         session = self.get_session()
         try:
             yield session
@@ -33,6 +308,33 @@ class DBManager:
         finally:
             session.close()
 
+    @contextmanager
+    def write_batch(self, connection=None):
+        """
+        Run several write methods in one transaction: every session_scope
+        opened on this thread inside the block joins it.
+        connection: bind to an existing Connection (e.g. the writer thread's own)
+        """
+        if getattr(self._batch, "session", None) is not None:
+            raise RuntimeError("write_batch cannot be nested")
+        session = self.Session(bind=connection) if connection is not None else self.get_session()
+        self._batch.session = session
+        self._batch.pending = []
+        try:
+            yield session
+            session.commit()
+        except:
+            session.rollback()
+            raise
+        finally:
+            pending = self._batch.pending
+            self._batch.session = None
+            self._batch.pending = None
+            session.close()
+        if pending:
+            dates = None if any(p is None for p in pending) else [d for p in pending for d in p]
+            self._bump_data_version(dates)
+
     def init_default_users(self):
         """初始化默认用户数据 (如果数据库为空)"""
         session = self.get_session()
@@ -73,6 +375,7 @@ class DBManager:
             session.commit()
         session.close()
     
+    @schedule_write
     def reset_users(self, count):
         """重置用户数量 (删除现有用户并重新生成 A-Z...)"""
         try:
@@ -149,10 +452,14 @@ class DBManager:
                 for k, v in kwargs.items():
                     if hasattr(u, k):
                         setattr(u, k, v)
+            # 统计结果按工号/姓名展示，改名或改工号后所有月份的缓存都需重算
+            if {"code", "name"} & kwargs.keys():
+                self._record_write()
             return True, "成功"
         except Exception as e:
             return False, str(e)
             
+    @schedule_write
     def delete_user(self, user_id):
         # Hard delete as requested by user to allow ID reuse
         try:
@@ -203,6 +510,18 @@ class DBManager:
         session.close()
         return schedules
     
+    def get_locked_schedules(self, start_date, end_date):
+        """获取指定日期范围内的锁定排班"""
+        session = self.get_session()
+        schedules = session.query(Schedule).options(joinedload(Schedule.user)).filter(
+            Schedule.is_locked == True,
+            Schedule.date >= start_date,
+            Schedule.date <= end_date
+        ).all()
+        session.expunge_all()
+        session.close()
+        return schedules
+    
     def get_all_schedules(self):
         session = self.get_session()
         schedules = session.query(Schedule).options(joinedload(Schedule.user)).all()
@@ -210,81 +529,194 @@ class DBManager:
         session.close()
         return schedules
 
+    @staticmethod
+    def _schedule_range(query, start_date, end_date):
+        """Inclusive date bounds on a Core select over schedules; None is unbounded"""
+        table = Schedule.__table__
+        if start_date is not None:
+            query = query.where(table.c.date >= start_date)
+        if end_date is not None:
+            query = query.where(table.c.date <= end_date)
+        return query.order_by(table.c.date, table.c.user_id)
+
+    def get_schedule_records(self, start_date=None, end_date=None, user_map=None):
+        """
+        ORM-free read of schedules as ScheduleRecord, ordered by (date, user_id).
+        `user` is taken from user_map ({user_id: User}); ids missing from it
+        (or all of them, when user_map is None) are loaded with one query.
+        """
+        table = Schedule.__table__
+        query = self._schedule_range(
+            select(table.c.id, table.c.date, table.c.user_id, table.c.is_locked), start_date, end_date
+        )
+        with self.engine.connect() as conn:
+            rows = conn.execute(query).all()
+
+        user_map = dict(user_map or {})
+        missing = {row[2] for row in rows} - user_map.keys()
+        if missing:
+            session = self.get_session()
+            user_map.update((u.id, u) for u in session.query(User).filter(User.id.in_(missing)).all())
+            session.expunge_all()
+            session.close()
+
+        get_user = user_map.get
+        return [ScheduleRecord(sid, d, uid, locked, get_user(uid)) for sid, d, uid, locked in rows]
+
+    def get_schedule_array(self, start_date=None, end_date=None, chunk_size=20000):
+        """
+        Schedules as a NumPy structured array (SCHEDULE_DTYPE: id, date,
+        user_id, is_locked), ordered by (date, user_id).
+        Runs on the raw sqlite3 cursor with the date returned as days since
+        1970-01-01, so rows go straight into int64 chunks without building
+        Row, date or bool objects.
+        """
+        conditions, params = [], []
+        if start_date is not None:
+            conditions.append("date >= ?")
+            params.append(start_date.isoformat())
+        if end_date is not None:
+            conditions.append("date <= ?")
+            params.append(end_date.isoformat())
+        sql = ("SELECT id, CAST(julianday(date) - 2440587.5 AS INTEGER), user_id, is_locked FROM schedules"
+               + (" WHERE " + " AND ".join(conditions) if conditions else "")
+               + " ORDER BY date, user_id")
+
+        chunks = []
+        with self.engine.connect() as conn:
+            cursor = conn.connection.driver_connection.cursor()
+            try:
+                cursor.execute(sql, params)
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    chunks.append(np.array(rows, dtype=np.int64))
+            finally:
+                cursor.close()
+
+        data = np.concatenate(chunks) if chunks else np.empty((0, 4), dtype=np.int64)
+        result = np.empty(len(data), dtype=SCHEDULE_DTYPE)
+        result["id"] = data[:, 0]
+        result["date"] = data[:, 1].astype("datetime64[D]")
+        result["user_id"] = data[:, 2]
+        result["is_locked"] = data[:, 3] != 0
+        return result
+
+    @schedule_write
     def add_schedule(self, date_obj, user_id, is_locked=False):
-        session = self.get_session()
+        """
+        Add one schedule unless (date, user_id) already exists.
+        Returns the applied ScheduleDelta (empty when the row existed).
+        """
         try:
-            # 检查是否存在
-            existing = session.query(Schedule).options(joinedload(Schedule.user)).filter_by(date=date_obj, user_id=user_id).first()
-            if not existing:
-                new_schedule = Schedule(date=date_obj, user_id=user_id, is_locked=is_locked)
-                session.add(new_schedule)
-                session.commit()
-                session.refresh(new_schedule)
-                # Eager load user
-                session.query(Schedule).options(joinedload(Schedule.user)).filter_by(id=new_schedule.id).first()
-                session.expunge(new_schedule)
-                return new_schedule
-            
-            session.expunge(existing)
-            return existing
-        except:
-            session.rollback()
+            with self.session_scope() as session:
+                exists = session.query(Schedule.id).filter_by(date=date_obj, user_id=user_id).first()
+                if exists:
+                    return ScheduleDelta()
+                delta = ScheduleDelta(inserts=[(date_obj, user_id, bool(is_locked))])
+                self._write_delta(session, delta)
+            return delta
+        except Exception as e:
+            print(f"Error adding schedule: {e}")
             raise
-        finally:
-            session.close()
 
+    @schedule_write
     def delete_schedule(self, date_obj, user_id):
+        """Returns the applied ScheduleDelta"""
         try:
             with self.session_scope() as session:
-                session.query(Schedule).filter_by(date=date_obj, user_id=user_id).delete()
+                deleted = session.query(Schedule).filter_by(date=date_obj, user_id=user_id).delete()
+            return ScheduleDelta(deletes=[(date_obj, user_id)] if deleted else [])
         except Exception as e:
             print(f"Error deleting schedule: {e}")
             raise
 
+    @schedule_write
     def delete_day_schedule(self, date_obj):
+        """Returns the applied ScheduleDelta"""
         try:
             with self.session_scope() as session:
-                session.query(Schedule).filter_by(date=date_obj).delete()
+                user_ids = session.execute(
+                    select(Schedule.user_id).where(Schedule.date == date_obj)
+                ).scalars().all()
+                delta = ScheduleDelta(deletes=[(date_obj, uid) for uid in sorted(user_ids)])
+                self._write_delta(session, delta)
+            return delta
         except Exception as e:
             print(f"Error deleting day schedule: {e}")
             raise
         
+    @schedule_write
     def save_schedules(self, schedules):
-        """批量保存排班"""
+        """
+        批量保存排班 (按 date + user_id 插入或更新锁定状态)
+        Returns the applied ScheduleDelta (inserts and lock flips).
+        """
+        rows = {}
+        for sch in schedules:
+            # 这里的 schedule 对象可能是 detached 的或者新建的
+            u_id = sch.user_id
+            if u_id is None and sch.user:
+                u_id = sch.user.id
+            rows[(sch.date, u_id)] = {"date": sch.date, "user_id": u_id, "is_locked": bool(sch.is_locked)}
+        if not rows:
+            return ScheduleDelta()
+
+        stmt = sqlite_insert(Schedule.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Schedule.date, Schedule.user_id],
+            set_={"is_locked": stmt.excluded.is_locked}
+        )
+        dates = [key[0] for key in rows]
         try:
             with self.session_scope() as session:
-                for sch in schedules:
-                    # 这里的 schedule 对象可能是 detached 的或者新建的
-                    # 我们根据 date 和 user_id 来判断
-                    existing = session.query(Schedule).filter_by(date=sch.date, user_id=sch.user_id).first()
-                    if not existing:
-                        new_sch = Schedule(date=sch.date, user_id=sch.user_id, is_locked=sch.is_locked)
-                        session.add(new_sch)
-                    else:
-                        existing.is_locked = sch.is_locked
+                old_rows = session.execute(
+                    select(Schedule.date, Schedule.user_id, Schedule.is_locked)
+                    .where(Schedule.date >= min(dates), Schedule.date <= max(dates))
+                ).all()
+                # Upsert never deletes, so only keep existing rows that are written again
+                old_rows = [row for row in old_rows if (row[0], row[1]) in rows]
+                delta = ScheduleDelta.between(
+                    old_rows, [(r["date"], r["user_id"], r["is_locked"]) for r in rows.values()]
+                )
+                # One executemany batch against the unique (date, user_id) index
+                session.execute(stmt, list(rows.values()))
+            return delta
         except Exception as e:
             print(f"Error saving schedules: {e}")
             raise
 
+    @schedule_write
     def clear_range_schedules(self, start_date, end_date, keep_locked=True):
+        """Returns the applied ScheduleDelta"""
         try:
             with self.session_scope() as session:
-                query = session.query(Schedule).filter(
-                    Schedule.date >= start_date, 
+                query = select(Schedule.date, Schedule.user_id).where(
+                    Schedule.date >= start_date,
                     Schedule.date <= end_date
                 )
                 if keep_locked:
-                    query = query.filter(Schedule.is_locked == False)
-                
-                query.delete(synchronize_session=False)
+                    query = query.where(Schedule.is_locked == False)
+
+                delta = ScheduleDelta(deletes=[tuple(row) for row in session.execute(query).all()])
+                self._write_delta(session, delta)
+            return delta
         except Exception as e:
             print(f"Error clearing schedules: {e}")
             raise
 
+    @schedule_write
     def replace_schedules(self, new_schedules):
-        """Atomically replace schedules in the given range"""
+        """
+        Replace the schedules between the min and max date of new_schedules.
+        Existing rows in the range are loaded in one query and diffed against
+        the new (date, user_id, is_locked) rows; only inserts, deletes and lock
+        flips are written, so unchanged rows keep their ids.
+        Returns the applied ScheduleDelta.
+        """
         if not new_schedules:
-            return
+            return ScheduleDelta()
             
         try:
             # Calculate range from input
@@ -292,32 +724,67 @@ class DBManager:
             min_date = min(dates)
             max_date = max(dates)
             
+            new_rows = []
+            for s in new_schedules:
+                # Handle both detached objects and raw data
+                u_id = s.user_id
+                if u_id is None and s.user:
+                    u_id = s.user.id
+                new_rows.append((s.date, u_id, bool(s.is_locked)))
+            
             with self.session_scope() as session:
-                # Delete existing in range
-                session.query(Schedule).filter(Schedule.date >= min_date, Schedule.date <= max_date).delete()
-                
-                # Add new
-                db_schedules = []
-                for s in new_schedules:
-                    # Handle both detached objects and raw data
-                    u_id = s.user_id
-                    if u_id is None and s.user:
-                        u_id = s.user.id
-                    
-                    new_sch = Schedule(date=s.date, user_id=u_id, is_locked=s.is_locked)
-                    db_schedules.append(new_sch)
-                
-                session.add_all(db_schedules)
+                old_rows = session.execute(
+                    select(Schedule.date, Schedule.user_id, Schedule.is_locked)
+                    .where(Schedule.date >= min_date, Schedule.date <= max_date)
+                ).all()
+                delta = ScheduleDelta.between(old_rows, new_rows)
+                self._write_delta(session, delta)
+            return delta
         except Exception as e:
             print(f"Error replacing schedules: {e}")
             raise
 
+    @schedule_write
+    def apply_schedule_delta(self, delta):
+        """Apply a ScheduleDelta (inserts / deletes / lock flips) in one transaction; returns it"""
+        if delta.is_empty():
+            return delta
+            
+        try:
+            with self.session_scope() as session:
+                self._write_delta(session, delta)
+            return delta
+        except Exception as e:
+            print(f"Error applying schedule delta: {e}")
+            raise
+
+    @staticmethod
+    def _write_delta(session, delta):
+        """One executemany batch per kind of change"""
+        table = Schedule.__table__
+        if delta.deletes:
+            session.execute(
+                table.delete().where(table.c.date == bindparam("d"), table.c.user_id == bindparam("uid")),
+                [{"d": d, "uid": uid} for d, uid in delta.deletes]
+            )
+        if delta.lock_flips:
+            session.execute(
+                table.update()
+                .where(table.c.date == bindparam("d"), table.c.user_id == bindparam("uid"))
+                .values(is_locked=bindparam("locked")),
+                [{"d": d, "uid": uid, "locked": locked} for d, uid, locked in delta.lock_flips]
+            )
+        if delta.inserts:
+            session.execute(
+                table.insert(),
+                [{"date": d, "user_id": uid, "is_locked": locked} for d, uid, locked in delta.inserts]
+            )
+
     def get_history_counts(self):
         session = self.get_session()
-        # Count schedules per user
-        from sqlalchemy import func
-        results = session.query(User.code, func.count(Schedule.id))\
-            .join(Schedule, User.id == Schedule.user_id)\
+        # Count schedules per user (from the per-year aggregates)
+        results = session.query(User.code, func.sum(UserDutyStats.total))\
+            .join(UserDutyStats, User.id == UserDutyStats.user_id)\
             .group_by(User.code).all()
         session.close()
         return dict(results)
@@ -325,24 +792,62 @@ class DBManager:
     def get_weekend_history_counts(self):
         """获取每个用户的周末排班总数"""
         session = self.get_session()
-        from sqlalchemy import func
-        # SQLite: 0=Sunday, 6=Saturday
-        results = session.query(User.code, func.count(Schedule.id))\
-            .join(Schedule, User.id == Schedule.user_id)\
-            .filter(func.strftime('%w', Schedule.date).in_(['0', '6']))\
-            .group_by(User.code).all()
+        results = session.query(User.code, func.sum(UserDutyStats.weekend))\
+            .join(UserDutyStats, User.id == UserDutyStats.user_id)\
+            .group_by(User.code)\
+            .having(func.sum(UserDutyStats.weekend) > 0).all()
         session.close()
         return dict(results)
 
     def get_last_duty_dates(self):
         """获取每个用户的最近一次排班日期"""
         session = self.get_session()
-        from sqlalchemy import func
-        results = session.query(User.code, func.max(Schedule.date))\
+        results = session.query(User.code, func.max(UserDutyStats.last_duty_date))\
+            .join(UserDutyStats, User.id == UserDutyStats.user_id)\
+            .group_by(User.code).all()
+        session.close()
+        # SQLAlchemy returns date objects for Date type
+        return dict(results)
+
+    def get_yearly_duty_counts(self, year):
+        """获取指定年份每个用户的排班数"""
+        session = self.get_session()
+        results = session.query(User.code, UserDutyStats.total)\
+            .join(UserDutyStats, User.id == UserDutyStats.user_id)\
+            .filter(UserDutyStats.year == year).all()
+        session.close()
+        return dict(results)
+
+    def get_monthly_counts(self, year, month):
+        """获取指定月份每个用户的排班数 {user_code: count}"""
+        session = self.get_session()
+        results = session.query(User.code, func.count())\
             .join(Schedule, User.id == Schedule.user_id)\
+            .filter(Schedule.year == year, Schedule.month == month)\
             .group_by(User.code).all()
         session.close()
-        # Convert date strings/objects to date objects if needed (SQLAlchemy returns date objects for Date type)
+        return dict(results)
+
+    def get_annual_counts(self, year):
+        """获取指定年份每个用户的排班数 {user_code: count}"""
+        session = self.get_session()
+        results = session.query(User.code, func.count())\
+            .join(Schedule, User.id == Schedule.user_id)\
+            .filter(Schedule.year == year)\
+            .group_by(User.code).all()
+        session.close()
+        return dict(results)
+
+    def get_weekend_counts(self, year, month=None):
+        """获取指定年份(或月份)每个用户的周末排班数 {user_code: count}"""
+        session = self.get_session()
+        query = session.query(User.code, func.count())\
+            .join(Schedule, User.id == Schedule.user_id)\
+            .filter(Schedule.year == year, Schedule.weekday >= 5)
+        if month is not None:
+            query = query.filter(Schedule.month == month)
+        results = query.group_by(User.code).all()
+        session.close()
         return dict(results)
 
     def get_users_on_duty_between(self, start_date, end_date):
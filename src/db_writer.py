@@ -0,0 +1,132 @@
+import queue
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+_STOP = object()
+
+
+class WriteCommand:
+    """One queued DBManager write: method name, arguments and caller context."""
+    __slots__ = ("method", "args", "kwargs", "context")
+
+    def __init__(self, method: str, args: tuple = (), kwargs: Dict[str, Any] = None,
+                 context: Dict[str, Any] = None):
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.context = context or {}
+
+    def __repr__(self):
+        return f"<WriteCommand({self.method})>"
+
+
+class DBWriter:
+    """
+    Dedicated thread for schedule writes.
+
+    Commands are executed in submission order on one connection owned by the
+    thread, so a locked database file (the 30 s busy timeout) or a large
+    replace_schedules never blocks the caller. Adjacent small writes (single
+    day edits) are run in one transaction via DBManager.write_batch; if that
+    transaction fails, its commands are retried one by one so only the
+    failing command reports an error.
+
+    on_done(command, result) and on_failed(command, message) are called on the
+    writer thread; the GUI re-emits them as Qt signals. Reads keep using their
+    own pooled connections (concurrent with the writer under the WAL profile).
+    """
+    SMALL_WRITES = {"add_schedule", "delete_schedule", "delete_day_schedule", "apply_schedule_delta"}
+    WRITE_METHODS = SMALL_WRITES | {"save_schedules", "clear_range_schedules", "replace_schedules"}
+    MAX_BATCH = 64
+
+    def __init__(self, db_manager, on_done: Callable[[WriteCommand, Any], None] = None,
+                 on_failed: Callable[[WriteCommand, str], None] = None):
+        self.db_manager = db_manager
+        self.on_done = on_done
+        self.on_failed = on_failed
+        self._queue: "queue.Queue" = queue.Queue()
+        self._pending: Optional[WriteCommand] = None
+        self._connection = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+            self._thread.start()
+
+    def submit(self, method: str, *args, context: Dict[str, Any] = None, **kwargs) -> WriteCommand:
+        if method not in self.WRITE_METHODS:
+            raise ValueError(f"Unsupported write: {method}")
+        command = WriteCommand(method, args, kwargs, context)
+        self._queue.put(command)
+        return command
+
+    def join(self):
+        """Block until every submitted command has been executed."""
+        self._queue.join()
+
+    def stop(self, timeout: float = None):
+        """Finish the queued commands, then end the thread."""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        try:
+            while True:
+                command = self._pending if self._pending is not None else self._queue.get()
+                self._pending = None
+                if command is _STOP:
+                    self._queue.task_done()
+                    break
+                batch = self._collect_batch(command)
+                self._execute(batch)
+                for _ in batch:
+                    self._queue.task_done()
+        finally:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def _collect_batch(self, command: WriteCommand) -> List[WriteCommand]:
+        batch = [command]
+        if command.method not in self.SMALL_WRITES:
+            return batch
+        while len(batch) < self.MAX_BATCH:
+            try:
+                nxt = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if nxt is _STOP or nxt.method not in self.SMALL_WRITES:
+                self._pending = nxt
+                break
+            batch.append(nxt)
+        return batch
+
+    def _execute(self, batch: List[WriteCommand]):
+        try:
+            with self.db_manager.write_batch(self._connect()):
+                results = [getattr(self.db_manager, c.method)(*c.args, **c.kwargs) for c in batch]
+        except Exception as e:
+            if len(batch) > 1:
+                for command in batch:
+                    self._execute([command])
+            elif self.on_failed:
+                self.on_failed(batch[0], str(e))
+            return
+
+        if self.on_done:
+            for command, result in zip(batch, results):
+                self.on_done(command, result)
+
+    def _connect(self):
+        """The thread's own connection, reopened if DBManager switched engines (set_profile)."""
+        engine = self.db_manager.engine
+        if self._connection is not None and self._connection.engine is not engine:
+            self._connection.close()
+            self._connection = None
+        if self._connection is None:
+            self._connection = engine.connect()
+        return self._connection
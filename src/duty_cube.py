@@ -0,0 +1,105 @@
+import datetime
+import numpy as np
+from typing import Dict, Iterable, List, Optional
+
+
+class DutyCube:
+    """
+    Dense users × days int8 occupancy matrix: cube[i, j] == 1 when the user
+    at row i (user_index) is on duty on start + j days.
+
+    Built once from a schedule list; every count over a period is then a
+    column slice plus an axis sum.
+    """
+    def __init__(self, codes: List[str], start: datetime.date, end: datetime.date):
+        self.codes = list(codes)
+        self.user_index: Dict[str, int] = {code: i for i, code in enumerate(self.codes)}
+        self.start = start
+        self.end = end
+        n_days = max((end - start).days + 1, 0)
+        self.cube = np.zeros((len(self.codes), n_days), dtype=np.int8)
+        self.weekend = (start.weekday() + np.arange(n_days)) % 7 >= 5
+
+    @classmethod
+    def from_schedules(cls, schedules: Iterable, codes: List[str],
+                       start: Optional[datetime.date] = None, end: Optional[datetime.date] = None) -> "DutyCube":
+        """
+        codes gives the row order; users found only in schedules are appended.
+        start/end default to the first and last schedule date; schedules
+        outside [start, end] are ignored.
+        """
+        codes = list(codes)
+        known = set(codes)
+        entries = []
+        for sch in schedules:
+            code = getattr(sch.user, 'code', None)
+            if code is None:
+                continue
+            if code not in known:
+                known.add(code)
+                codes.append(code)
+            entries.append((code, sch.date))
+
+        if start is None or end is None:
+            dates = [d for _, d in entries]
+            today = datetime.date.today()
+            start = start or (min(dates) if dates else today)
+            end = end or (max(dates) if dates else start)
+
+        cube = cls(codes, start, end)
+        in_range = [(code, d) for code, d in entries if start <= d <= end]
+        if in_range:
+            rows = np.fromiter((cube.user_index[code] for code, _ in in_range), dtype=np.int64, count=len(in_range))
+            cols = np.fromiter(((d - start).days for _, d in in_range), dtype=np.int64, count=len(in_range))
+            cube.cube[rows, cols] = 1
+        return cube
+
+    @classmethod
+    def from_array(cls, records: np.ndarray, code_by_id: Dict[int, str], codes: List[str],
+                   start: datetime.date, end: datetime.date) -> "DutyCube":
+        """
+        Build from a SCHEDULE_DTYPE array (DBManager.get_schedule_array).
+        Rows whose user_id is not in code_by_id are ignored.
+        """
+        cube = cls(codes, start, end)
+        if len(records) == 0 or not code_by_id:
+            return cube
+        ids = np.array(list(code_by_id), dtype=np.int64)
+        rows_of_id = np.array([cube.user_index.get(code_by_id[i], -1) for i in ids], dtype=np.int64)
+        order = np.argsort(ids)
+        ids, rows_of_id = ids[order], rows_of_id[order]
+
+        user_ids = records["user_id"].astype(np.int64)
+        pos = np.clip(np.searchsorted(ids, user_ids), 0, len(ids) - 1)
+        rows = np.where(ids[pos] == user_ids, rows_of_id[pos], -1)
+        cols = (records["date"] - np.datetime64(start, "D")).astype(np.int64)
+        keep = (rows >= 0) & (cols >= 0) & (cols < cube.n_days)
+        cube.cube[rows[keep], cols[keep]] = 1
+        return cube
+
+    @property
+    def n_days(self) -> int:
+        return self.cube.shape[1]
+
+    def day_index(self, d: datetime.date) -> int:
+        """Column of d, clamped to [0, n_days] for slicing"""
+        return min(max((d - self.start).days, 0), self.n_days)
+
+    def covers(self, start: datetime.date, end: datetime.date) -> bool:
+        return self.start <= start and end <= self.end
+
+    def window(self, start: datetime.date, end: datetime.date) -> np.ndarray:
+        """users × days view for [start, end] (clipped to the cube)"""
+        return self.cube[:, self.day_index(start):self.day_index(end + datetime.timedelta(days=1))]
+
+    def counts(self, start: datetime.date, end: datetime.date, weekend_only: bool = False) -> np.ndarray:
+        """Duty days per user (row order) in [start, end]"""
+        lo = self.day_index(start)
+        hi = self.day_index(end + datetime.timedelta(days=1))
+        block = self.cube[:, lo:hi]
+        if weekend_only:
+            block = block[:, self.weekend[lo:hi]]
+        return block.sum(axis=1, dtype=np.int64)
+
+    def to_dict(self, values: np.ndarray) -> Dict[str, int]:
+        return {code: int(v) for code, v in zip(self.codes, values)}
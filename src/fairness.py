@@ -0,0 +1,221 @@
+import numpy as np
+from typing import Dict
+
+# 公平性指标：输入为 (..., users, days) 的值班占用矩阵 (1 = 值班)，如 DutyCube 的窗口
+# 或 plans_to_occupancy 生成的一批候选方案；只在最后两个轴上归约，整批方案一次算完。
+# 采样得到的大批方案用 evaluate_plans 直接在 (plans x days x slots) 下标上计算，不展开稠密矩阵。
+
+# score() weights; every term is "lower is fairer"
+DEFAULT_WEIGHTS = {
+    "gini": 10.0,
+    "std": 1.0,
+    "weekend_share_deviation": 10.0,
+    "max_consecutive": 1.0,
+    "rest_shortfall": 0.5,
+    "pair_repetition": 1.0,
+}
+# Rest gaps shorter than this many days count against a plan
+REST_TARGET_DAYS = 7
+
+
+def plans_to_occupancy(plans: np.ndarray, n_users: int) -> np.ndarray:
+    """(n_plans x days x slots) user indices (-1 = empty) -> (n_plans x users x days) int8"""
+    n_plans, n_days, _ = plans.shape
+    occupancy = np.zeros((n_plans, n_users, n_days), dtype=np.int8)
+    p, d, s = np.nonzero(plans >= 0)
+    occupancy[p, plans[p, d, s], d] = 1
+    return occupancy
+
+
+def gini(values: np.ndarray) -> np.ndarray:
+    """Gini coefficient over the last axis (0 = equal, 0 when everything is 0)"""
+    x = np.sort(np.asarray(values, dtype=np.float64), axis=-1)
+    n = x.shape[-1]
+    if n == 0:
+        return np.zeros(x.shape[:-1])
+    total = x.sum(axis=-1)
+    ranks = np.arange(1, n + 1, dtype=np.float64)
+    weighted = (x * ranks).sum(axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        g = 2.0 * weighted / (n * total) - (n + 1.0) / n
+    return np.where(total > 0, g, 0.0)
+
+
+def weekend_share_deviation(occupancy: np.ndarray, weekend_mask: np.ndarray) -> np.ndarray:
+    """Per user: share of all weekend duties minus the equal share 1/users"""
+    return _weekend_share_deviation(occupancy[..., weekend_mask].sum(axis=-1, dtype=np.int64))
+
+
+def _weekend_share_deviation(weekend: np.ndarray) -> np.ndarray:
+    n_users = weekend.shape[-1]
+    if n_users == 0:
+        return weekend.astype(np.float64)
+    total = weekend.sum(axis=-1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        share = np.where(total > 0, weekend / total, 1.0 / n_users)
+    return share - 1.0 / n_users
+
+
+def max_consecutive(occupancy: np.ndarray) -> np.ndarray:
+    """Per user: longest run of consecutive duty days"""
+    x = np.asarray(occupancy, dtype=np.int32)
+    if x.shape[-1] == 0:
+        return np.zeros(x.shape[:-1], dtype=np.int64)
+    running = np.cumsum(x, axis=-1)
+    # running total at the last day off; the run length is the difference
+    reset = np.maximum.accumulate(np.where(x == 0, running, 0), axis=-1)
+    return (running - reset).max(axis=-1).astype(np.int64)
+
+
+def min_rest_gap(occupancy: np.ndarray) -> np.ndarray:
+    """Per user: fewest days off between two duties (0 = back to back, inf = fewer than two duties)"""
+    x = np.asarray(occupancy) > 0
+    n_days = x.shape[-1]
+    if n_days == 0:
+        return np.full(x.shape[:-1], np.inf)
+    day = np.arange(n_days, dtype=np.int32)
+    last = np.maximum.accumulate(np.where(x, day, -1), axis=-1)
+    prev = np.concatenate([np.full(x.shape[:-1] + (1,), -1, dtype=last.dtype), last[..., :-1]], axis=-1)
+    gap = np.where(x & (prev >= 0), day - prev - 1, n_days).min(axis=-1)
+    return np.where(gap >= n_days, np.inf, gap.astype(np.float64))
+
+
+def pair_counts(occupancy: np.ndarray) -> np.ndarray:
+    """(..., users, users) number of days each pair is on duty together (diagonal 0)"""
+    x = np.asarray(occupancy, dtype=np.float32)
+    counts = np.rint(np.matmul(x, np.swapaxes(x, -1, -2))).astype(np.int64)
+    n_users = counts.shape[-1]
+    counts[..., np.arange(n_users), np.arange(n_users)] = 0
+    return counts
+
+
+def pair_repetition(occupancy: np.ndarray) -> np.ndarray:
+    """Per user: share of their duties spent with their most frequent partner"""
+    top = pair_counts(occupancy).max(axis=-1, initial=0)
+    totals = np.asarray(occupancy).sum(axis=-1, dtype=np.int64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(totals > 0, top / totals, 0.0)
+
+
+def evaluate(occupancy: np.ndarray, weekend_mask: np.ndarray, base_totals: np.ndarray = None) -> Dict[str, np.ndarray]:
+    """
+    All metrics for a period.
+    Per user (..., users): totals, weekend, weekend_share_deviation,
+    max_consecutive, min_rest_gap, pair_repetition.
+    Per period (...): gini and std of totals (plus base_totals, e.g. history
+    counts, when given), and the worst case of each per-user metric.
+    """
+    occupancy = np.asarray(occupancy)
+    weekend_mask = np.asarray(weekend_mask, dtype=bool)
+    totals = occupancy.sum(axis=-1, dtype=np.int64)
+    weekend = occupancy[..., weekend_mask].sum(axis=-1, dtype=np.int64)
+    metrics = {
+        "totals": totals,
+        "weekend": weekend,
+        "weekend_share_deviation": _weekend_share_deviation(weekend),
+        "max_consecutive": max_consecutive(occupancy),
+        "min_rest_gap": min_rest_gap(occupancy),
+        "pair_repetition": pair_repetition(occupancy),
+    }
+    return _add_period_metrics(metrics, base_totals)
+
+
+def evaluate_plans(plans: np.ndarray, weekend_mask: np.ndarray, n_users: int,
+                   user_rows: np.ndarray = None, base_totals: np.ndarray = None) -> Dict[str, np.ndarray]:
+    """
+    Same metrics as evaluate(plans_to_occupancy(plans)), computed from the
+    (n_plans x days x slots) index form without building the dense matrix:
+    every term is a bincount or a sort over the filled slots, so the cost
+    grows with plans x days x slots instead of plans x users x days.
+    user_rows maps a plan index to a metric row (-1 = ignore, e.g. users
+    outside the loop pool); n_users is the number of rows.
+    """
+    n_plans, n_days, n_slots = plans.shape
+    weekend_mask = np.asarray(weekend_mask, dtype=bool)
+    rows_of = np.asarray(user_rows) if user_rows is not None else None
+    rows = plans.astype(np.int64)
+    if rows_of is not None:
+        rows = np.where(rows >= 0, rows_of[np.maximum(rows, 0)], -1)
+
+    p, d, s = np.nonzero(rows >= 0)
+    u = rows[p, d, s]
+    group = p * n_users + u
+    size = n_plans * n_users
+    totals = np.bincount(group, minlength=size).reshape(n_plans, n_users)
+    on_weekend = weekend_mask[d]
+    weekend = np.bincount(group[on_weekend], minlength=size).reshape(n_plans, n_users)
+
+    # Duty days per (plan, user) in order: gaps and runs between neighbours
+    order = np.lexsort((d, group))
+    g, day = group[order], d[order]
+    same = g[1:] == g[:-1]
+    step = day[1:] - day[:-1]
+    min_gap = np.full(size, n_days, dtype=np.int64)
+    np.minimum.at(min_gap, g[1:][same], step[same] - 1)
+    run_start = np.concatenate([[True], ~(same & (step == 1))]) if len(g) else np.zeros(0, dtype=bool)
+    run_id = np.cumsum(run_start) - 1
+    run_length = np.bincount(run_id) if len(run_id) else np.zeros(0, dtype=np.int64)
+    longest = np.zeros(size, dtype=np.int64)
+    np.maximum.at(longest, g[run_start], run_length)
+
+    # Co-duty pairs: every two filled slots of the same day
+    pair_keys = []
+    for i in range(n_slots):
+        for j in range(i + 1, n_slots):
+            a, b = rows[:, :, i], rows[:, :, j]
+            both = (a >= 0) & (b >= 0)
+            pp = np.nonzero(both)[0]
+            lo, hi = np.minimum(a, b)[both], np.maximum(a, b)[both]
+            pair_keys.append((pp * n_users + lo) * n_users + hi)
+    top = np.zeros(size, dtype=np.int64)
+    if pair_keys:
+        keys, counts = np.unique(np.concatenate(pair_keys), return_counts=True)
+        plan_of, rest = np.divmod(keys, n_users * n_users)
+        lo, hi = np.divmod(rest, n_users)
+        np.maximum.at(top, plan_of * n_users + lo, counts)
+        np.maximum.at(top, plan_of * n_users + hi, counts)
+    top = top.reshape(n_plans, n_users)
+
+    min_gap = min_gap.reshape(n_plans, n_users)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        repetition = np.where(totals > 0, top / totals, 0.0)
+    metrics = {
+        "totals": totals,
+        "weekend": weekend,
+        "weekend_share_deviation": _weekend_share_deviation(weekend),
+        "max_consecutive": longest.reshape(n_plans, n_users),
+        "min_rest_gap": np.where(min_gap >= n_days, np.inf, min_gap.astype(np.float64)),
+        "pair_repetition": repetition,
+    }
+    return _add_period_metrics(metrics, base_totals)
+
+
+def _add_period_metrics(metrics: Dict[str, np.ndarray], base_totals: np.ndarray = None) -> Dict[str, np.ndarray]:
+    totals = metrics["totals"]
+    balance = totals if base_totals is None else totals + np.asarray(base_totals)
+    metrics["gini"] = gini(balance)
+    metrics["std"] = balance.std(axis=-1) if balance.shape[-1] else np.zeros(balance.shape[:-1])
+    metrics["worst_weekend_share_deviation"] = np.abs(metrics["weekend_share_deviation"]).max(axis=-1, initial=0.0)
+    metrics["worst_max_consecutive"] = metrics["max_consecutive"].max(axis=-1, initial=0)
+    metrics["worst_min_rest_gap"] = metrics["min_rest_gap"].min(axis=-1, initial=np.inf)
+    metrics["worst_pair_repetition"] = metrics["pair_repetition"].max(axis=-1, initial=0.0)
+    return metrics
+
+
+def combine(metrics: Dict[str, np.ndarray], weights: Dict[str, float] = None) -> np.ndarray:
+    """Weighted fairness objective from evaluate()/evaluate_plans() output (lower is fairer)"""
+    w = dict(DEFAULT_WEIGHTS)
+    w.update(weights or {})
+    rest_shortfall = np.clip(REST_TARGET_DAYS - metrics["worst_min_rest_gap"], 0, None)
+    return (w["gini"] * metrics["gini"]
+            + w["std"] * metrics["std"]
+            + w["weekend_share_deviation"] * metrics["worst_weekend_share_deviation"]
+            + w["max_consecutive"] * metrics["worst_max_consecutive"]
+            + w["rest_shortfall"] * rest_shortfall
+            + w["pair_repetition"] * metrics["worst_pair_repetition"])
+
+
+def score(occupancy: np.ndarray, weekend_mask: np.ndarray, base_totals: np.ndarray = None,
+          weights: Dict[str, float] = None) -> np.ndarray:
+    """Fairness objective per period / plan of an occupancy matrix (lower is fairer)"""
+    return combine(evaluate(occupancy, weekend_mask, base_totals), weights)
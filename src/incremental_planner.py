@@ -0,0 +1,239 @@
+import datetime
+from collections import defaultdict
+from typing import List, Dict, Any, Iterable, Optional, Set, Tuple
+from src.models import User, Schedule
+from src.scheduler import Scheduler
+from src.rules_manager import CompiledRules
+from src.schedule_delta import ScheduleDelta, ScheduleRow
+
+
+class IncrementalPlanner:
+    """
+    Re-plans only the days affected by a manual edit.
+
+    Locked rows (is_locked=True) are the fixed points; unlocked rows are the
+    generated plan. A day whose stored rows are all locked (or that has none)
+    was edited by hand and keeps exactly those rows: it applies no rules and
+    draws nothing from the loop pool.
+
+    A change on day D changes the loop draws from D to the end of its week.
+    With loop_start_date set, the next Monday's cursor is derived from the
+    anchor, so the cursor realigns there and later weeks are untouched.
+    Without an anchor the cursor carries over, so weeks are re-planned until a
+    regenerated week matches the stored plan and the loop cursor matches the
+    one the stored plan had at that point (replayed from previous_schedules).
+
+    Only the cyclic rules are replayed. A stored week they do not reproduce
+    (made by the constraint, balanced or probabilistic engine) is never
+    re-planned: the edit is written into it as is.
+    """
+    def __init__(self, users: List[User], rules: Dict[str, Any] = None,
+                 compiled_rules: CompiledRules = None):
+        self.users = users
+        self.scheduler = Scheduler(users, datetime.date.today(), rules=rules,
+                                   compiled_rules=compiled_rules)
+        self.code_by_id = {u.id: u.code for u in users}
+
+    def plan_edit(self, edit: ScheduleDelta, stored_schedules: List[Schedule],
+                  horizon_end: datetime.date, loop_index: Optional[int] = 0) -> ScheduleDelta:
+        """
+        Combine a manual edit with the re-plan it causes.
+
+        :param edit: the edit as a change set against stored_schedules (a drop
+                     inserts or locks a row; a move also deletes the source
+                     row; removing a user or clearing a day only deletes)
+        :param stored_schedules: stored rows from the Monday of the first
+                                 edited day's week through horizon_end
+        :param loop_index: loop cursor at that Monday (only used without an anchor);
+                           None when it is unknown: without an anchor only the
+                           edit itself is applied then
+        :return: one change set against stored_schedules, to be written with
+                 DBManager.apply_schedule_delta
+        """
+        if edit.is_empty():
+            return edit
+        stored = self._rows(stored_schedules)
+        edited = {(d, uid): locked for d, uid, locked in stored}
+        for key in edit.deletes:
+            edited.pop(key, None)
+        for d, uid, locked in edit.lock_flips:
+            if (d, uid) in edited:
+                edited[(d, uid)] = locked
+        for d, uid, locked in edit.inserts:
+            edited[(d, uid)] = locked
+
+        # Days that only lost users keep what is left: lock it so the day stays
+        # as edited now and in later re-plans
+        dropped_on = {row[0] for row in edit.inserts} | {row[0] for row in edit.lock_flips}
+        kept_days = {d for d, _ in edit.deletes} - dropped_on
+        for key in edited:
+            if key[0] in kept_days:
+                edited[key] = True
+
+        current = [(d, uid, locked) for (d, uid), locked in edited.items()]
+        has_anchor = self.scheduler.compiled.loop_start_date is not None
+        if loop_index is None and not has_anchor:
+            return ScheduleDelta.between(stored, current)
+
+        # Each edited week is re-planned on its own (a move to another week
+        # leaves the weeks in between alone)
+        touched = edit.touched_dates()
+        mondays = sorted({d - datetime.timedelta(days=d.weekday()) for d in touched})
+        final = {(d, uid): locked for d, uid, locked in current}
+        for i, monday in enumerate(mondays):
+            sunday = monday + datetime.timedelta(days=6)
+            first = min(d for d in touched if monday <= d <= sunday)
+            # Without an anchor a re-plan runs on until the cursor realigns,
+            # but not into the next edited week
+            end = horizon_end
+            if i + 1 < len(mondays):
+                end = min(horizon_end, mondays[i + 1] - datetime.timedelta(days=1))
+            cursor = previous_cursor = loop_index
+            rows = [(d, uid, locked) for (d, uid), locked in final.items()]
+            if not has_anchor and i > 0:
+                cursor = self._cursor_at(rows, mondays[0], monday, loop_index)
+                previous_cursor = self._cursor_at(stored, mondays[0], monday, loop_index)
+            replanned = self.replan(first, rows, end, loop_index=cursor, previous_schedules=stored,
+                                    until=min(sunday, end), previous_loop_index=previous_cursor)
+            for key in replanned.deletes:
+                final.pop(key, None)
+            for d, uid, locked in replanned.lock_flips + replanned.inserts:
+                final[(d, uid)] = locked
+        return ScheduleDelta.between(stored, [(d, uid, locked) for (d, uid), locked in final.items()])
+
+    def replan(self, changed_date: datetime.date, current_schedules: Iterable,
+               horizon_end: datetime.date, loop_index: int = 0,
+               previous_schedules: Optional[Iterable] = None,
+               until: Optional[datetime.date] = None,
+               previous_loop_index: Optional[int] = None) -> ScheduleDelta:
+        """
+        :param current_schedules: stored rows from the Monday of changed_date's week
+                                  through horizon_end, already including the change
+                                  (Schedule-like objects or (date, user_id, is_locked) rows)
+        :param loop_index: loop cursor at that Monday (only used without an anchor)
+        :param previous_schedules: the same rows before the change; without an
+                                   anchor they tell where the stored plan's cursor
+                                   was, and weeks they do not reproduce with the cyclic
+                                   rules keep their rows. If omitted, every week is
+                                   re-planned and re-planning runs to horizon_end.
+        :param until: re-plan at least through this date (later changed days of the week)
+        :param previous_loop_index: the stored plan's cursor at that Monday, if it
+                                    differs from loop_index (only used without an anchor)
+        :return: inserts/deletes/lock flips that turn current_schedules into the new plan
+        """
+        scheduler = self.scheduler
+        week_start = changed_date - datetime.timedelta(days=changed_date.weekday())
+        last_sunday = horizon_end + datetime.timedelta(days=6 - horizon_end.weekday())
+
+        current_by_date, locked_slots, closed = self._fixed_points(
+            self._rows(current_schedules), week_start, last_sunday)
+
+        pool_size = len(scheduler.compiled.loop_pool)
+        has_anchor = scheduler.compiled.loop_start_date is not None
+        scheduler.new_loop_index = scheduler._calculate_anchor_loop_index(week_start) if has_anchor else loop_index
+        is_odd_week_human = scheduler._is_odd_rotation_week(week_start)
+
+        # Replays the stored plan next to the new one: tells whether the cyclic
+        # rules made a week, and without an anchor where its loop cursor was
+        shadow = None
+        if previous_schedules is not None:
+            shadow = Scheduler(self.users, week_start,
+                               loop_index=loop_index if previous_loop_index is None else previous_loop_index,
+                               compiled_rules=scheduler.compiled)
+            previous_by_date, previous_locked, previous_closed = self._fixed_points(
+                self._rows(previous_schedules), week_start, last_sunday)
+
+        old_rows = []
+        new_rows = []
+        first_day = changed_date
+        while week_start <= horizon_end:
+            week_end = min(week_start + datetime.timedelta(days=6), horizon_end)
+            if has_anchor:
+                scheduler.new_loop_index = scheduler._calculate_anchor_loop_index(week_start)
+                if shadow is not None:
+                    shadow.new_loop_index = scheduler.new_loop_index
+            week_schedules = scheduler._fill_week(week_start, locked_slots, is_odd_week_human, closed)
+
+            # Days before the change in the first week keep their draws
+            week_new = self._rows(s for s in week_schedules if first_day <= s.date <= week_end)
+            week_old = []
+            d = first_day
+            while d <= week_end:
+                week_old.extend(current_by_date.get(d, []))
+                d += datetime.timedelta(days=1)
+
+            cyclic = True
+            shadow_new = None
+            if shadow is not None:
+                shadow_week = self._rows(s for s in shadow._fill_week(
+                    week_start, previous_locked, is_odd_week_human, previous_closed) if s.date <= week_end)
+                stored_week = []
+                d = week_start
+                while d <= week_end:
+                    stored_week.extend(previous_by_date.get(d, []))
+                    d += datetime.timedelta(days=1)
+                cyclic = sorted(shadow_week) == sorted(stored_week)
+                shadow_new = [row for row in shadow_week if row[0] >= first_day]
+
+            if cyclic:
+                new_rows.extend(week_new)
+                old_rows.extend(week_old)
+            elif not has_anchor:
+                # Another engine made this week: it keeps its rows, and the
+                # cursor after it is unknown
+                break
+
+            if until is None or week_end >= until:
+                # Anchored cursor realigns at the next Monday
+                if has_anchor:
+                    break
+                # Otherwise stop once a regenerated week reproduces the stored plan
+                # with the same cursor (with duplicate pool codes equal output alone
+                # does not mean the cursors agree)
+                if shadow is not None:
+                    aligned = not pool_size or (scheduler.new_loop_index - shadow.new_loop_index) % pool_size == 0
+                    if aligned and sorted(week_new) == sorted(week_old) == sorted(shadow_new):
+                        break
+
+            week_start += datetime.timedelta(days=7)
+            first_day = week_start
+            is_odd_week_human = not is_odd_week_human
+
+        return ScheduleDelta.between(old_rows, new_rows)
+
+    def _cursor_at(self, rows: List[ScheduleRow], week_start: datetime.date, monday: datetime.date,
+                   loop_index: int) -> int:
+        """Loop cursor at monday of the cyclic plan with these fixed points, from loop_index at week_start"""
+        _, locked_slots, closed = self._fixed_points(rows, week_start, monday - datetime.timedelta(days=1))
+        replay = Scheduler(self.users, week_start, loop_index=loop_index, compiled_rules=self.scheduler.compiled)
+        is_odd_week_human = replay._is_odd_rotation_week(week_start)
+        while week_start < monday:
+            replay._fill_week(week_start, locked_slots, is_odd_week_human, closed)
+            week_start += datetime.timedelta(days=7)
+            is_odd_week_human = not is_odd_week_human
+        return replay.new_loop_index
+
+    @staticmethod
+    def _rows(schedules: Iterable) -> List[ScheduleRow]:
+        return [s if isinstance(s, tuple) else (s.date, s.user_id, bool(s.is_locked)) for s in schedules]
+
+    def _fixed_points(self, rows: List[ScheduleRow], start: datetime.date, end: datetime.date
+                      ) -> Tuple[Dict[datetime.date, List[ScheduleRow]], Dict[datetime.date, List[str]], Set[datetime.date]]:
+        """Rows by date, locked user codes by date, and the hand-edited (closed) days in [start, end]"""
+        by_date = defaultdict(list)
+        for row in rows:
+            if start <= row[0] <= end:
+                by_date[row[0]].append(row)
+
+        locked_slots = defaultdict(list)
+        closed = set()
+        d = start
+        while d <= end:
+            day_rows = by_date.get(d, [])
+            for _, uid, locked in day_rows:
+                if locked and uid in self.code_by_id:
+                    locked_slots[d].append(self.code_by_id[uid])
+            if all(locked for _, _, locked in day_rows):
+                closed.add(d)
+            d += datetime.timedelta(days=1)
+        return by_date, locked_slots, closed
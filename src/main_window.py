@@ -2,7 +2,7 @@ import datetime
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                              QAction, QSplitter, QMessageBox, QToolBar, QLabel,
                              QProgressDialog, QFileDialog, QStackedWidget, QFrame, QPushButton, QMenu)
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QSize, QPoint
+from PyQt5.QtCore import Qt, QThread, QObject, pyqtSignal, QSize, QPoint
 from PyQt5.QtGui import QIcon, QFont
 
 from src.db_manager import DBManager
@@ -14,6 +14,14 @@ from src.settings_view import SettingsView
 from src.system_settings import SystemSettingsDialog
 from src.exporter import Exporter
 from src.models import Schedule
+from src.schedule_window import ScheduleWindow
+from src.schedule_delta import ScheduleDelta
+from src.db_writer import DBWriter
+from src.incremental_planner import IncrementalPlanner
+from src.rules_manager import RulesManager
+
+# 多年连续排班的年数 (周数达到 PARALLEL_MIN_WEEKS 时按年分块并行生成)
+MULTI_YEAR_SCHEDULE_YEARS = 5
 
 class SchedulerWorker(QThread):
     finished = pyqtSignal(list)
@@ -36,6 +44,7 @@ class SchedulerWorker(QThread):
             import datetime
             from src.scheduler import Scheduler
             from src.rules_manager import RulesManager
+            from src.parallel_scheduler import generate_range_parallel, PARALLEL_MIN_WEEKS
             
             all_new_schedules = []
             
@@ -48,22 +57,46 @@ class SchedulerWorker(QThread):
             
             warnings = []
             
-            # 遍历指定的所有周起始日期
-            for week_start in self.target_week_starts:
-                # Filter existing schedules for this week
-                week_end = week_start + datetime.timedelta(days=7)
-                week_existing = [
-                    s for s in self.existing_schedules 
-                    if week_start <= s.date < week_end
-                ]
-                
-                # Init Scheduler with new signature
-                scheduler = Scheduler(self.users, week_start, loop_index=current_loop_index, rules=rules)
-                week_new_schedules = scheduler.generate_schedule(week_existing, mode=self.mode)
+            # 排班引擎：默认按规则循环；"constraint" 为考虑人员偏好的约束求解模式；
+            # "balanced" 按历史值班数/周末数/间隔天数均衡分配循环班次；"probabilistic" 为概率模式
+            scheduler_cls = Scheduler
+            scheduler_kwargs = {}
+            if self.mode == "constraint":
+                from src.constraint_scheduler import ConstraintScheduler
+                scheduler_cls = ConstraintScheduler
+            elif self.mode == "balanced":
+                from src.balanced_scheduler import BalancedScheduler
+                scheduler_cls = BalancedScheduler
+                scheduler_kwargs = {
+                    "history_counts": self.history_counts,
+                    "weekend_history_counts": self.weekend_history_counts,
+                    "last_duty_dates": self.last_duty_dates,
+                }
+            elif self.mode == "probabilistic":
+                from src.probabilistic_scheduler import ProbabilisticScheduler
+                scheduler_cls = ProbabilisticScheduler
+                scheduler_kwargs = {
+                    "history_counts": self.history_counts,
+                    "weekend_history_counts": self.weekend_history_counts,
+                }
+            
+            # 一次性生成所有目标周 (target_week_starts 为连续的周一)
+            if scheduler_cls is Scheduler and len(self.target_week_starts) >= PARALLEL_MIN_WEEKS:
+                # 多年排班：按年分块，使用多进程并行生成
+                all_new_schedules, current_loop_index = generate_range_parallel(
+                    self.users, rules, self.target_week_starts, self.existing_schedules,
+                    loop_index=current_loop_index)
+            elif self.target_week_starts:
+                first_monday = self.target_week_starts[0]
+                last_sunday = self.target_week_starts[-1] + datetime.timedelta(days=6)
                 
-                all_new_schedules.extend(week_new_schedules)
+                scheduler = scheduler_cls(self.users, first_monday, loop_index=current_loop_index, rules=rules,
+                                          **scheduler_kwargs)
+                all_new_schedules = scheduler.generate_range(
+                    first_monday, last_sunday, self.existing_schedules, mode=self.mode)
+                warnings.extend(getattr(scheduler, "warnings", []))
                 
-                # Update loop index for next week
+                # Update loop index for next run
                 current_loop_index = scheduler.new_loop_index
 
             # Save final state
@@ -79,6 +112,11 @@ class SchedulerWorker(QThread):
             traceback.print_exc()
             self.error.emit(str(e))
 
+class DBWriterBridge(QObject):
+    """Re-emits DBWriter callbacks (writer thread) as signals handled on the GUI thread"""
+    completed = pyqtSignal(object, object)
+    failed = pyqtSignal(object, str)
+
 class SidebarButton(QPushButton):
     def __init__(self, text, icon_name=None, parent=None):
         super().__init__(text, parent)
@@ -102,10 +140,25 @@ class MainWindow(QMainWindow):
         # Init DB
         self.db_manager = DBManager()
         self.users = self.db_manager.get_all_users()
-        self.schedules = self.db_manager.get_all_schedules()
         
-        # Link user objects to schedules
-        self._bind_users_to_schedules()
+        # Schedules are loaded per month window (visible calendar page, selected stats year)
+        self.schedule_window = ScheduleWindow(self.db_manager, self.users)
+
+        # Schedule writes run on a background thread; results come back as signals
+        self.db_writer_bridge = DBWriterBridge(self)
+        self.db_writer_bridge.completed.connect(self.on_write_completed)
+        self.db_writer_bridge.failed.connect(self.on_write_failed)
+        self.db_writer = DBWriter(self.db_manager,
+                                  on_done=self.db_writer_bridge.completed.emit,
+                                  on_failed=self.db_writer_bridge.failed.emit)
+        self.db_writer.start()
+        # Calendar edits waiting to be re-planned (one write in flight at a time)
+        self._pending_edits = []
+        self._edit_in_flight = False
+        # Submitted writes whose result has not reached the GUI thread yet, and
+        # callbacks waiting for them (see run_after_writes)
+        self._writes_in_flight = 0
+        self._after_writes = []
 
         self.init_ui()
         
@@ -114,11 +167,11 @@ class MainWindow(QMainWindow):
         self.calendar_view.user_removed.connect(self.handle_user_removed)
         self.calendar_view.day_cleared.connect(self.handle_day_cleared)
 
-    def _bind_users_to_schedules(self):
-        user_map = {u.id: u for u in self.users}
-        for s in self.schedules:
-            if s.user_id in user_map:
-                s.user = user_map[s.user_id]
+    def _calendar_schedules(self, start_date, end_date):
+        """CalendarView 数据源：加载可见的 6 周，并预取前后各一个月"""
+        schedules = self.schedule_window.get_range(start_date, end_date)
+        self.schedule_window.prefetch(start_date, end_date)
+        return schedules
 
     def init_ui(self):
         self.central_widget = QWidget()
@@ -231,7 +284,8 @@ class MainWindow(QMainWindow):
         self.stacked_widget.addWidget(self.settings_view)
 
         # Page 2: Stats View
-        self.stats_view = StatsView(self.users, self.schedules)
+        # Charts are aggregated in SQLite, so opening the tab loads no schedule rows
+        self.stats_view = StatsView(self.users, [], self.db_manager, backend="sql")
         self.stacked_widget.addWidget(self.stats_view)
         
     def init_header(self):
@@ -379,7 +433,8 @@ class MainWindow(QMainWindow):
         
         # Center: Calendar (Takes full space now)
         self.calendar_view = CalendarView()
-        self.calendar_view.update_schedule(self.schedules)
+        self.calendar_view.schedule_provider = self._calendar_schedules
+        self.calendar_view.refresh_calendar()
         layout.addWidget(self.calendar_view)
 
     def switch_view(self, index):
@@ -405,7 +460,7 @@ class MainWindow(QMainWindow):
                 self.settings_view.load_users()
             elif index == 2:
                 self.settings_action_container.setVisible(False)
-                self.stats_view.update_data(self.schedules, self.users)
+                self.stats_view.update_data(None, self.users)
 
     def switch_settings_tab(self, tab_index):
         if hasattr(self, 'settings_view'):
@@ -422,7 +477,7 @@ class MainWindow(QMainWindow):
         self.switch_view(2)
 
     def open_system_settings(self):
-        dialog = SystemSettingsDialog(self)
+        dialog = SystemSettingsDialog(self, db_manager=self.db_manager)
         dialog.exec_()
 
     def _get_mondays_of_month(self, year, month):
@@ -466,12 +521,18 @@ class MainWindow(QMainWindow):
             
         return mondays
 
-    def on_schedule_year_clicked(self):
+    def on_schedule_year_clicked(self, checked=False, mode="all"):
         year = self.calendar_view.current_date.year
         mondays = self._get_mondays_of_year(year)
-        self.auto_schedule_range(mondays, f"{year}年全年")
+        self.auto_schedule_range(mondays, f"{year}年全年", mode=mode)
 
-    def on_schedule_month_clicked(self):
+    def on_schedule_years_clicked(self, checked=False, years=MULTI_YEAR_SCHEDULE_YEARS):
+        year = self.calendar_view.current_date.year
+        # Weeks spanning New Year belong to both years
+        mondays = sorted({m for y in range(year, year + years) for m in self._get_mondays_of_year(y)})
+        self.auto_schedule_range(mondays, f"{year}-{year + years - 1}年")
+
+    def on_schedule_month_clicked(self, checked=False, mode="all"):
         year = self.calendar_view.current_date.year
         month = self.calendar_view.current_date.month
         mondays = self._get_mondays_of_month(year, month)
@@ -499,10 +560,23 @@ class MainWindow(QMainWindow):
         #     self.auto_schedule_range(mondays, f"{year}年{month}月 (补齐)", mode="fill_rest")
 
         # Simplify to One-Click Full Schedule
-        self.auto_schedule_range(mondays, f"{year}年{month}月", mode="all")
+        self.auto_schedule_range(mondays, f"{year}年{month}月", mode=mode)
 
     def show_year_context_menu(self, pos):
         menu = QMenu(self)
+        action_constraint = QAction("按人员偏好排班 (本年)", self)
+        action_constraint.triggered.connect(lambda: self.on_schedule_year_clicked(mode="constraint"))
+        menu.addAction(action_constraint)
+        action_balanced = QAction("均衡排班 (本年)", self)
+        action_balanced.triggered.connect(lambda: self.on_schedule_year_clicked(mode="balanced"))
+        menu.addAction(action_balanced)
+        action_probabilistic = QAction("概率排班 (本年)", self)
+        action_probabilistic.triggered.connect(lambda: self.on_schedule_year_clicked(mode="probabilistic"))
+        menu.addAction(action_probabilistic)
+        action_years = QAction(f"连续排班 (本年起 {MULTI_YEAR_SCHEDULE_YEARS} 年)", self)
+        action_years.triggered.connect(lambda: self.on_schedule_years_clicked())
+        menu.addAction(action_years)
+        menu.addSeparator()
         action_clear = QAction("清除本年排班", self)
         action_clear.triggered.connect(self.clear_year_schedule)
         menu.addAction(action_clear)
@@ -510,6 +584,16 @@ class MainWindow(QMainWindow):
 
     def show_month_context_menu(self, pos):
         menu = QMenu(self)
+        action_constraint = QAction("按人员偏好排班 (本月)", self)
+        action_constraint.triggered.connect(lambda: self.on_schedule_month_clicked(mode="constraint"))
+        menu.addAction(action_constraint)
+        action_balanced = QAction("均衡排班 (本月)", self)
+        action_balanced.triggered.connect(lambda: self.on_schedule_month_clicked(mode="balanced"))
+        menu.addAction(action_balanced)
+        action_probabilistic = QAction("概率排班 (本月)", self)
+        action_probabilistic.triggered.connect(lambda: self.on_schedule_month_clicked(mode="probabilistic"))
+        menu.addAction(action_probabilistic)
+        menu.addSeparator()
         action_clear = QAction("清除本月排班", self)
         action_clear.triggered.connect(self.clear_month_schedule)
         menu.addAction(action_clear)
@@ -524,9 +608,10 @@ class MainWindow(QMainWindow):
                 return
             start_date = mondays[0]
             end_date = mondays[-1] + datetime.timedelta(days=6)
-            self.db_manager.clear_range_schedules(start_date, end_date, keep_locked=False)
-            self.reload_data()
-            self.show_custom_message("成功", "本年排班已清除", QMessageBox.Information)
+            self.submit_write(
+                "clear_range_schedules", start_date, end_date, keep_locked=False,
+                error="清除排班失败",
+                on_done=lambda delta: self.show_custom_message("成功", "本年排班已清除", QMessageBox.Information))
 
     def clear_month_schedule(self):
         year = self.calendar_view.current_date.year
@@ -538,9 +623,10 @@ class MainWindow(QMainWindow):
                 return
             start_date = mondays[0]
             end_date = mondays[-1] + datetime.timedelta(days=6)
-            self.db_manager.clear_range_schedules(start_date, end_date, keep_locked=False)
-            self.reload_data()
-            self.show_custom_message("成功", "本月排班已清除", QMessageBox.Information)
+            self.submit_write(
+                "clear_range_schedules", start_date, end_date, keep_locked=False,
+                error="清除排班失败",
+                on_done=lambda delta: self.show_custom_message("成功", "本月排班已清除", QMessageBox.Information))
 
     def auto_schedule_range(self, target_week_starts, label_text, mode="all"):
         if not self.users:
@@ -553,6 +639,17 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "提示", "所选时间范围内没有需要排班的周。")
             return
 
+        # Show progress dialog
+        self.progress_dialog = QProgressDialog(f"正在生成排班方案 ({label_text})...", "取消", 0, 0, self)
+        self.progress_dialog.setWindowModality(Qt.WindowModal)
+        self.progress_dialog.setCancelButton(None) 
+        self.progress_dialog.show()
+
+        # Queued writes (e.g. a calendar edit just made) must reach the database
+        # and the schedule window before the locks and history are read
+        self.run_after_writes(lambda: self._start_scheduler_worker(target_week_starts, mode))
+
+    def _start_scheduler_worker(self, target_week_starts, mode):
         # Get history counts & last duty dates for advanced rules
         history_counts = self.db_manager.get_history_counts()
         last_duty_dates = self.db_manager.get_last_duty_dates()
@@ -572,14 +669,12 @@ class MainWindow(QMainWindow):
              for u_code in weekend_users:
                  initial_last_weekend_duty[u_code] = True
         
-        # Show progress dialog
-        self.progress_dialog = QProgressDialog(f"正在生成排班方案 ({label_text})...", "取消", 0, 0, self)
-        self.progress_dialog.setWindowModality(Qt.WindowModal)
-        self.progress_dialog.setCancelButton(None) 
-        self.progress_dialog.show()
+        # Existing schedules in the target weeks act as locks
+        existing_schedules = self.schedule_window.get_range(
+            target_week_starts[0], target_week_starts[-1] + datetime.timedelta(days=6))
 
         # Start worker thread
-        self.worker = SchedulerWorker(self.users, history_counts, last_duty_dates, self.schedules, target_week_starts, initial_last_weekend_duty, weekend_history_counts, mode=mode)
+        self.worker = SchedulerWorker(self.users, history_counts, last_duty_dates, existing_schedules, target_week_starts, initial_last_weekend_duty, weekend_history_counts, mode=mode)
         self.worker.finished.connect(self.on_schedule_finished)
         self.worker.error.connect(self.on_schedule_error)
         self.worker.warning.connect(self.on_schedule_warning)
@@ -597,16 +692,11 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "排班结果", "未能生成排班方案，或者生成结果为空。请检查人员约束条件。")
             return
 
-        try:
-            # Use atomic replacement to avoid DB locks and ensure consistency
-            self.db_manager.replace_schedules(new_schedules)
-            
-            # Refresh Memory
-            self.reload_data()
-            self.show_custom_message("成功", "排班完成！", QMessageBox.Information)
-            
-        except Exception as e:
-            self.show_custom_message("错误", f"保存排班数据时出错: {str(e)}", QMessageBox.Critical)
+        # Atomic replacement on the writer thread; only the changed days are repainted
+        self.submit_write(
+            "replace_schedules", new_schedules,
+            error="保存排班数据时出错",
+            on_done=lambda delta: self.show_custom_message("成功", "排班完成！", QMessageBox.Information))
 
     def on_schedule_error(self, error_msg):
         self.progress_dialog.close()
@@ -675,13 +765,11 @@ class MainWindow(QMainWindow):
         if file_path:
             try:
                 # Filter schedules strictly for the selected month
-                target_schedules = [
-                    s for s in self.schedules 
-                    if s.date.year == year and s.date.month == month
-                ]
+                target_schedules = self.schedule_window.get_month(year, month)
                 
                 # Sort by ID to ensure deterministic order for same-day shifts
-                target_schedules.sort(key=lambda s: s.id if s.id else 0)
+                # (rows added since the month was loaded have no id yet and go last)
+                target_schedules.sort(key=lambda s: (s.id is None, s.id or 0))
                 
                 exporter = Exporter(target_schedules, self.users)
                 # Pass year and month for title generation
@@ -694,44 +782,134 @@ class MainWindow(QMainWindow):
                 self.show_custom_message("导出失败", str(e), QMessageBox.Critical)
 
     def handle_manual_drop(self, date, user_id, user_code, source_date=None):
-        # Callback from CalendarView when a user is dropped
-        try:
-            # 1. Handle Move (if source_date is provided)
-            if source_date:
-                self.db_manager.delete_schedule(source_date, user_id)
-            
-            # 2. Add to target date
-            # add_schedule handles existence check internally
-            self.db_manager.add_schedule(date, user_id, is_locked=True)
-            
-            self.reload_data()
-            
-        except Exception as e:
-            QMessageBox.critical(self, "错误", f"更新排班失败: {str(e)}")
+        # Callback from CalendarView when a user is dropped (locked on the target day)
+        # A move (source_date given) also removes the user from the source day
+        user_id = int(user_id)
+        deletes = [(source_date, user_id)] if source_date and source_date != date else []
+        self.submit_manual_edit(ScheduleDelta(inserts=[(date, user_id, True)], deletes=deletes),
+                                error="更新排班失败")
 
     def handle_user_removed(self, date, user_id):
-        try:
-            self.db_manager.delete_schedule(date, user_id)
-            self.reload_data()
-        except Exception as e:
-            QMessageBox.critical(self, "错误", f"删除人员失败: {str(e)}")
+        self.submit_manual_edit(ScheduleDelta(deletes=[(date, int(user_id))]), error="删除人员失败")
 
     def handle_day_cleared(self, date):
+        deletes = [(s.date, s.user_id) for s in self.schedule_window.get_range(date, date)]
+        self.submit_manual_edit(ScheduleDelta(deletes=deletes), error="清除排班失败")
+
+    def submit_manual_edit(self, edit, error):
+        """
+        Queue a calendar edit. Each edit is re-planned (see plan_manual_edit)
+        against the schedule window, so it waits until the previous edit's
+        write has been applied there.
+        """
+        self._pending_edits.append((edit, error))
+        self._next_manual_edit()
+
+    def _next_manual_edit(self):
+        if self._edit_in_flight or not self._pending_edits:
+            return
+        edit, error = self._pending_edits.pop(0)
         try:
-            self.db_manager.delete_day_schedule(date)
-            self.reload_data()
+            delta = self.plan_manual_edit(edit)
         except Exception as e:
-            QMessageBox.critical(self, "错误", f"清除排班失败: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            self.show_custom_message("错误", f"{error}: {e}", QMessageBox.Critical)
+            self._next_manual_edit()
+            return
+        if delta.is_empty():
+            self._next_manual_edit()
+            return
+        self._edit_in_flight = True
+        self.submit_write("apply_schedule_delta", delta, error=error,
+                          on_done=self._manual_edit_finished, on_failed=self._manual_edit_finished)
+
+    def _manual_edit_finished(self, *args):
+        self._edit_in_flight = False
+        self._next_manual_edit()
+
+    def plan_manual_edit(self, edit):
+        """
+        The edit plus the re-plan of the unlocked days after it, as one change set.
+        With loop_start_date the loop cursor realigns every Monday, so only the
+        edited weeks are re-planned; without it the stored plan's cursor is not
+        known and the edit is written as is. Weeks made by another engine
+        (constraint, balanced, probabilistic) also take the edit as is.
+        """
+        dates = edit.touched_dates()
+        monday = dates[0] - datetime.timedelta(days=dates[0].weekday())
+        horizon_end = dates[-1] + datetime.timedelta(days=6 - dates[-1].weekday())
+        stored = self.schedule_window.get_range(monday, horizon_end)
+        planner = IncrementalPlanner(self.users, rules=RulesManager.load_rules())
+        return planner.plan_edit(edit, stored, horizon_end, loop_index=None)
+
+    def submit_write(self, method, *args, error="数据库写入失败", on_done=None, on_failed=None, **kwargs):
+        """
+        Queue a DBManager schedule write; on_done(result) runs on the GUI thread
+        after it commits, on_failed(message) after the error has been shown
+        """
+        self.db_writer.submit(method, *args, context={"error": error, "on_done": on_done, "on_failed": on_failed},
+                              **kwargs)
+        self._writes_in_flight += 1
+
+    def run_after_writes(self, callback):
+        """
+        Run callback on the GUI thread once every submitted write, queued
+        calendar edits included, has been applied to the schedule window
+        """
+        self._after_writes.append(callback)
+        self._run_after_writes()
+
+    def _run_after_writes(self):
+        while self._after_writes and not (self._writes_in_flight or self._pending_edits or self._edit_in_flight):
+            self._after_writes.pop(0)()
+
+    def on_write_completed(self, command, result):
+        self._writes_in_flight -= 1
+        if isinstance(result, ScheduleDelta):
+            self.apply_schedule_delta(result)
+        on_done = command.context.get("on_done")
+        if on_done:
+            on_done(result)
+        self._run_after_writes()
+
+    def on_write_failed(self, command, message):
+        self._writes_in_flight -= 1
+        error = command.context.get("error", "数据库写入失败")
+        self.show_custom_message("错误", f"{error}: {message}", QMessageBox.Critical)
+        on_failed = command.context.get("on_failed")
+        if on_failed:
+            on_failed(message)
+        self._run_after_writes()
+
+    def closeEvent(self, event):
+        # Let queued writes finish before the window goes away
+        self.db_writer.stop()
+        super().closeEvent(event)
+
+    def apply_schedule_delta(self, delta):
+        """
+        Apply a change set returned by a DBManager write to the in-memory
+        schedule window and repaint only the touched calendar cells.
+        Users are unchanged, so unlike reload_data nothing else is reloaded.
+        """
+        dates = self.schedule_window.apply_delta(delta)
+        if not dates:
+            return
+        visible = [d for d in dates if d in self.calendar_view.cells]
+        if visible:
+            self.calendar_view.update_days({d: self.schedule_window.get_range(d, d) for d in visible})
+        self.stats_view.invalidate_dates(dates)
 
     def reload_data(self):
         self.users = self.db_manager.get_all_users()
-        self.schedules = self.db_manager.get_all_schedules()
-        self._bind_users_to_schedules()
+        self.schedule_window.invalidate()
+        self.schedule_window.set_users(self.users)
         
         # Update Views
         self.staff_panel.refresh_list(self.users)
-        self.calendar_view.update_schedule(self.schedules)
+        self.calendar_view.refresh_calendar()
         self.settings_view.update_data(self.users)
         # Settings and Stats update on view switch or manually
         if self.stacked_widget.currentIndex() == 2:
-             self.stats_view.update_data(self.schedules, self.users)
+             self.stats_view.update_data(None, self.users)
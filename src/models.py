@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, Enum as SQLEnum, ForeignKey, Boolean, JSON
+from sqlalchemy import Column, Integer, String, Date, Enum as SQLEnum, ForeignKey, Boolean, JSON, Index, Computed, text
 from sqlalchemy.orm import declarative_base, relationship
 from src.consts import GroupType
 
@@ -41,8 +41,55 @@ class Schedule(Base):
     date = Column(Date, nullable=False)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     is_locked = Column(Boolean, default=False)
+
+    # Calendar fields derived from date by SQLite (VIRTUAL generated columns,
+    # so existing rows need no backfill and every write path stays consistent).
+    # weekday follows Python: 0=Mon ... 6=Sun. ISO fields use the Thursday of the week.
+    weekday = Column(Integer, Computed("(CAST(strftime('%w', date) AS INTEGER) + 6) % 7", persisted=False))
+    year = Column(Integer, Computed("CAST(strftime('%Y', date) AS INTEGER)", persisted=False))
+    month = Column(Integer, Computed("CAST(strftime('%m', date) AS INTEGER)", persisted=False))
+    iso_year = Column(Integer, Computed("CAST(strftime('%Y', date, '-3 days', 'weekday 4') AS INTEGER)",
+                                        persisted=False))
+    iso_week = Column(Integer, Computed("(CAST(strftime('%j', date, '-3 days', 'weekday 4') AS INTEGER) - 1) / 7 + 1",
+                                        persisted=False))
     
     user = relationship("User")
 
+    __table_args__ = (
+        # One row per person per day; also the conflict target for bulk upserts
+        # Also serves date-range filters, since date is its leading column
+        Index('uq_schedules_date_user', 'date', 'user_id', unique=True),
+        # Per-user history: counts / last duty date grouped by user
+        Index('ix_schedules_user_date', 'user_id', 'date'),
+        # Locked rows only (fixed points for re-planning)
+        Index('ix_schedules_locked_date', 'date', sqlite_where=text('is_locked = 1')),
+        # Monthly / annual counts per user
+        Index('ix_schedules_year_month_user', 'year', 'month', 'user_id'),
+        # Weekend counts per user (weekday >= 5)
+        Index('ix_schedules_year_weekday_user', 'year', 'weekday', 'user_id'),
+        Index('ix_schedules_iso_week', 'iso_year', 'iso_week'),
+    )
+
     def __repr__(self):
         return f"<Schedule(date={self.date}, user={self.user.code})>"
+
+class UserDutyStats(Base):
+    """
+    Per-user, per-year duty aggregates over schedules.
+    Maintained by SQLite triggers on schedules (see DBManager.init_db),
+    so history lookups read O(users x years) rows instead of every schedule.
+    """
+    __tablename__ = 'user_duty_stats'
+
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    year = Column(Integer, primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    weekend = Column(Integer, nullable=False, default=0) # Saturday + Sunday
+    last_duty_date = Column(Date, nullable=True)
+
+    __table_args__ = (
+        Index('ix_user_duty_stats_year', 'year'),
+    )
+
+    def __repr__(self):
+        return f"<UserDutyStats(user_id={self.user_id}, year={self.year}, total={self.total})>"
@@ -0,0 +1,401 @@
+import datetime
+import numpy as np
+from typing import List, Dict, Any, Optional, Tuple
+from src.models import User, Schedule
+from src.scheduler import VectorizedScheduler
+from src.rules_manager import CompiledRules
+from src.consts import FIXED_HOLIDAYS
+from src import fairness
+
+
+class AliasTable:
+    """
+    Walker alias table over n outcomes.
+
+    Outcomes are split into blocks of block_size, each with its own alias table,
+    plus a top-level table over the block totals. Changing a few weights only
+    rebuilds the touched blocks and the (n / block_size) top level.
+    Sampling is vectorized: two uniform draws per level.
+    """
+    def __init__(self, weights: np.ndarray, block_size: int = 64):
+        self.weights = np.asarray(weights, dtype=np.float64).copy()
+        self.n = len(self.weights)
+        self.block_size = max(1, block_size)
+        self.n_blocks = max(1, -(-self.n // self.block_size))
+
+        self.block_prob = np.zeros((self.n_blocks, self.block_size))
+        self.block_alias = np.zeros((self.n_blocks, self.block_size), dtype=np.int64)
+        self.block_len = np.zeros(self.n_blocks, dtype=np.int64)
+        self.block_total = np.zeros(self.n_blocks)
+        for b in range(self.n_blocks):
+            self._build_block(b)
+        self._build_top()
+
+    @staticmethod
+    def build(weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Vose's O(n) construction. Returns (prob, alias)."""
+        n = len(weights)
+        prob = np.ones(n)
+        alias = np.arange(n, dtype=np.int64)
+        total = float(np.sum(weights))
+        if n == 0 or total <= 0:
+            return prob, alias
+
+        scaled = np.asarray(weights, dtype=np.float64) * n / total
+        small = [i for i in range(n) if scaled[i] < 1.0]
+        large = [i for i in range(n) if scaled[i] >= 1.0]
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            prob[s] = scaled[s]
+            alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            if scaled[l] < 1.0:
+                small.append(l)
+            else:
+                large.append(l)
+        # Leftovers are 1 up to rounding
+        for i in small + large:
+            prob[i] = 1.0
+        return prob, alias
+
+    def _build_block(self, b: int):
+        lo = b * self.block_size
+        w = self.weights[lo:lo + self.block_size]
+        prob, alias = self.build(w)
+        self.block_len[b] = len(w)
+        self.block_prob[b, :len(w)] = prob
+        self.block_alias[b, :len(w)] = alias
+        self.block_total[b] = w.sum()
+
+    def _build_top(self):
+        self.top_prob, self.top_alias = self.build(self.block_total)
+        self.total = float(self.block_total.sum())
+
+    def update(self, indices, weights):
+        """Set new weights for some outcomes and rebuild only their blocks."""
+        indices = np.atleast_1d(np.asarray(indices, dtype=np.int64))
+        self.weights[indices] = weights
+        for b in np.unique(indices // self.block_size).tolist():
+            self._build_block(b)
+        self._build_top()
+
+    def sample(self, rng: np.random.Generator, size) -> np.ndarray:
+        """Draw outcome indices of the given shape; -1 if every weight is zero."""
+        if self.total <= 0:
+            return np.full(size, -1, dtype=np.int64)
+        u = rng.random((4,) + (size if isinstance(size, tuple) else (size,)))
+
+        block = np.minimum((u[0] * self.n_blocks).astype(np.int64), self.n_blocks - 1)
+        block = np.where(u[1] < self.top_prob[block], block, self.top_alias[block])
+
+        length = self.block_len[block]
+        slot = np.minimum((u[2] * length).astype(np.int64), length - 1)
+        slot = np.where(u[3] < self.block_prob[block, slot], slot, self.block_alias[block, slot])
+        return block * self.block_size + slot
+
+
+class ProbabilisticScheduler(VectorizedScheduler):
+    """
+    概率模式: loop slots are drawn at random instead of walking the pool.
+
+    Locked slots and fixed/rotation rules are applied as usual and Sunday copies
+    Saturday. Each pool user's weight for a weekday is
+        exp(deficit / TEMPERATURE) * (PREFERRED_FACTOR if the weekday is preferred)
+    where deficit is how far the user's duty count lies below the others
+    (history_counts plus shifts drawn so far); Saturday also uses the weekend
+    count. Blackout/unavailable dates and avoided holidays reject a draw.
+
+    generate_range draws week by week and updates the alias tables of users
+    whose counts changed. sample_plans draws many independent plans over a
+    horizon at once from fixed weights, for Monte Carlo comparison.
+    The RNG is seeded through `seed` so plans are reproducible.
+    """
+    TEMPERATURE = 2.0
+    PREFERRED_FACTOR = 3.0
+    MAX_REDRAWS = 32
+
+    def __init__(self, users: List[User], start_date: datetime.date,
+                 loop_index: int = 0, rules: Dict[str, Any] = None,
+                 compiled_rules: CompiledRules = None,
+                 history_counts: Dict[str, int] = None,
+                 weekend_history_counts: Dict[str, int] = None,
+                 seed: Optional[int] = None):
+        super().__init__(users, start_date, loop_index=loop_index, rules=rules,
+                         compiled_rules=compiled_rules)
+        self.rng = np.random.default_rng(seed)
+        self.warnings = []
+
+        self.pool = tuple(dict.fromkeys(self.compiled.loop_pool))
+        self.pool_pos = {id(u): i for i, u in enumerate(self.pool)}
+        self.pool_idx = np.array([self.user_index[id(u)] for u in self.pool], dtype=np.int64)
+        history_counts = history_counts or {}
+        weekend_history_counts = weekend_history_counts or {}
+        self.total_counts = np.array([history_counts.get(u.code, 0) for u in self.pool], dtype=np.float64)
+        self.weekend_counts = np.array([weekend_history_counts.get(u.code, 0) for u in self.pool], dtype=np.float64)
+
+        self.preference_factor = np.ones((7, len(self.pool)))
+        for pos, user in enumerate(self.pool):
+            prefs = user.preferences if isinstance(user.preferences, dict) else {}
+            for wd in prefs.get("preferred_weekdays") or prefs.get("preferred_days") or []:
+                if isinstance(wd, int) and 0 <= wd < 7:
+                    self.preference_factor[wd, pos] = self.PREFERRED_FACTOR
+
+        self.tables = None
+
+    # ------------------------------------------------------------------
+    # Weights
+    # ------------------------------------------------------------------
+    def _weights(self, weekday: int, positions: np.ndarray = None) -> np.ndarray:
+        if positions is None:
+            positions = np.arange(len(self.pool))
+        # Deficits are taken against a fixed reference, which only rescales every
+        # weight by the same factor, so an update touches just the changed users
+        exponent = (self._reference - self.total_counts[positions]) / self.TEMPERATURE
+        if weekday == 5:
+            exponent = exponent + (self._weekend_reference - self.weekend_counts[positions]) / self.TEMPERATURE
+        return np.exp(exponent) * self.preference_factor[weekday, positions]
+
+    def build_tables(self):
+        """(Re)build the Monday-Saturday alias tables from the current counts."""
+        self._reference = self.total_counts.min() if len(self.pool) else 0.0
+        self._weekend_reference = self.weekend_counts.min() if len(self.pool) else 0.0
+        self.tables = [AliasTable(self._weights(wd)) for wd in range(6)]
+
+    def _update_tables(self, positions: List[int]):
+        positions = np.unique(np.asarray(positions, dtype=np.int64))
+        if not len(positions):
+            return
+        # Counts only grow; renormalize before the weights underflow
+        if (self.total_counts.min() - self._reference) / self.TEMPERATURE > 300:
+            self.build_tables()
+            return
+        for wd, table in enumerate(self.tables):
+            table.update(positions, self._weights(wd, positions))
+
+    def _holiday_name(self, d: datetime.date) -> Optional[str]:
+        return FIXED_HOLIDAYS.get((d.month, d.day))
+
+    def compile_availability(self, horizon_start: datetime.date, n_days: int) -> np.ndarray:
+        """(days x pool) bool matrix, False where a user blocked the date."""
+        avail = np.ones((n_days, len(self.pool)), dtype=bool)
+        for pos, user in enumerate(self.pool):
+            prefs = user.preferences if isinstance(user.preferences, dict) else {}
+            for key in ("blackout_dates", "unavailable_dates"):
+                for date_str in prefs.get(key) or []:
+                    parsed = CompiledRules._parse_date(date_str)
+                    if parsed and 0 <= (parsed - horizon_start).days < n_days:
+                        avail[(parsed - horizon_start).days, pos] = False
+            avoid = set(prefs.get("avoid_holidays") or [])
+            if avoid:
+                for d in range(n_days):
+                    if self._holiday_name(horizon_start + datetime.timedelta(days=d)) in avoid:
+                        avail[d, pos] = False
+        return avail
+
+    # ------------------------------------------------------------------
+    # Sequential generation
+    # ------------------------------------------------------------------
+    def generate_range(self, start: datetime.date, end: datetime.date,
+                       existing_schedules: List[Schedule] = None, mode: str = "all") -> List[Schedule]:
+        self.warnings = []
+        week_start = start - datetime.timedelta(days=start.weekday())
+        if week_start > end:
+            return []
+        n_weeks = (end - week_start).days // 7 + 1
+        locked_slots = self._bucket_locked_slots(
+            existing_schedules, week_start, week_start + datetime.timedelta(weeks=n_weeks))
+
+        self.build_tables()
+        avail = self.compile_availability(week_start, n_weeks * 7)
+        rule_idx, need = self._rule_tables()
+        first_parity = 0 if self._is_odd_rotation_week(week_start) else 1
+        matrix = np.full((n_weeks * 7, CompiledRules.TARGET_COUNT), -1, dtype=np.int32)
+
+        for w in range(n_weeks):
+            parity = (first_parity + w) % 2
+            changed = []
+            for day_idx in range(7):
+                row = w * 7 + day_idx
+                current_date = week_start + datetime.timedelta(days=row)
+                chosen = self._locked_indices(locked_slots.get(current_date, ()))
+                if day_idx == 6:
+                    candidates = matrix[row - 1].tolist()
+                else:
+                    candidates = rule_idx[parity, day_idx].tolist()
+                for idx in candidates:
+                    if idx >= 0 and idx not in chosen and len(chosen) < CompiledRules.TARGET_COUNT:
+                        chosen.append(idx)
+
+                if day_idx < 6 and need[parity, day_idx] and len(chosen) < CompiledRules.TARGET_COUNT:
+                    drawn = self._draw_day(day_idx, chosen, avail[row])
+                    changed.extend(drawn)
+                    chosen.extend(int(self.pool_idx[pos]) for pos in drawn)
+                    self.new_loop_index += len(drawn)
+                    if len(chosen) < CompiledRules.TARGET_COUNT:
+                        self.warnings.append(f"{current_date} 循环池可排人员不足")
+
+                matrix[row, :len(chosen)] = chosen[:CompiledRules.TARGET_COUNT]
+                for idx in chosen:
+                    pos = self.pool_pos.get(id(self.users[idx]))
+                    if pos is not None:
+                        self.total_counts[pos] += 1
+                        if day_idx >= 5:
+                            self.weekend_counts[pos] += 1
+                        changed.append(pos)
+            self._update_tables(changed)
+
+        self.last_error = "\n".join(self.warnings) if self.warnings else None
+        return self.matrix_to_schedules(matrix, week_start, locked_slots)
+
+    def _locked_indices(self, codes) -> List[int]:
+        chosen = []
+        for code in codes:
+            user = self._get_user(code)
+            if user and self.user_index[id(user)] not in chosen:
+                chosen.append(self.user_index[id(user)])
+        return chosen
+
+    def _draw_day(self, day_idx: int, chosen: List[int], avail_row: np.ndarray) -> List[int]:
+        """Draw pool positions for the open slots of one day, rejecting taken/unavailable users."""
+        open_slots = CompiledRules.TARGET_COUNT - len(chosen)
+        taken = {self.pool_pos[id(self.users[idx])] for idx in chosen if id(self.users[idx]) in self.pool_pos}
+        drawn = []
+        for _ in range(self.MAX_REDRAWS):
+            for pos in self.tables[day_idx].sample(self.rng, open_slots).tolist():
+                if pos >= 0 and avail_row[pos] and pos not in taken:
+                    taken.add(pos)
+                    drawn.append(pos)
+                    if len(drawn) == open_slots:
+                        return drawn
+        # Rare: weights concentrated on unavailable users; fall back to the heaviest remaining
+        weights = self.tables[day_idx].weights * avail_row
+        for pos in np.argsort(-weights, kind="stable").tolist():
+            if len(drawn) == open_slots or weights[pos] <= 0:
+                break
+            if pos not in taken:
+                taken.add(pos)
+                drawn.append(pos)
+        return drawn
+
+    # ------------------------------------------------------------------
+    # Monte Carlo
+    # ------------------------------------------------------------------
+    def sample_plans(self, start: datetime.date, end: datetime.date, n_plans: int,
+                     existing_schedules: List[Schedule] = None) -> np.ndarray:
+        """
+        Draw n_plans independent plans for every week touching [start, end].
+        Returns an (n_plans x days x 2) int32 array of indices into self.users
+        (-1 = empty); row 0 is the Monday of start's week.
+        Weights are fixed at the current counts for the whole horizon, so all
+        draws are made at once and conflicts are redrawn in bulk.
+        """
+        target_count = CompiledRules.TARGET_COUNT
+        week_start = start - datetime.timedelta(days=start.weekday())
+        if week_start > end:
+            return np.full((n_plans, 0, target_count), -1, dtype=np.int32)
+        n_weeks = (end - week_start).days // 7 + 1
+        n_days = n_weeks * 7
+        locked_slots = self._bucket_locked_slots(
+            existing_schedules, week_start, week_start + datetime.timedelta(days=n_days))
+
+        self.build_tables()
+        avail = self.compile_availability(week_start, n_days)
+        rule_idx, need = self._rule_tables()
+        weekday = np.tile(np.arange(7), n_weeks)
+        first_parity = 0 if self._is_odd_rotation_week(week_start) else 1
+        parity = (first_parity + np.repeat(np.arange(n_weeks), 7)) % 2
+
+        base = rule_idx[parity, weekday]
+        day_need = need[parity, weekday].copy()
+        day_need[weekday == 6] = 0
+        locked_rows = np.array(sorted((d - week_start).days for d in locked_slots), dtype=np.int64)
+        for row in locked_rows.tolist():
+            chosen = self._locked_indices(locked_slots[week_start + datetime.timedelta(days=row)])
+            for idx in base[row].tolist():
+                if idx >= 0 and idx not in chosen and len(chosen) < target_count:
+                    chosen.append(idx)
+            base[row] = -1
+            base[row, :min(len(chosen), target_count)] = chosen[:target_count]
+            if weekday[row] < 6:
+                day_need[row] = target_count - min(len(chosen), target_count) if len(self.pool) else 0
+
+        plans = np.broadcast_to(base, (n_plans, n_days, target_count)).copy()
+        if len(self.pool):
+            user_avail = np.zeros((n_days, len(self.users)), dtype=bool)
+            user_avail[:, self.pool_idx] = avail
+
+            for slot in range(target_count):
+                # Fill slot `slot` (from the right) on days needing more than `slot` draws
+                col = target_count - 1 - slot
+                rows = np.nonzero(day_need > slot)[0]
+                if not len(rows):
+                    continue
+                for wd in range(6):
+                    wd_rows = rows[weekday[rows] == wd]
+                    if not len(wd_rows):
+                        continue
+                    table = self.tables[wd]
+                    pending = np.ones((n_plans, len(wd_rows)), dtype=bool)
+                    for _ in range(self.MAX_REDRAWS):
+                        if not pending.any():
+                            break
+                        plan_i, row_i = np.nonzero(pending)
+                        drawn = table.sample(self.rng, len(plan_i))
+                        users_drawn = np.where(drawn >= 0, self.pool_idx[np.maximum(drawn, 0)], -1)
+                        day_rows = wd_rows[row_i]
+                        other = plans[plan_i, day_rows, 1 - col] if target_count == 2 else -1
+                        ok = (users_drawn >= 0) & user_avail[day_rows, np.maximum(users_drawn, 0)] \
+                            & (users_drawn != other)
+                        plans[plan_i[ok], day_rows[ok], col] = users_drawn[ok]
+                        pending[plan_i[ok], row_i[ok]] = False
+                    if pending.any():
+                        plans[:, wd_rows, col] = np.where(pending, -1, plans[:, wd_rows, col])
+
+        # Sunday copies Saturday unless Sunday is locked
+        sundays = np.arange(6, n_days, 7)
+        free_sundays = sundays[~np.isin(sundays, locked_rows)]
+        plans[:, free_sundays] = plans[:, free_sundays - 1]
+        for row in sundays[np.isin(sundays, locked_rows)].tolist():
+            # A partly locked Sunday is topped up from Saturday, as in _fill_week
+            for col in range(target_count):
+                empty = plans[:, row, col] < 0
+                for sat_col in range(target_count):
+                    sat = plans[:, row - 1, sat_col]
+                    fresh = empty & (sat >= 0) & ~(plans[:, row] == sat[:, None]).any(axis=1)
+                    plans[fresh, row, col] = sat[fresh]
+                    empty &= ~fresh
+        return plans
+
+    def plan_loads(self, plans: np.ndarray) -> np.ndarray:
+        """(n_plans x users) shift counts per plan, for comparing sampled plans."""
+        n_plans = plans.shape[0]
+        flat = plans.reshape(n_plans, -1)
+        offsets = (np.arange(n_plans) * len(self.users))[:, None]
+        valid = flat >= 0
+        counts = np.bincount((flat + offsets)[valid], minlength=n_plans * len(self.users))
+        return counts.reshape(n_plans, len(self.users))
+
+    def score_plans(self, plans: np.ndarray, weights: Dict[str, float] = None) -> np.ndarray:
+        """(n_plans,) fairness score of sampled plans over the loop pool (lower is fairer)"""
+        user_rows = np.full(len(self.users), -1, dtype=np.int64)
+        user_rows[self.pool_idx] = np.arange(len(self.pool_idx))
+        weekend = np.arange(plans.shape[1]) % 7 >= 5  # row 0 is a Monday
+        metrics = fairness.evaluate_plans(plans, weekend, len(self.pool_idx), user_rows,
+                                          base_totals=self.total_counts)
+        return fairness.combine(metrics, weights)
+
+    def best_plan(self, start: datetime.date, end: datetime.date, n_plans: int = 1000,
+                  existing_schedules: List[Schedule] = None) -> List[Schedule]:
+        """
+        Sample n_plans and keep the fairest one: the fairness objective over the loop
+        pool, with totals balanced on top of the history counts.
+        """
+        week_start = start - datetime.timedelta(days=start.weekday())
+        plans = self.sample_plans(start, end, n_plans, existing_schedules)
+        if not len(plans) or not plans.shape[1]:
+            return []
+        best = int(self.score_plans(plans).argmin()) if len(self.pool) else 0
+        locked_slots = self._bucket_locked_slots(
+            existing_schedules, week_start, week_start + datetime.timedelta(days=plans.shape[1]))
+        return self.matrix_to_schedules(plans[best], week_start, locked_slots)
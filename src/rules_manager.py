@@ -1,6 +1,7 @@
 import json
 import os
-from typing import Dict, List, Any
+import datetime
+from typing import Dict, List, Any, Optional, Tuple
 
 class RulesManager:
     RULES_FILE = "schedule_rules.json"
@@ -56,3 +57,92 @@ class RulesManager:
     def save_state(cls, state: Dict[str, Any]):
         with open(cls.STATE_FILE, 'w', encoding='utf-8') as f:
             json.dump(state, f, indent=4, ensure_ascii=False)
+
+
+class CompiledRules:
+    """
+    Pre-resolved form of the rules dict returned by RulesManager.load_rules().
+    Built once per scheduling run so the scheduler's day loop does no
+    parsing, string formatting or nested dict lookups.
+
+    days[day_idx] = (rule_type, users)
+      - fixed:    users are the resolved fixed users (unknown codes dropped)
+      - rotation: users = (odd_week_user, even_week_user), either may be None
+      - others:   users = ()
+    """
+    TARGET_COUNT = 2
+    DEFAULT_ROTATION_START = datetime.date(2024, 1, 1)
+
+    def __init__(self, rules: Dict[str, Any], users: List[Any]):
+        self.rules = rules
+        self.user_map = {u.code: u for u in users}
+        self.user_name_map = {u.name: u for u in users if u.name}
+
+        days = []
+        consumption = []
+        day_rules = rules.get("days", {})
+        for day_idx in range(7):
+            day_rule = day_rules.get(str(day_idx), {})
+            rule_type = day_rule.get("type", "loop")
+            rule_users = day_rule.get("users", [])
+
+            if rule_type == "fixed":
+                resolved = tuple(u for u in (self.resolve(c) for c in rule_users) if u)
+            elif rule_type == "rotation":
+                if len(rule_users) >= 2:
+                    resolved = (self.resolve(rule_users[0]), self.resolve(rule_users[1]))
+                elif len(rule_users) == 1:
+                    resolved = (self.resolve(rule_users[0]),) * 2
+                else:
+                    resolved = (None, None)
+            else:
+                resolved = ()
+
+            days.append((rule_type, resolved))
+            consumption.append(self._consumed_slots(day_idx, rule_type, rule_users))
+
+        self.days: Tuple[Tuple[str, tuple], ...] = tuple(days)
+        self.consumption: Tuple[int, ...] = tuple(consumption)
+
+        # Loop pool with unknown codes filtered out, in configured order
+        self.loop_pool = tuple(u for u in (self.resolve(c) for c in rules.get("loop_pool", [])) if u)
+
+        self.loop_start_date = self._parse_date(rules.get("loop_start_date", ""))
+        self.rotation_start_date = (self._parse_date(rules.get("rotation_start_date", "2024-01-01"))
+                                    or self.DEFAULT_ROTATION_START)
+
+    def resolve(self, identifier: str) -> Optional[Any]:
+        """Look up a user by code first, then by display name."""
+        if identifier in self.user_map:
+            return self.user_map[identifier]
+        if identifier in self.user_name_map:
+            return self.user_name_map[identifier]
+        return None
+
+    @classmethod
+    def _consumed_slots(cls, day_idx: int, rule_type: str, rule_users: List[str]) -> int:
+        """How many loop pool slots a weekday consumes under its rule."""
+        # Sunday always copies Saturday
+        if day_idx == 6:
+            return 0
+
+        if rule_type == "fixed":
+            # Consumes (Target - Fixed_Users_Count)
+            # We assume fixed users are valid for calculation stability
+            return max(0, cls.TARGET_COUNT - len(rule_users))
+        elif rule_type == "rotation":
+            # Consumes 1 slot (1 rotation user + 1 loop user)
+            return 1
+        elif rule_type == "follow_saturday":
+            return 0
+        else: # loop
+            return cls.TARGET_COUNT
+
+    @staticmethod
+    def _parse_date(value: str) -> Optional[datetime.date]:
+        if not value:
+            return None
+        try:
+            return datetime.datetime.strptime(value, "%Y-%m-%d").date()
+        except (ValueError, TypeError):
+            return None
@@ -0,0 +1,55 @@
+import datetime
+from typing import List, Tuple, Iterable
+
+# (date, user_id, is_locked)
+ScheduleRow = Tuple[datetime.date, int, bool]
+
+
+class ScheduleDelta:
+    """
+    Minimal change set between two versions of a schedule range.
+      inserts:    rows to add
+      deletes:    (date, user_id) keys to remove
+      lock_flips: rows whose is_locked flag changes (new value)
+    """
+    def __init__(self, inserts: List[ScheduleRow] = None,
+                 deletes: List[Tuple[datetime.date, int]] = None,
+                 lock_flips: List[ScheduleRow] = None):
+        self.inserts = inserts or []
+        self.deletes = deletes or []
+        self.lock_flips = lock_flips or []
+
+    @classmethod
+    def between(cls, old_rows: Iterable[ScheduleRow], new_rows: Iterable[ScheduleRow]) -> "ScheduleDelta":
+        """Diff two row sets keyed by (date, user_id)."""
+        old_map = {(d, uid): bool(locked) for d, uid, locked in old_rows}
+        new_map = {(d, uid): bool(locked) for d, uid, locked in new_rows}
+
+        inserts = sorted((d, uid, locked) for (d, uid), locked in new_map.items() if (d, uid) not in old_map)
+        deletes = sorted(key for key in old_map if key not in new_map)
+        lock_flips = sorted((d, uid, locked) for (d, uid), locked in new_map.items()
+                            if (d, uid) in old_map and old_map[(d, uid)] != locked)
+        return cls(inserts, deletes, lock_flips)
+
+    def merge(self, other: "ScheduleDelta") -> "ScheduleDelta":
+        """
+        Append a later change set. Consumers apply deletes, then lock flips,
+        then inserts, so a remove followed by a re-add of the same key is kept.
+        """
+        self.inserts.extend(other.inserts)
+        self.deletes.extend(other.deletes)
+        self.lock_flips.extend(other.lock_flips)
+        return self
+
+    def is_empty(self) -> bool:
+        return not (self.inserts or self.deletes or self.lock_flips)
+
+    def touched_dates(self) -> List[datetime.date]:
+        dates = {row[0] for row in self.inserts}
+        dates.update(key[0] for key in self.deletes)
+        dates.update(row[0] for row in self.lock_flips)
+        return sorted(dates)
+
+    def __repr__(self):
+        return (f"<ScheduleDelta(inserts={len(self.inserts)}, deletes={len(self.deletes)}, "
+                f"lock_flips={len(self.lock_flips)})>")
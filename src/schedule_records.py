@@ -0,0 +1,34 @@
+import datetime
+import numpy as np
+from typing import Optional
+from src.models import User
+
+# Structured row layout for get_schedule_array (ordered by date, user_id)
+SCHEDULE_DTYPE = np.dtype([
+    ("id", np.int64),
+    ("date", "datetime64[D]"),
+    ("user_id", np.int32),
+    ("is_locked", np.bool_),
+])
+
+
+class ScheduleRecord:
+    """
+    Plain schedule row read without the ORM.
+
+    Has the attributes consumers use on Schedule (id, date, user_id, is_locked,
+    user), so it can be passed anywhere a detached Schedule was, but carries no
+    session state. `user` is the shared User object from the caller's cache.
+    """
+    __slots__ = ("id", "date", "user_id", "is_locked", "user")
+
+    def __init__(self, id: Optional[int], date: datetime.date, user_id: int,
+                 is_locked: bool = False, user: Optional[User] = None):
+        self.id = id
+        self.date = date
+        self.user_id = user_id
+        self.is_locked = is_locked
+        self.user = user
+
+    def __repr__(self):
+        return f"<ScheduleRecord(date={self.date}, user_id={self.user_id}, locked={self.is_locked})>"
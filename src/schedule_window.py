@@ -0,0 +1,161 @@
+import datetime
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+from src.models import User
+from src.schedule_records import ScheduleRecord
+
+MonthKey = Tuple[int, int]
+
+
+def month_key(d: datetime.date) -> MonthKey:
+    return d.year, d.month
+
+
+def month_bounds(key: MonthKey) -> Tuple[datetime.date, datetime.date]:
+    """First and last day of a (year, month)."""
+    year, month = key
+    first = datetime.date(year, month, 1)
+    if month == 12:
+        next_first = datetime.date(year + 1, 1, 1)
+    else:
+        next_first = datetime.date(year, month + 1, 1)
+    return first, next_first - datetime.timedelta(days=1)
+
+
+def months_between(start: datetime.date, end: datetime.date) -> List[MonthKey]:
+    """Every (year, month) touching [start, end]."""
+    keys = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        keys.append((year, month))
+        month += 1
+        if month > 12:
+            year, month = year + 1, 1
+    return keys
+
+
+class ScheduleWindow:
+    """
+    Month-windowed view over the schedules table.
+
+    Schedules are loaded per calendar month and kept in an LRU of at most
+    max_months months, so memory and load time depend on what is displayed
+    (a 6-week calendar page, one statistics year) instead of on the length of
+    the history. Consecutive missing months are fetched with one range query.
+    Months are read as ScheduleRecord rows (no ORM objects) with `user` bound
+    to the shared User objects.
+    """
+    def __init__(self, db_manager, users: List[User] = None, max_months: int = 36):
+        self.db_manager = db_manager
+        self.max_months = max_months
+        self._months: "OrderedDict[MonthKey, List[ScheduleRecord]]" = OrderedDict()
+        self.user_map: Dict[int, User] = {}
+        self.set_users(users or [])
+
+    def set_users(self, users: List[User]):
+        """Rebind cached schedules to a fresh user list (e.g. after reload)."""
+        self.user_map = {u.id: u for u in users}
+        for schedules in self._months.values():
+            self._bind(schedules)
+
+    def _bind(self, schedules: Iterable[ScheduleRecord]):
+        for s in schedules:
+            if s.user_id in self.user_map:
+                s.user = self.user_map[s.user_id]
+
+    def _load(self, keys: List[MonthKey]):
+        """Load missing months; each run of consecutive months is one query."""
+        missing = sorted(k for k in keys if k not in self._months)
+        runs = []
+        for key in missing:
+            if runs and self._next_month(runs[-1][-1]) == key:
+                runs[-1].append(key)
+            else:
+                runs.append([key])
+
+        for run in runs:
+            start = month_bounds(run[0])[0]
+            end = month_bounds(run[-1])[1]
+            buckets = {key: [] for key in run}
+            for s in self.db_manager.get_schedule_records(start, end, self.user_map):
+                buckets[month_key(s.date)].append(s)
+            for key, schedules in buckets.items():
+                self._months[key] = schedules
+
+    @staticmethod
+    def _next_month(key: MonthKey) -> MonthKey:
+        year, month = key
+        return (year + 1, 1) if month == 12 else (year, month + 1)
+
+    def _touch(self, keys: List[MonthKey]):
+        for key in keys:
+            self._months.move_to_end(key)
+        # Never evict months the current request needs
+        while len(self._months) > max(self.max_months, len(keys)):
+            self._months.popitem(last=False)
+
+    def get_month(self, year: int, month: int) -> List[ScheduleRecord]:
+        key = (year, month)
+        self._load([key])
+        self._touch([key])
+        return list(self._months[key])
+
+    def get_range(self, start: datetime.date, end: datetime.date) -> List[ScheduleRecord]:
+        """Schedules with start <= date <= end."""
+        if end < start:
+            return []
+        keys = months_between(start, end)
+        self._load(keys)
+        self._touch(keys)
+        result = []
+        for key in keys:
+            result.extend(s for s in self._months[key] if start <= s.date <= end)
+        return result
+
+    def get_year(self, year: int) -> List[ScheduleRecord]:
+        return self.get_range(datetime.date(year, 1, 1), datetime.date(year, 12, 31))
+
+    def prefetch(self, start: datetime.date, end: datetime.date, margin_months: int = 1):
+        """Load the months around [start, end] so back/forward navigation hits the cache."""
+        before = month_bounds(self._shift(month_key(start), -margin_months))[0]
+        after = month_bounds(self._shift(month_key(end), margin_months))[1]
+        keys = months_between(before, after)
+        self._load(keys)
+        self._touch(keys)
+
+    @staticmethod
+    def _shift(key: MonthKey, months: int) -> MonthKey:
+        index = key[0] * 12 + (key[1] - 1) + months
+        return index // 12, index % 12 + 1
+
+    def invalidate(self, dates: Optional[Iterable[datetime.date]] = None):
+        """Drop cached months containing `dates`, or everything when dates is None."""
+        if dates is None:
+            self._months.clear()
+            return
+        for key in {month_key(d) for d in dates}:
+            self._months.pop(key, None)
+
+    def apply_delta(self, delta) -> List[datetime.date]:
+        """
+        Apply a ScheduleDelta from a DBManager write to the cached months in
+        place (deletes, then lock flips, then inserts). Months that are not
+        cached are skipped; they load fresh on the next access.
+        Returns the touched dates.
+        """
+        for d, uid in delta.deletes:
+            schedules = self._months.get(month_key(d))
+            if schedules is not None:
+                schedules[:] = [s for s in schedules if not (s.date == d and s.user_id == uid)]
+        for d, uid, locked in delta.lock_flips:
+            for s in self._months.get(month_key(d), ()):
+                if s.date == d and s.user_id == uid:
+                    s.is_locked = locked
+        for d, uid, locked in delta.inserts:
+            schedules = self._months.get(month_key(d))
+            if schedules is not None:
+                schedules.append(ScheduleRecord(None, d, uid, locked, self.user_map.get(uid)))
+        return delta.touched_dates()
+
+    def cached_months(self) -> List[MonthKey]:
+        return list(self._months)
@@ -1,8 +1,9 @@
 import datetime
+import numpy as np
 from typing import List, Dict, Optional, Tuple, Any
 from collections import defaultdict
 from src.models import User, Schedule
-from src.rules_manager import RulesManager
+from src.rules_manager import RulesManager, CompiledRules
 
 class Scheduler:
     """
@@ -13,102 +14,100 @@ class Scheduler:
     4. Follow Saturday rule (If Sat is X, Sun is X)
     """
     def __init__(self, users: List[User], start_date: datetime.date, 
-                 loop_index: int = 0, rules: Dict[str, Any] = None):
+                 loop_index: int = 0, rules: Dict[str, Any] = None,
+                 compiled_rules: CompiledRules = None):
         self.users = users
         self.start_date = start_date
-        self.rules = rules or RulesManager.load_rules()
+        self.rules = rules or (compiled_rules.rules if compiled_rules else RulesManager.load_rules())
         self.loop_index = loop_index
         
+        # Resolve rules once; callers scheduling many ranges can share one instance
+        self.compiled = compiled_rules or CompiledRules(self.rules, self.users)
+        
         # Build user map for quick lookup
-        self.user_map = {u.code: u for u in self.users}
-        self.user_name_map = {u.name: u for u in self.users if u.name}
+        self.user_map = self.compiled.user_map
+        self.user_name_map = self.compiled.user_name_map
         
         self.last_error = None
         self.new_loop_index = loop_index
 
+        # Per-weekday loop consumption, used for O(1) anchor calculation
+        self._weekday_consumption = self.compiled.consumption
+        self._weekly_consumption = sum(self._weekday_consumption)
+        self._consumption_prefix = [0]
+        for slots in self._weekday_consumption * 2:
+            self._consumption_prefix.append(self._consumption_prefix[-1] + slots)
+
     def _get_user(self, identifier: str) -> Optional[User]:
-        if identifier in self.user_map:
-            return self.user_map[identifier]
-        if identifier in self.user_name_map:
-            return self.user_name_map[identifier]
-        return None
+        return self.compiled.resolve(identifier)
 
     def _get_consumed_slots_for_day(self, date: datetime.date) -> int:
         """Calculate how many loop pool slots are consumed on a specific date."""
-        day_idx = date.weekday()
-        
-        # 1. Sunday Rule (Hardcoded in generate_schedule as well)
-        if day_idx == 6:
-            return 0
-            
-        # 2. Check Rule
-        day_rule = self.rules.get("days", {}).get(str(day_idx), {})
-        rule_type = day_rule.get("type", "loop")
-        rule_users = day_rule.get("users", [])
-        
-        target_count = 2
-        
-        if rule_type == "fixed":
-            # Consumes (Target - Fixed_Users_Count)
-            # If 2 fixed users, consumes 0. If 0 fixed, consumes 2.
-            # We assume fixed users are valid for calculation stability
-            return max(0, target_count - len(rule_users))
-            
-        elif rule_type == "rotation":
-            # Consumes 1 slot (1 rotation user + 1 loop user)
-            # Unless rotation user is missing? We assume 1 is taken by rotation.
-            return 1
-            
-        elif rule_type == "follow_saturday":
+        return self.compiled.consumption[date.weekday()]
+
+    def _count_consumed_slots(self, start: datetime.date, end: datetime.date) -> int:
+        """
+        Number of loop pool slots consumed in [start, end).
+        Closed form: full weeks * weekly consumption + partial-week remainder.
+        """
+        days = (end - start).days
+        if days <= 0:
             return 0
-            
-        else: # loop
-            return target_count
+        full_weeks, remainder = divmod(days, 7)
+        # Prefix sums over two consecutive weeks, so a partial week starting
+        # on any weekday is a single subtraction
+        first = start.weekday()
+        return (full_weeks * self._weekly_consumption
+                + self._consumption_prefix[first + remainder]
+                - self._consumption_prefix[first])
 
     def _calculate_anchor_loop_index(self, target_date: datetime.date) -> int:
         """
         Calculate the loop index for the target_date based on loop_start_date anchor.
         Returns: (index % pool_size)
         """
-        loop_start_str = self.rules.get("loop_start_date", "")
-        if not loop_start_str:
+        loop_start_date = self.compiled.loop_start_date
+        if loop_start_date is None:
             return self.loop_index # Fallback to passed index if no anchor
-            
-        try:
-            loop_start_date = datetime.datetime.strptime(loop_start_str, "%Y-%m-%d").date()
-        except:
-            return self.loop_index
-
-        pool_codes = self.rules.get("loop_pool", [])
-        # Filter valid pool
-        valid_pool = [code for code in pool_codes if self._get_user(code)]
-        if not valid_pool:
+
+        pool_size = len(self.compiled.loop_pool)
+        if not pool_size:
             return 0
-            
-        pool_size = len(valid_pool)
         
-        # Calculate delta
-        delta_slots = 0
-        
-        if target_date == loop_start_date:
-            return 0
-            
-        elif target_date > loop_start_date:
-            curr = loop_start_date
-            while curr < target_date:
-                delta_slots += self._get_consumed_slots_for_day(curr)
-                curr += datetime.timedelta(days=1)
-            return delta_slots % pool_size
-            
-        else: # target_date < loop_start_date
-            curr = target_date
-            while curr < loop_start_date:
-                delta_slots += self._get_consumed_slots_for_day(curr)
-                curr += datetime.timedelta(days=1)
-            
+        if target_date >= loop_start_date:
+            return self._count_consumed_slots(loop_start_date, target_date) % pool_size
+        else:
             # If we went back X slots, index is -X
             # Python's % handles negative correctly: -1 % 5 = 4
-            return (-delta_slots) % pool_size
+            return (-self._count_consumed_slots(target_date, loop_start_date)) % pool_size
+
+    def _is_odd_rotation_week(self, week_start: datetime.date) -> bool:
+        """Determine week number for rotation"""
+        days_diff = (week_start - self.compiled.rotation_start_date).days
+        week_num = days_diff // 7
+        # Week 0 (start) -> Even? Or Odd?
+        # Usually "Single week" = Week 1. "Double week" = Week 2.
+        # Let's map 0-indexed week_num to 1-indexed count.
+        current_week_count = week_num + 1
+        return (current_week_count % 2 != 0)
+
+    @staticmethod
+    def _bucket_locked_slots(existing_schedules: Optional[List[Schedule]],
+                             start: datetime.date, end: datetime.date) -> Dict[datetime.date, List[str]]:
+        """
+        Pre-process existing schedules (locked slots) in [start, end).
+        Map: date -> list of user_codes
+        """
+        locked_slots = defaultdict(list)
+        if existing_schedules:
+            for s in existing_schedules:
+                if start <= s.date < end:
+                    # We respect ALL existing schedules as "locked" for simplicity in this context,
+                    # or only is_locked=True. User usually expects existing DB records to hold.
+                    # But for "Preview" generation, we might be overwriting.
+                    # Assuming we respect them:
+                    locked_slots[s.date].append(s.user.code)
+        return locked_slots
 
     def generate_schedule(self, existing_schedules: List[Schedule] = None, mode: str = "all") -> List[Schedule]:
         """
@@ -119,48 +118,97 @@ class Scheduler:
           2. If N < 2, fill (2-N) from Loop Pool.
           3. Sunday: Copy Saturday's users exactly (no loop consumption).
         """
-        result_schedules = []
-        target_count = 2
-        
         # Calculate Loop Start Index based on Anchor
         # This overrides self.loop_index with the strictly calculated one
         self.new_loop_index = self._calculate_anchor_loop_index(self.start_date)
         
-        # Parse Loop Start Date for reference (though handled in anchor calc)
-        # We don't need to reset inside the loop anymore if we calculated correctly for start_date
-        # But we keep loop_start_date parsing just in case we want to verify
-        
-        # Pre-process existing schedules (locked slots)
-        # Map: date_str -> list of user_codes
-        locked_slots = defaultdict(list)
-        if existing_schedules:
-            for s in existing_schedules:
-                if self.start_date <= s.date < self.start_date + datetime.timedelta(days=7):
-                    # We respect ALL existing schedules as "locked" for simplicity in this context,
-                    # or only is_locked=True. User usually expects existing DB records to hold.
-                    # But for "Preview" generation, we might be overwriting.
-                    # Assuming we respect them:
-                    d_str = s.date.strftime("%Y-%m-%d")
-                    locked_slots[d_str].append(s.user.code)
-
-        # Determine week number for rotation
-        rot_start_str = self.rules.get("rotation_start_date", "2024-01-01")
-        try:
-            rot_start = datetime.datetime.strptime(rot_start_str, "%Y-%m-%d").date()
-        except:
-            rot_start = datetime.date(2024, 1, 1)
-            
-        days_diff = (self.start_date - rot_start).days
-        week_num = days_diff // 7
-        # Week 0 (start) -> Even? Or Odd?
-        # Usually "Single week" = Week 1. "Double week" = Week 2.
-        # Let's map 0-indexed week_num to 1-indexed count.
-        current_week_count = week_num + 1
-        is_odd_week_human = (current_week_count % 2 != 0)
+        locked_slots = self._bucket_locked_slots(
+            existing_schedules, self.start_date, self.start_date + datetime.timedelta(days=7))
+
+        return self._fill_week(self.start_date, locked_slots,
+                               self._is_odd_rotation_week(self.start_date))
+
+    def generate_range(self, start: datetime.date, end: datetime.date,
+                       existing_schedules: List[Schedule] = None, mode: str = "all") -> List[Schedule]:
+        """
+        Generate schedules for every week touching [start, end] in one pass.
+        Produces the same result as calling generate_schedule week by week,
+        but locked slots are bucketed once and the loop cursor and rotation
+        parity are carried forward instead of being re-resolved per week.
+        A week without locked slots depends only on the loop cursor position
+        within the pool and the rotation parity, so each such state is filled
+        once and later weeks in the same state reuse it: long horizons cost at
+        most 2 x pool size weeks of rule evaluation.
+        """
+        result_schedules = []
+        week_start = start - datetime.timedelta(days=start.weekday())
+        if week_start > end:
+            return result_schedules
+
+        # Weeks are whole, so the last week may run past `end`
+        range_end = end + datetime.timedelta(days=7 - end.weekday())
+        locked_slots = self._bucket_locked_slots(existing_schedules, week_start, range_end)
+
+        pool_size = len(self.compiled.loop_pool)
+        is_odd_week_human = self._is_odd_rotation_week(week_start)
+
+        # With an anchor, each week starts at anchor + weekly consumption;
+        # without one, the cursor simply carries over from the previous week
+        has_anchor = self.compiled.loop_start_date is not None
+        week_cursor = self._calculate_anchor_loop_index(week_start)
+        self.new_loop_index = week_cursor
+
+        # Without locks, a week's output depends only on the loop cursor position
+        # within the pool and the rotation parity, so each distinct state is
+        # filled once and then reused: (cursor % pool_size, parity) -> (template, cursor advance)
+        templates = {}
+
+        while week_start <= end:
+            if has_anchor:
+                self.new_loop_index = week_cursor
 
-        # Loop Pool
-        pool_codes = self.rules.get("loop_pool", [])
-        valid_pool = [code for code in pool_codes if self._get_user(code)]
+            has_locks = any(week_start + datetime.timedelta(days=i) in locked_slots for i in range(7))
+            state = (self.new_loop_index % pool_size if pool_size else 0, is_odd_week_human)
+
+            if not has_locks and state in templates:
+                template, advance = templates[state]
+                for day_offset, user in template:
+                    sch = Schedule(
+                        date=week_start + datetime.timedelta(days=day_offset),
+                        user_id=user.id,
+                        is_locked=False
+                    )
+                    sch.user = user
+                    result_schedules.append(sch)
+                self.new_loop_index += advance
+            else:
+                cursor_before = self.new_loop_index
+                week_schedules = self._fill_week(week_start, locked_slots, is_odd_week_human)
+                result_schedules.extend(week_schedules)
+                if not has_locks:
+                    templates[state] = (
+                        [((s.date - week_start).days, s.user) for s in week_schedules],
+                        self.new_loop_index - cursor_before
+                    )
+
+            if pool_size:
+                week_cursor = (week_cursor + self._weekly_consumption) % pool_size
+            is_odd_week_human = not is_odd_week_human
+            week_start += datetime.timedelta(days=7)
+
+        return result_schedules
+
+    def _fill_week(self, week_start: datetime.date, locked_slots: Dict[datetime.date, List[str]],
+                   is_odd_week_human: bool, closed_dates: Optional[set] = None) -> List[Schedule]:
+        """
+        Fill one Monday-Sunday week, drawing loop users from self.new_loop_index.
+        closed_dates: days that keep only their locked users (edited by hand);
+        they apply no rules and draw nothing from the loop pool.
+        """
+        result_schedules = []
+        target_count = CompiledRules.TARGET_COUNT
+        day_plans = self.compiled.days
+        valid_pool = self.compiled.loop_pool
         
         # Store daily assignments to handle Sunday copy
         # Map: day_idx (0-6) -> list of User objects
@@ -168,8 +216,7 @@ class Scheduler:
 
         # Iterate days
         for day_idx in range(7): # 0=Mon, 6=Sun
-            current_date = self.start_date + datetime.timedelta(days=day_idx)
-            date_str = current_date.strftime("%Y-%m-%d")
+            current_date = week_start + datetime.timedelta(days=day_idx)
             
             # Note: We calculated start_index based on anchor, so we don't need manual reset here.
             # The calculation already accounted for the shift.
@@ -177,12 +224,21 @@ class Scheduler:
             assigned_users = []
             
             # 1. Check Locked Slots first
-            if locked_slots.get(date_str):
-                for u_code in locked_slots[date_str]:
+            if locked_slots.get(current_date):
+                for u_code in locked_slots[current_date]:
                     u = self._get_user(u_code)
                     if u and u not in assigned_users:
                         assigned_users.append(u)
             
+            # 手动编辑过的日期：只保留锁定人员，不套用规则、不消耗循环池
+            if closed_dates and current_date in closed_dates:
+                daily_assignments[day_idx] = assigned_users
+                for user in assigned_users:
+                    sch = Schedule(date=current_date, user_id=user.id, is_locked=True)
+                    sch.user = user
+                    result_schedules.append(sch)
+                continue
+
             # If already full from locks, skip rule logic
             if len(assigned_users) >= target_count:
                 daily_assignments[day_idx] = assigned_users[:target_count] # Cap at target?
@@ -208,29 +264,19 @@ class Scheduler:
                             assigned_users.append(u)
             else:
                 # Normal Day Rule
-                day_rule = self.rules.get("days", {}).get(str(day_idx), {})
-                rule_type = day_rule.get("type", "loop") # default loop implies no fixed person
-                rule_users = day_rule.get("users", [])
+                rule_type, rule_users = day_plans[day_idx]
 
                 if rule_type == "fixed":
-                    for u_code in rule_users:
+                    for user in rule_users:
                         if len(assigned_users) >= target_count: break
-                        user = self._get_user(u_code)
-                        if user and user not in assigned_users:
+                        if user not in assigned_users:
                             assigned_users.append(user)
                             
                 elif rule_type == "rotation":
-                    # users: [Odd, Even]
-                    u_code = None
-                    if len(rule_users) >= 2:
-                        u_code = rule_users[0] if is_odd_week_human else rule_users[1]
-                    elif len(rule_users) == 1:
-                        u_code = rule_users[0]
-                    
-                    if u_code:
-                        user = self._get_user(u_code)
-                        if user and user not in assigned_users and len(assigned_users) < target_count:
-                            assigned_users.append(user)
+                    # users: (Odd, Even)
+                    user = rule_users[0] if is_odd_week_human else rule_users[1]
+                    if user and user not in assigned_users and len(assigned_users) < target_count:
+                        assigned_users.append(user)
             
             # 3. Fill remaining with Loop Pool
             while len(assigned_users) < target_count:
@@ -243,12 +289,11 @@ class Scheduler:
                 found_new = False
                 attempts = 0
                 while attempts < len(valid_pool):
-                    u_code = valid_pool[self.new_loop_index % len(valid_pool)]
+                    user = valid_pool[self.new_loop_index % len(valid_pool)]
                     self.new_loop_index += 1
                     attempts += 1
                     
-                    user = self._get_user(u_code)
-                    if user and user not in assigned_users:
+                    if user not in assigned_users:
                         assigned_users.append(user)
                         found_new = True
                         break
@@ -264,7 +309,7 @@ class Scheduler:
             for user in assigned_users:
                 # Check if this was a locked one
                 is_locked = False
-                if locked_slots.get(date_str) and user.code in locked_slots[date_str]:
+                if locked_slots.get(current_date) and user.code in locked_slots[current_date]:
                     is_locked = True
                 
                 sch = Schedule(
@@ -277,3 +322,171 @@ class Scheduler:
                 
         return result_schedules
 
+
+
+class VectorizedScheduler(Scheduler):
+    """
+    NumPy horizon engine for anchored loop pools.
+
+    The horizon is a (days x 2) int32 matrix of indices into self.users (-1 = empty):
+      - day -> weekday vector and odd/even rotation mask select per-day rule users
+      - per-day loop consumption is summed within each week to get draw offsets
+      - each week's pool cursor comes from the anchor (anchor + week * weekly consumption)
+    Only weeks with locked slots or a same-day duplicate draw (which makes the
+    cursor skip) are refilled through the regular per-week path.
+
+    Without loop_start_date the cursor depends on the previous week's draws,
+    so generation falls back to Scheduler.generate_range.
+    """
+    def __init__(self, users: List[User], start_date: datetime.date,
+                 loop_index: int = 0, rules: Dict[str, Any] = None,
+                 compiled_rules: CompiledRules = None):
+        super().__init__(users, start_date, loop_index=loop_index, rules=rules,
+                         compiled_rules=compiled_rules)
+        self.user_index = {id(u): i for i, u in enumerate(self.users)}
+
+    def _rule_tables(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        rule_idx[parity, weekday, slot]: users placed by fixed/rotation rules
+        need[parity, weekday]: loop pool draws needed to reach the target count
+        parity 0 = odd week, 1 = even week. Sunday is copied from Saturday.
+        """
+        target_count = CompiledRules.TARGET_COUNT
+        rule_idx = np.full((2, 7, target_count), -1, dtype=np.int32)
+        need = np.zeros((2, 7), dtype=np.int32)
+
+        for parity in (0, 1):
+            for day_idx in range(6):
+                rule_type, rule_users = self.compiled.days[day_idx]
+                assigned = []
+                if rule_type == "fixed":
+                    for user in rule_users:
+                        if len(assigned) >= target_count: break
+                        if user not in assigned:
+                            assigned.append(user)
+                elif rule_type == "rotation":
+                    user = rule_users[parity]
+                    if user:
+                        assigned.append(user)
+
+                for slot, user in enumerate(assigned):
+                    rule_idx[parity, day_idx, slot] = self.user_index[id(user)]
+                need[parity, day_idx] = target_count - len(assigned)
+
+        if not self.compiled.loop_pool:
+            need[:] = 0
+        return rule_idx, need
+
+    def generate_matrix(self, start: datetime.date, end: datetime.date,
+                        existing_schedules: List[Schedule] = None) -> np.ndarray:
+        """
+        Generate every week touching [start, end] as a (days x 2) int32 matrix.
+        Row 0 is the Monday of start's week.
+        """
+        week_start = start - datetime.timedelta(days=start.weekday())
+        if week_start > end:
+            return np.full((0, CompiledRules.TARGET_COUNT), -1, dtype=np.int32)
+
+        n_weeks = (end - week_start).days // 7 + 1
+        if self.compiled.loop_start_date is None:
+            schedules = super().generate_range(start, end, existing_schedules)
+            return self.schedules_to_matrix(schedules, week_start, n_weeks)
+
+        locked_slots = self._bucket_locked_slots(
+            existing_schedules, week_start, week_start + datetime.timedelta(weeks=n_weeks))
+        return self._generate_matrix(week_start, n_weeks, locked_slots)
+
+    def _generate_matrix(self, week_start: datetime.date, n_weeks: int,
+                         locked_slots: Dict[datetime.date, List[str]]) -> np.ndarray:
+        pool = self.compiled.loop_pool
+        pool_size = len(pool)
+        pool_idx = np.array([self.user_index[id(u)] for u in pool], dtype=np.int32)
+
+        rule_idx, need = self._rule_tables()
+
+        weekday = np.tile(np.arange(7), n_weeks)
+        week = np.repeat(np.arange(n_weeks), 7)
+        first_parity = 0 if self._is_odd_rotation_week(week_start) else 1
+        parity = (first_parity + week) % 2
+
+        matrix = rule_idx[parity, weekday].copy()
+        day_need = need[parity, weekday]
+
+        # Pool cursor: anchored start of each week + draws earlier in the same week
+        week_need = day_need.reshape(n_weeks, 7)
+        intra_offset = (np.cumsum(week_need, axis=1) - week_need).ravel()
+        if pool_size:
+            anchor_cursor = self._calculate_anchor_loop_index(week_start)
+            week_cursor = (anchor_cursor + np.arange(n_weeks, dtype=np.int64) * self._weekly_consumption) % pool_size
+            cursor = week_cursor[week] + intra_offset
+
+            two = day_need == 2
+            matrix[two, 0] = pool_idx[cursor[two] % pool_size]
+            matrix[two, 1] = pool_idx[(cursor[two] + 1) % pool_size]
+            one = day_need == 1
+            matrix[one, 1] = pool_idx[cursor[one] % pool_size]
+        else:
+            week_cursor = np.zeros(n_weeks, dtype=np.int64)
+
+        # Sunday copies Saturday
+        matrix[6::7] = matrix[5::7]
+
+        # Weeks needing the regular path: locked slots or a same-day duplicate draw
+        duplicate = (matrix[:, 0] == matrix[:, 1]) & (matrix[:, 0] >= 0)
+        fixup_weeks = set(np.unique(week[duplicate]).tolist())
+        fixup_weeks.update((d - week_start).days // 7 for d in locked_slots)
+
+        for w in sorted(fixup_weeks):
+            monday = week_start + datetime.timedelta(weeks=w)
+            self.new_loop_index = int(week_cursor[w])
+            week_schedules = self._fill_week(monday, locked_slots, parity[w * 7] == 0)
+            matrix[w * 7:(w + 1) * 7] = self.schedules_to_matrix(week_schedules, monday, 1)
+
+        # Fixups run in order, so a fixed-up last week already left the cursor in place
+        last = n_weeks - 1
+        if last not in fixup_weeks:
+            self.new_loop_index = int(week_cursor[last] + week_need[last].sum())
+        return matrix
+
+    def schedules_to_matrix(self, schedules: List[Schedule], week_start: datetime.date,
+                            n_weeks: int) -> np.ndarray:
+        matrix = np.full((n_weeks * 7, CompiledRules.TARGET_COUNT), -1, dtype=np.int32)
+        fill = np.zeros(n_weeks * 7, dtype=np.int32)
+        index_by_id = {u.id: i for i, u in enumerate(self.users)}
+        for s in schedules:
+            row = (s.date - week_start).days
+            matrix[row, fill[row]] = index_by_id[s.user_id]
+            fill[row] += 1
+        return matrix
+
+    def matrix_to_schedules(self, matrix: np.ndarray, week_start: datetime.date,
+                            locked_slots: Dict[datetime.date, List[str]] = None) -> List[Schedule]:
+        """Materialize Schedule objects from a matrix produced by generate_matrix."""
+        locked_slots = locked_slots or {}
+        result_schedules = []
+        rows, slots = np.nonzero(matrix >= 0)
+        for row, slot in zip(rows.tolist(), slots.tolist()):
+            user = self.users[matrix[row, slot]]
+            current_date = week_start + datetime.timedelta(days=row)
+            sch = Schedule(
+                date=current_date,
+                user_id=user.id,
+                is_locked=user.code in locked_slots.get(current_date, ())
+            )
+            sch.user = user
+            result_schedules.append(sch)
+        return result_schedules
+
+    def generate_range(self, start: datetime.date, end: datetime.date,
+                       existing_schedules: List[Schedule] = None, mode: str = "all") -> List[Schedule]:
+        if self.compiled.loop_start_date is None:
+            return super().generate_range(start, end, existing_schedules, mode=mode)
+
+        week_start = start - datetime.timedelta(days=start.weekday())
+        if week_start > end:
+            return []
+        n_weeks = (end - week_start).days // 7 + 1
+        locked_slots = self._bucket_locked_slots(
+            existing_schedules, week_start, week_start + datetime.timedelta(weeks=n_weeks))
+        matrix = self._generate_matrix(week_start, n_weeks, locked_slots)
+        return self.matrix_to_schedules(matrix, week_start, locked_slots)
@@ -1,67 +1,142 @@
-from collections import defaultdict
+import calendar
 import datetime
+import numpy as np
 from typing import List, Dict
 from src.models import Schedule, User
+from src.duty_cube import DutyCube
+from src.stats_cache import StatsCache
+from src import fairness
 
 class StatisticsManager:
-    def __init__(self, schedules: List[Schedule], users: List[User]):
+    # "memory": 在内存占用矩阵上统计；"sql": 统计全部在 SQLite 中按用户分组聚合，不加载排班行
+    BACKENDS = ("memory", "sql")
+
+    def __init__(self, schedules: List[Schedule], users: List[User], db_manager=None, period=None,
+                 backend: str = "memory", cache: StatsCache = None):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown statistics backend: {backend}")
+        if backend == "sql" and db_manager is None:
+            raise ValueError("The sql statistics backend needs a db_manager")
         self.schedules = schedules
         self.users = users
+        # 提供 db_manager 时，schedules 覆盖范围以外的月度/年度/周末统计由数据库按索引列 (year/month/weekday) 聚合
+        self.db_manager = db_manager
+        # (start, end): schedules 完整覆盖的日期范围 (如 StatsView 加载的整年)
+        self.period = period
+        self.backend = backend
+        self._cube = None
+        # 数据库统计结果缓存 (按数据版本和写入月份失效)；可由调用方共享，跨实例复用
+        if cache is None and db_manager is not None:
+            cache = StatsCache(db_manager)
+        self.cache = cache
+
+    @property
+    def cube(self) -> DutyCube:
+        """users × days 占用矩阵，首次使用时构建一次，之后各图表共用"""
+        if self._cube is None:
+            start, end = self.period if self.period else (None, None)
+            self._cube = DutyCube.from_schedules(self.schedules or [], [u.code for u in self.users], start, end)
+        return self._cube
+
+    def _use_cube(self, start: datetime.date, end: datetime.date) -> bool:
+        if self.backend == "sql":
+            return False
+        if self.db_manager is None:
+            return True
+        return self.period is not None and self.period[0] <= start and end <= self.period[1]
+
+    def _cube_for(self, start: datetime.date, end: datetime.date, exact: bool = False) -> DutyCube:
+        """
+        占用矩阵：范围内用已构建的 cube；超出 period 时从数据库读取紧凑数组构建。
+        exact=True 时保证返回的矩阵完整覆盖 [start, end] (趋势按列对齐日期)
+        """
+        if not self._use_cube(start, end):
+            code_by_id = {u.id: u.code for u in self.users}
+            return DutyCube.from_array(self.db_manager.get_schedule_array(start, end), code_by_id,
+                                       [u.code for u in self.users], start, end)
+        if exact and not self.cube.covers(start, end):
+            return DutyCube.from_schedules(self.schedules or [], [u.code for u in self.users], start, end)
+        return self.cube
+
+    def _sql_counts(self, chart: str, year: int, month, query) -> Dict[str, int]:
+        """Run a per-chart aggregate once per (chart, year, month) until a write touches those months"""
+        return self._with_all_users(self.cache.get(chart, year, month, query))
+
+    def _with_all_users(self, counts: Dict[str, int]) -> Dict[str, int]:
+        stats = {user.code: 0 for user in self.users}
+        stats.update(counts)
+        return stats
+
+    @staticmethod
+    def _month_range(year: int, month: int):
+        first = datetime.date(year, month, 1)
+        return first, datetime.date(year, month, calendar.monthrange(year, month)[1])
+
+    def get_range_stats(self, start: datetime.date, end: datetime.date, weekend_only: bool = False) -> Dict[str, int]:
+        """
+        计算 [start, end] 内每人的排班天数 (weekend_only: 仅周六/周日)
+        :return: {user_code: count}
+        """
+        cube = self._cube_for(start, end)
+        return cube.to_dict(cube.counts(start, end, weekend_only))
 
     def get_monthly_stats(self, year: int, month: int) -> Dict[str, int]:
         """
         计算指定月份每人的排班天数
         :return: {user_code: count}
         """
-        stats = defaultdict(int)
-        # 初始化所有用户为0，确保都在结果中
-        for user in self.users:
-            stats[user.code] = 0
-            
-        for sch in self.schedules:
-            if sch.date.year == year and sch.date.month == month:
-                # Ensure we handle cases where user might have been deleted but schedule remains (though logic usually prevents this)
-                if hasattr(sch.user, 'code'):
-                     stats[sch.user.code] += 1
-                
-        return dict(stats)
+        start, end = self._month_range(year, month)
+        if not self._use_cube(start, end):
+            return self._sql_counts("monthly", year, month,
+                                    lambda: self.db_manager.get_monthly_counts(year, month))
+        return self.get_range_stats(start, end)
 
     def get_annual_stats(self, year: int) -> Dict[str, int]:
         """
         计算指定年份每人的排班天数
         :return: {user_code: count}
         """
-        stats = defaultdict(int)
-        for user in self.users:
-            stats[user.code] = 0
-            
-        for sch in self.schedules:
-            if sch.date.year == year:
-                if hasattr(sch.user, 'code'):
-                    stats[sch.user.code] += 1
-                
-        return dict(stats)
+        start, end = datetime.date(year, 1, 1), datetime.date(year, 12, 31)
+        if not self._use_cube(start, end):
+            return self._sql_counts("annual", year, None, lambda: self.db_manager.get_annual_counts(year))
+        return self.get_range_stats(start, end)
 
     def get_weekend_stats(self, year: int, month: int = None) -> Dict[str, int]:
         """
         计算指定年份(或月份)每人的周末值班天数
         :return: {user_code: count}
         """
-        stats = defaultdict(int)
-        for user in self.users:
-            stats[user.code] = 0
-            
-        for sch in self.schedules:
-            if sch.date.year == year:
-                if month is not None and sch.date.month != month:
-                    continue
-                    
-                # 5=Saturday, 6=Sunday
-                if sch.date.weekday() >= 5:
-                    if hasattr(sch.user, 'code'):
-                        stats[sch.user.code] += 1
-                
-        return dict(stats)
+        if month is None:
+            start, end = datetime.date(year, 1, 1), datetime.date(year, 12, 31)
+        else:
+            start, end = self._month_range(year, month)
+        if not self._use_cube(start, end):
+            return self._sql_counts("weekend", year, month,
+                                    lambda: self.db_manager.get_weekend_counts(year, month))
+        return self.get_range_stats(start, end, weekend_only=True)
+
+    def get_fairness_report(self, start: datetime.date, end: datetime.date) -> Dict:
+        """
+        计算 [start, end] 的公平性指标 (见 src/fairness.py)
+        :return: {"users": {user_code: {metric: value}}, "gini": ..., "std": ..., "worst_*": ...}
+        """
+        cube = self._cube_for(start, end, exact=True)
+        lo = cube.day_index(start)
+        hi = cube.day_index(end + datetime.timedelta(days=1))
+        metrics = fairness.evaluate(cube.window(start, end), cube.weekend[lo:hi])
+        per_user = ("totals", "weekend", "weekend_share_deviation", "max_consecutive",
+                    "min_rest_gap", "pair_repetition")
+        codes = {user.code for user in self.users}
+        report = {
+            "users": {
+                code: {name: metrics[name][row].item() for name in per_user}
+                for code, row in cube.user_index.items() if code in codes
+            }
+        }
+        for name, value in metrics.items():
+            if name not in per_user:
+                report[name] = float(value)
+        return report
 
     def get_monthly_variance(self, year: int, month: int) -> float:
         """
@@ -73,33 +148,58 @@ class StatisticsManager:
             return 0
         return max(counts) - min(counts)
 
-    def get_long_term_trend(self, start_date: datetime.date, end_date: datetime.date) -> Dict[str, List[int]]:
-        """
-        获取一段时间内每人的累计排班趋势
-        :return: {user_code: [cumulative_count_day1, cumulative_count_day2, ...]}
-        """
-        # 生成日期序列
-        delta = (end_date - start_date).days + 1
-        date_range = [start_date + datetime.timedelta(days=i) for i in range(delta)]
-        
-        trend_data = {user.code: [0] * delta for user in self.users}
-        
-        # 预处理排班数据，加速查询
-        sch_map = defaultdict(list)
-        for sch in self.schedules:
-            sch_map[sch.date].append(sch.user.code)
-            
-        # 计算每日累计
-        current_counts = defaultdict(int)
-        
-        for i, date in enumerate(date_range):
-            # 更新当日排班
-            if date in sch_map:
-                for code in sch_map[date]:
-                    current_counts[code] += 1
-            
-            # 记录当日累计值
-            for user in self.users:
-                trend_data[user.code][i] = current_counts[user.code]
-                
+    @staticmethod
+    def auto_resolution(start_date: datetime.date, end_date: datetime.date) -> str:
+        """按跨度选择采样粒度：约 4 个月以内按天，2 年以内按周，更长按月"""
+        days = (end_date - start_date).days + 1
+        if days <= 124:
+            return "day"
+        if days <= 731:
+            return "week"
+        return "month"
+
+    @staticmethod
+    def sample_indices(start_date: datetime.date, end_date: datetime.date, resolution: str = "day") -> np.ndarray:
+        """
+        降采样列下标：week 取每周日，month 取每月末日；最后一天总是保留
+        """
+        n_days = (end_date - start_date).days + 1
+        if n_days <= 0:
+            return np.zeros(0, dtype=np.int64)
+        offsets = np.arange(n_days)
+        if resolution == "day":
+            return offsets
+        if resolution == "week":
+            is_end = (start_date.weekday() + offsets) % 7 == 6
+        elif resolution == "month":
+            days = np.datetime64(start_date, "D") + offsets
+            is_end = days.astype("datetime64[M]") != (days + 1).astype("datetime64[M]")
+        else:
+            raise ValueError(f"Unknown resolution: {resolution}")
+        is_end[-1] = True
+        return np.nonzero(is_end)[0]
+
+    def get_long_term_trend(self, start_date: datetime.date, end_date: datetime.date,
+                            resolution: str = "day"):
+        """
+        获取一段时间内每人的累计排班趋势 (占用矩阵沿日期轴 cumsum)
+        :param resolution: "day" / "week" / "month" / "auto"，多年范围可降采样
+        :return: ({user_code: np.ndarray of cumulative counts}, [sample dates])
+        """
+        if resolution == "auto":
+            resolution = self.auto_resolution(start_date, end_date)
+        if self.cache is not None and not self._use_cube(start_date, end_date):
+            return self.cache.get(("trend", start_date, end_date, resolution), end_date.year, end_date.month,
+                                  lambda: self._compute_trend(start_date, end_date, resolution),
+                                  start=start_date, end=end_date)
+        return self._compute_trend(start_date, end_date, resolution)
+
+    def _compute_trend(self, start_date: datetime.date, end_date: datetime.date, resolution: str):
+        idx = self.sample_indices(start_date, end_date, resolution)
+        date_range = [start_date + datetime.timedelta(days=int(i)) for i in idx]
+
+        cube = self._cube_for(start_date, end_date, exact=True)
+        cumulative = np.cumsum(cube.window(start_date, end_date), axis=1, dtype=np.int32)[:, idx]
+        codes = {user.code for user in self.users}
+        trend_data = {code: cumulative[row] for code, row in cube.user_index.items() if code in codes}
         return trend_data, date_range
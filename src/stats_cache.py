@@ -0,0 +1,58 @@
+import datetime
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+MonthKey = Tuple[int, int]
+
+
+class StatsCache:
+    """
+    Memo of statistics results keyed by (query, year, month).
+
+    Entries are checked against DBManager.data_version on every lookup. When
+    the version moved, only entries whose months were written since (see
+    DBManager.changed_months_since) are dropped; a write that may touch any
+    month (user deletion, reset) clears everything.
+    month None means the whole year. start/end widen the dependency range for
+    results spanning several months (e.g. multi-year trends).
+    """
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self.version = db_manager.data_version
+        self._entries: Dict[Tuple[Hashable, int, Optional[int]], Any] = {}
+        self._depends: Dict[Tuple[Hashable, int, Optional[int]], Tuple[MonthKey, MonthKey]] = {}
+
+    def get(self, query: Hashable, year: int, month: Optional[int], compute: Callable[[], Any],
+            start: datetime.date = None, end: datetime.date = None):
+        self.sync()
+        key = (query, year, month)
+        if key not in self._entries:
+            self._entries[key] = compute()
+            if start is not None and end is not None:
+                self._depends[key] = ((start.year, start.month), (end.year, end.month))
+            elif month is None:
+                self._depends[key] = ((year, 1), (year, 12))
+            else:
+                self._depends[key] = ((year, month), (year, month))
+        return self._entries[key]
+
+    def sync(self):
+        """Drop entries made stale by writes since the last lookup"""
+        current = self.db_manager.data_version
+        if current == self.version:
+            return
+        changed = self.db_manager.changed_months_since(self.version)
+        if changed is None:
+            self.clear()
+        else:
+            for key, (first, last) in list(self._depends.items()):
+                if any(first <= m <= last for m in changed):
+                    del self._entries[key]
+                    del self._depends[key]
+        self.version = current
+
+    def clear(self):
+        self._entries.clear()
+        self._depends.clear()
+
+    def __len__(self):
+        return len(self._entries)
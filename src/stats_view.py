@@ -13,13 +13,26 @@ from PyQt5.QtCore import Qt
 import datetime
 
 from src.statistics_manager import StatisticsManager
+from src.stats_cache import StatsCache
 
 class StatsView(QWidget):
-    def __init__(self, users, schedules):
+    # 趋势范围 -> 向前包含的年数 (0 为仅所选月份)
+    TREND_SPANS = {"本月": 0, "本年": 1, "近三年": 3, "近五年": 5}
+
+    def __init__(self, users, schedules, db_manager=None, schedule_loader=None, backend="memory"):
         super().__init__()
         self.users = users
         self.schedules = schedules
-        self.stats_manager = StatisticsManager(self.schedules, self.users)
+        self.db_manager = db_manager
+        # Optional callable(year) -> List[Schedule]: only the selected year is kept in memory
+        self.schedule_loader = schedule_loader
+        # "sql": charts are aggregated in SQLite, no schedule rows are loaded
+        self.backend = backend
+        self.loaded_year = None
+        # Database results survive manager rebuilds; writes drop only the months they touch
+        self.stats_cache = StatsCache(db_manager) if db_manager is not None else None
+        self.stats_manager = StatisticsManager(self.schedules, self.users, self.db_manager, backend=backend,
+                                               cache=self.stats_cache)
         
         self.layout = QVBoxLayout(self)
         
@@ -80,6 +93,17 @@ class StatsView(QWidget):
         self.combo_month.currentIndexChanged.connect(self.refresh_charts)
         controls_layout.addWidget(self.combo_month)
         
+        # 5. 趋势范围 (仅针对长期趋势，截止到所选年月)
+        self.lbl_trend_span = QLabel("趋势范围:")
+        controls_layout.addWidget(self.lbl_trend_span)
+        
+        self.combo_trend_span = QComboBox()
+        self.combo_trend_span.addItems(list(self.TREND_SPANS))
+        self.combo_trend_span.currentIndexChanged.connect(self.refresh_charts)
+        controls_layout.addWidget(self.combo_trend_span)
+        self.lbl_trend_span.setVisible(False)
+        self.combo_trend_span.setVisible(False)
+        
         controls_layout.addStretch()
         self.layout.addLayout(controls_layout)
 
@@ -155,6 +179,8 @@ class StatsView(QWidget):
         
         self.lbl_cycle.setVisible(is_stats)
         self.combo_cycle.setVisible(is_stats)
+        self.lbl_trend_span.setVisible(not is_stats)
+        self.combo_trend_span.setVisible(not is_stats)
         
         # Trigger cycle change to update year/month visibility
         if is_stats:
@@ -182,18 +208,42 @@ class StatsView(QWidget):
         self.refresh_charts()
 
     def update_data(self, schedules, users=None):
-        self.schedules = schedules
+        """schedules 为 None 时通过 schedule_loader 重新加载所选年份"""
         if users is not None:
             self.users = users
-        self.stats_manager = StatisticsManager(self.schedules, self.users)
+        if self.backend == "sql":
+            # Results are cached by data version inside the manager; keep it
+            self.stats_manager.users = self.users
+        elif schedules is None and self.schedule_loader is not None:
+            self.loaded_year = None
+        else:
+            self.schedules = schedules
+            self.stats_manager = StatisticsManager(self.schedules, self.users, self.db_manager,
+                                                   cache=self.stats_cache)
         self.refresh_charts()
 
+    def invalidate_dates(self, dates):
+        """Drop the loaded year if an edit touched it; it reloads on the next refresh"""
+        if self.loaded_year is not None and any(d.year == self.loaded_year for d in dates):
+            self.loaded_year = None
+
+    def _ensure_year_loaded(self, year):
+        if self.backend == "sql" or self.schedule_loader is None or year == self.loaded_year:
+            return
+        self.schedules = self.schedule_loader(year)
+        self.loaded_year = year
+        # The loaded year is complete, so every chart of that year reads the same duty cube
+        self.stats_manager = StatisticsManager(self.schedules, self.users, self.db_manager,
+                                               period=(datetime.date(year, 1, 1), datetime.date(year, 12, 31)),
+                                               cache=self.stats_cache)
+
     def refresh_charts(self):
         self.figure.clear()
         chart_type = self.combo_chart_type.currentText()
         
         year = int(self.combo_year.currentText())
         month = int(self.combo_month.currentText())
+        self._ensure_year_loaded(year)
         
         if chart_type == "班次统计":
             cycle = self.combo_cycle.currentText()
@@ -307,34 +357,42 @@ class StatsView(QWidget):
     def _draw_trend_line_chart(self, year, month):
         ax = self.figure.add_subplot(111)
         
-        # Define range based on selection
-        # End date = selected year/month's last day
+        # Range ends on the last day of the selected month and starts at the
+        # first day of the month (本月) or on Jan 1 of the first year of the span
         import calendar
         last_day = calendar.monthrange(year, month)[1]
         end_date = datetime.date(year, month, last_day)
         
-        # Start date = 30 days before? or 1st of month?
-        # "长期趋势" usually implies a window. 
-        # Let's show: Start of Year to Selected Month End? Or just surrounding?
-        # Existing logic was "Next 30 days" or "Current Month".
-        # Let's show "Year to Date" trend if it's long term?
-        # Or just +/- 15 days around selection?
-        # Let's stick to "Current Month Trend" for now, or "Last 30 days ending on selection".
-        # Let's do: First day of selected month -> Last day of selected month.
-        start_date = datetime.date(year, month, 1)
-        
-        trend_data, date_range = self.stats_manager.get_long_term_trend(start_date, end_date)
+        span_label = self.combo_trend_span.currentText()
+        years = self.TREND_SPANS.get(span_label, 0)
+        if years:
+            start_date = datetime.date(year - years + 1, 1, 1)
+        else:
+            start_date = datetime.date(year, month, 1)
         
-        # x轴格式化
-        x_dates = [d.strftime("%d") for d in date_range]
+        # Multi-year ranges are sampled weekly/monthly instead of per day
+        trend_data, date_range = self.stats_manager.get_long_term_trend(start_date, end_date, resolution="auto")
         
         user_map = {u.code: (u.name if u.name else u.code) for u in self.users}
+        marker = 'o' if len(date_range) <= 62 else None
+
+        if years:
+            x_values = date_range
+        else:
+            x_values = [d.strftime("%d") for d in date_range]
 
         for user_code, counts in trend_data.items():
             name = user_map.get(user_code, user_code)
-            ax.plot(x_dates, counts, label=name, marker='o', markersize=3)
+            ax.plot(x_values, counts, label=name, marker=marker, markersize=3)
             
-        self.lbl_chart_title.setText(f"{year}年{month}月 累计班次趋势")
+        if years > 1:
+            self.lbl_chart_title.setText(f"{start_date.year}-{year}年{month}月 累计班次趋势")
+            self.figure.autofmt_xdate()
+        elif years:
+            self.lbl_chart_title.setText(f"{year}年1-{month}月 累计班次趋势")
+            self.figure.autofmt_xdate()
+        else:
+            self.lbl_chart_title.setText(f"{year}年{month}月 累计班次趋势")
         ax.set_xlabel("日期")
         ax.set_ylabel("累计班次")
         ax.legend(loc='upper left', bbox_to_anchor=(1, 1))
@@ -3,10 +3,12 @@ from PyQt5.QtWidgets import (QDialog, QWidget, QVBoxLayout, QHBoxLayout, QListWi
                              QScrollArea, QFrame, QComboBox, QCheckBox, QFormLayout, QGridLayout)
 from PyQt5.QtCore import Qt, QSize
 from PyQt5.QtGui import QIcon, QFont
+from src.db_manager import DBManager
 
 class SystemSettingsDialog(QDialog):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, db_manager=None):
         super().__init__(parent)
+        self.db_manager = db_manager
         self.setWindowTitle("系统设置")
         self.resize(800, 500)
         self.setModal(True)
@@ -146,9 +148,32 @@ class SystemSettingsDialog(QDialog):
         gb_layout2.addRow("更新:", auto_update)
         
         layout.addWidget(group_box2)
+
+        # Database
+        group_box3 = QFrame()
+        group_box3.setStyleSheet("background-color: #F9F9F9; border-radius: 8px; padding: 15px;")
+        gb_layout3 = QFormLayout(group_box3)
+
+        self.db_profile_combo = QComboBox()
+        for key, config in DBManager.PROFILES.items():
+            self.db_profile_combo.addItem(config["label"], key)
+        current = self.db_manager.profile if self.db_manager else DBManager.load_profile()
+        self.db_profile_combo.setCurrentIndex(max(0, self.db_profile_combo.findData(current)))
+        self.db_profile_combo.currentIndexChanged.connect(self.on_db_profile_changed)
+        self.db_profile_combo.setToolTip("高性能模式启用 WAL 日志、内存临时表和连接池，适合频繁编辑和大批量排班")
+        gb_layout3.addRow("数据库性能:", self.db_profile_combo)
+
+        layout.addWidget(group_box3)
         layout.addStretch()
         return page
 
+    def on_db_profile_changed(self, index):
+        profile = self.db_profile_combo.itemData(index)
+        if self.db_manager:
+            self.db_manager.set_profile(profile)
+        else:
+            DBManager.save_profile(profile)
+
     def create_faq_page(self):
         page = QWidget()
         layout = QVBoxLayout(page)
@@ -0,0 +1,38 @@
+import datetime
+from src.models import User, Schedule
+
+# Shared fixture for the scheduler tests: users A-I and one week of
+# fixed / rotation / loop rules anchored on START_DATE
+START_DATE = datetime.date(2026, 1, 5)  # Monday
+
+
+def make_users(count=9):
+    """Users A, B, C, ... with ids 1..count and no preferences"""
+    return [User(id=i + 1, code=chr(65 + i), name=chr(65 + i), preferences={}) for i in range(count)]
+
+
+def make_rules(loop_pool=("I", "E", "F", "D", "G"), **overrides):
+    rules = {
+        "days": {
+            "0": {"type": "fixed", "users": ["A"]},
+            "1": {"type": "fixed", "users": ["C"]},
+            "2": {"type": "fixed", "users": ["B"]},
+            "3": {"type": "fixed", "users": ["C"]},
+            "4": {"type": "rotation", "users": ["A", "B"]},
+            "5": {"type": "loop", "users": []},
+            "6": {"type": "follow_saturday", "users": []}
+        },
+        "loop_pool": list(loop_pool),
+        "rotation_start_date": "2026-01-09",
+        "loop_start_date": START_DATE.strftime("%Y-%m-%d")
+    }
+    rules.update(overrides)
+    return rules
+
+
+def make_lock(users, date, code):
+    """Locked schedule row for the user with `code`"""
+    user = next(u for u in users if u.code == code)
+    sch = Schedule(date=date, user_id=user.id, is_locked=True)
+    sch.user = user
+    return sch
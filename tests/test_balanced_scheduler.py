@@ -0,0 +1,85 @@
+import unittest
+import datetime
+import numpy as np
+from collections import defaultdict, Counter
+from src.balanced_scheduler import BalancedScheduler, min_cost_assignment
+from scheduling_fixtures import START_DATE, make_users, make_rules
+
+
+class TestMinCostAssignment(unittest.TestCase):
+    def test_optimal_with_reassignment(self):
+        # Greedy would give day 0 to user 0 and leave day 1 to the expensive user 2
+        cost = np.array([[0.0, 1.0], [5.0, 9.0], [9.0, 9.0]])
+        eligible = np.ones((3, 2), dtype=bool)
+        unit_cost = np.array([[0.0, np.inf], [0.0, np.inf], [0.0, np.inf]])
+        assigned = min_cost_assignment(cost, eligible, np.array([1, 1]), unit_cost)
+        self.assertTrue(assigned[0, 1])
+        self.assertTrue(assigned[1, 0])
+        self.assertEqual(int(assigned.sum()), 2)
+
+    def test_one_slot_per_day_and_short_days(self):
+        cost = np.zeros((2, 2))
+        eligible = np.array([[True, False], [True, False]])
+        unit_cost = np.zeros((2, 2))
+        assigned = min_cost_assignment(cost, eligible, np.array([3, 1]), unit_cost)
+        self.assertEqual(assigned.sum(axis=0).tolist(), [2, 0])
+
+
+class TestBalancedScheduler(unittest.TestCase):
+    def setUp(self):
+        self.users = make_users()
+        self.rules = make_rules(loop_pool=["I", "E", "F", "D", "G", "H"])
+        self.start_date = START_DATE
+        self.end_date = datetime.date(2026, 12, 27)
+
+    def _by_date(self, schedules):
+        result = defaultdict(list)
+        for s in schedules:
+            result[s.date].append(s.user.code)
+        return result
+
+    def test_rules_and_sunday_copy_kept(self):
+        scheduler = BalancedScheduler(self.users, self.start_date, rules=self.rules)
+        by_date = self._by_date(scheduler.generate_range(self.start_date, self.end_date))
+        for d, codes in by_date.items():
+            self.assertEqual(len(codes), 2)
+            self.assertEqual(len(set(codes)), 2)
+            if d.weekday() == 0:
+                self.assertIn("A", codes)
+            if d.weekday() == 6:
+                self.assertEqual(sorted(codes), sorted(by_date[d - datetime.timedelta(days=1)]))
+
+    def test_loop_shifts_evened_out_with_history(self):
+        history = {"I": 30, "E": 0, "F": 10, "D": 5, "G": 0, "H": 20}
+        weekend = {"I": 10, "E": 0, "F": 2, "D": 0, "G": 0, "H": 5}
+        scheduler = BalancedScheduler(self.users, self.start_date, rules=self.rules,
+                                      history_counts=history, weekend_history_counts=weekend)
+        schedules = scheduler.generate_range(self.start_date, self.end_date)
+
+        pool = self.rules["loop_pool"]
+        totals = Counter(history)
+        totals.update(s.user.code for s in schedules if s.user.code in pool)
+        # Historical imbalance of 30 shifts is absorbed within the year
+        self.assertLessEqual(max(totals[c] for c in pool) - min(totals[c] for c in pool), 2)
+
+        # Users far behind are scheduled first
+        first_week = self._by_date(schedules)[self.start_date + datetime.timedelta(days=5)]
+        self.assertNotIn("I", first_week)
+
+    def test_rest_gap(self):
+        last = {"E": self.start_date - datetime.timedelta(days=1)}
+        scheduler = BalancedScheduler(self.users, self.start_date, rules=self.rules, last_duty_dates=last)
+        by_date = self._by_date(scheduler.generate_range(self.start_date, self.start_date + datetime.timedelta(days=6)))
+        self.assertNotIn("E", by_date[self.start_date])
+
+    def test_locked_slots_respected(self):
+        locked_date = self.start_date + datetime.timedelta(days=5)
+        base = BalancedScheduler(self.users, self.start_date, rules=self.rules)
+        locked = [s for s in base.generate_range(locked_date, locked_date) if s.date == locked_date][:1]
+        scheduler = BalancedScheduler(self.users, self.start_date, rules=self.rules)
+        by_date = self._by_date(scheduler.generate_range(self.start_date, self.end_date, locked))
+        self.assertIn(locked[0].user.code, by_date[locked_date])
+
+
+if __name__ == '__main__':
+    unittest.main()
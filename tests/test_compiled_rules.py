@@ -0,0 +1,47 @@
+import unittest
+import datetime
+from src.models import User
+from src.rules_manager import CompiledRules
+
+
+class TestCompiledRules(unittest.TestCase):
+    def setUp(self):
+        self.users = [User(id=i + 1, code=chr(65 + i), name=f"User {chr(65 + i)}") for i in range(6)]
+        self.rules = {
+            "days": {
+                "0": {"type": "fixed", "users": ["A", "ZZ"]},
+                "1": {"type": "fixed", "users": ["User B", "C"]},
+                "2": {"type": "rotation", "users": ["D", "E"]},
+                "3": {"type": "rotation", "users": ["F"]},
+                "4": {"type": "loop", "users": []},
+                "5": {"type": "loop", "users": []},
+                "6": {"type": "follow_saturday", "users": []}
+            },
+            "loop_pool": ["C", "ZZ", "User D", "E"],
+            "rotation_start_date": "not-a-date",
+            "loop_start_date": "2026-01-05"
+        }
+
+    def test_days_are_resolved(self):
+        compiled = CompiledRules(self.rules, self.users)
+        a, b, c, d, e, f = self.users
+        self.assertEqual(compiled.days[0], ("fixed", (a,)))
+        self.assertEqual(compiled.days[1], ("fixed", (b, c)))
+        self.assertEqual(compiled.days[2], ("rotation", (d, e)))
+        self.assertEqual(compiled.days[3], ("rotation", (f, f)))
+        self.assertEqual(compiled.days[4], ("loop", ()))
+
+    def test_consumption_uses_configured_counts(self):
+        compiled = CompiledRules(self.rules, self.users)
+        # Unknown fixed users still count towards the fixed slots
+        self.assertEqual(compiled.consumption, (0, 0, 1, 1, 2, 2, 0))
+
+    def test_pool_and_dates(self):
+        compiled = CompiledRules(self.rules, self.users)
+        self.assertEqual([u.code for u in compiled.loop_pool], ["C", "D", "E"])
+        self.assertEqual(compiled.loop_start_date, datetime.date(2026, 1, 5))
+        self.assertEqual(compiled.rotation_start_date, datetime.date(2024, 1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
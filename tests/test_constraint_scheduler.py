@@ -0,0 +1,99 @@
+import unittest
+import datetime
+from collections import defaultdict
+from src.scheduler import Scheduler
+from src.constraint_scheduler import ConstraintScheduler
+from scheduling_fixtures import make_users, make_rules
+
+
+class TestConstraintScheduler(unittest.TestCase):
+    def setUp(self):
+        self.users = make_users()
+        self.rules = make_rules(loop_pool=["I", "E", "F", "D", "G", "H"])
+        # 2024-12-30 is Monday, 2025-01-01 (元旦) is Wednesday
+        self.start_date = datetime.date(2024, 12, 30)
+        self.end_date = self.start_date + datetime.timedelta(weeks=8, days=-1)
+
+    def _by_date(self, schedules):
+        result = defaultdict(list)
+        for s in schedules:
+            result[s.date].append(s.user.code)
+        return result
+
+    def _run(self):
+        scheduler = ConstraintScheduler(self.users, self.start_date, rules=self.rules)
+        return scheduler, self._by_date(scheduler.generate_range(self.start_date, self.end_date))
+
+    def test_matches_rules_without_preferences(self):
+        expected = Scheduler(self.users, self.start_date, rules=self.rules).generate_range(
+            self.start_date, self.end_date)
+        _, actual = self._run()
+        self.assertEqual(self._by_date(expected), actual)
+
+    def test_blackout_and_holidays(self):
+        blackout = self.start_date + datetime.timedelta(days=12)
+        self.users[4].preferences = {"blackout_dates": [blackout.strftime("%Y-%m-%d")]} # E
+        self.users[8].preferences = {"avoid_holidays": ["元旦"]} # I
+        self.users[0].preferences = {"unavailable_dates": ["2025-01-06"]} # A, fixed on Monday
+
+        _, by_date = self._run()
+        self.assertNotIn("E", by_date[blackout])
+        self.assertNotIn("I", by_date[datetime.date(2025, 1, 1)])
+        self.assertNotIn("A", by_date[datetime.date(2025, 1, 6)])
+        self.assertEqual(len(by_date[datetime.date(2025, 1, 6)]), 2)
+
+    def test_avoid_pairing(self):
+        self.users[3].preferences = {"pairing_preference": {"avoid": ["E", "F"]}} # D
+        self.users[6].preferences = {"avoid_pairing": ["H"]} # G
+
+        _, by_date = self._run()
+        for d, codes in by_date.items():
+            self.assertFalse({"D", "E"} <= set(codes), f"D and E paired on {d}")
+            self.assertFalse({"D", "F"} <= set(codes), f"D and F paired on {d}")
+            self.assertFalse({"G", "H"} <= set(codes), f"G and H paired on {d}")
+
+    def test_preferred_weekdays_and_weekend_copy(self):
+        self.users[7].preferences = {"preferred_weekdays": [1]} # H prefers Tuesday
+
+        _, by_date = self._run()
+        for d, codes in by_date.items():
+            if d.weekday() == 1:
+                self.assertIn("H", codes)
+            if d.weekday() == 6:
+                self.assertEqual(sorted(codes), sorted(by_date[d - datetime.timedelta(days=1)]))
+
+    def test_weekly_cap(self):
+        self.users[7].preferences = {"preferred_weekdays": [0, 1, 2, 3, 4, 5]}
+        scheduler, by_date = self._run()
+        weekly = defaultdict(int)
+        for d, codes in by_date.items():
+            if "H" in codes and d.weekday() < 6:
+                weekly[d - datetime.timedelta(days=d.weekday())] += 1
+        self.assertTrue(all(count <= scheduler.max_shifts_per_week for count in weekly.values()))
+
+    def test_infeasible_cap_fails_without_search(self):
+        # Everyone in the pool but I avoids everyone but I, so I is needed on
+        # all six loop days of a week: more than the weekly cap allows
+        pool = self.rules["loop_pool"]
+        for user in self.users:
+            if user.code in pool and user.code != "I":
+                user.preferences = {"avoid_pairing": [c for c in pool if c not in ("I", user.code)]}
+        self.rules["days"] = {str(i): {"type": "loop", "users": []} for i in range(6)}
+        self.rules["days"]["6"] = {"type": "follow_saturday", "users": []}
+
+        scheduler = ConstraintScheduler(self.users, self.start_date, rules=self.rules)
+        _, day_mask = scheduler.compile_availability(self.start_date, 7)
+        calls = []
+        fill_options = scheduler._fill_options
+        scheduler._fill_options = lambda *args: calls.append(args) or fill_options(*args)
+        self.assertIsNone(scheduler._solve_week(self.start_date, 0, {}, True, 0, day_mask,
+                                                scheduler.max_shifts_per_week))
+        self.assertEqual(calls, [])
+
+        # The relaxed retry still fills every day around I
+        by_date = self._by_date(scheduler.generate_range(self.start_date, self.end_date))
+        self.assertTrue(all("I" in codes and len(codes) == 2 for codes in by_date.values()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+import unittest
+import os
+import tempfile
+import datetime
+import sqlite3
+from sqlalchemy import inspect
+from src.db_manager import DBManager
+from src.models import Schedule
+
+
+class TestBulkSaveSchedules(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "schedule.db")
+        self.db = DBManager(self.db_path)
+        self.db.init_default_users()
+        self.users = self.db.get_all_users()
+
+    def tearDown(self):
+        self.db.engine.dispose()
+        self.tmp.cleanup()
+
+    def test_upsert_inserts_and_updates(self):
+        d = datetime.date(2026, 3, 2)
+        self.db.save_schedules([
+            Schedule(date=d, user_id=self.users[0].id, is_locked=False),
+            Schedule(date=d, user_id=self.users[1].id, is_locked=False),
+        ])
+        self.db.save_schedules([
+            Schedule(date=d, user_id=self.users[0].id, is_locked=True),
+            Schedule(date=d + datetime.timedelta(days=1), user_id=self.users[2].id, is_locked=False),
+        ])
+
+        rows = {(s.date, s.user_id): s.is_locked for s in self.db.get_all_schedules()}
+        self.assertEqual(len(rows), 3)
+        self.assertTrue(rows[(d, self.users[0].id)])
+        self.assertFalse(rows[(d, self.users[1].id)])
+
+    def test_writes_return_deltas(self):
+        d = datetime.date(2026, 3, 2)
+        a, b = self.users[0].id, self.users[1].id
+        delta = self.db.save_schedules([
+            Schedule(date=d, user_id=a, is_locked=False),
+            Schedule(date=d, user_id=b, is_locked=False),
+        ])
+        self.assertEqual(delta.inserts, [(d, a, False), (d, b, False)])
+
+        delta = self.db.save_schedules([Schedule(date=d, user_id=a, is_locked=True)])
+        self.assertEqual((delta.inserts, delta.lock_flips), ([], [(d, a, True)]))
+
+        self.assertTrue(self.db.add_schedule(d, a).is_empty())
+        self.assertEqual(self.db.add_schedule(d, self.users[2].id).inserts, [(d, self.users[2].id, False)])
+        self.assertEqual(self.db.delete_schedule(d, b).deletes, [(d, b)])
+        self.assertTrue(self.db.delete_schedule(d, b).is_empty())
+        self.assertEqual(self.db.clear_range_schedules(d, d).deletes, [(d, self.users[2].id)])
+        self.assertEqual(self.db.delete_day_schedule(d).deletes, [(d, a)])
+        self.assertEqual(self.db.get_all_schedules(), [])
+
+    def test_large_batch(self):
+        start = datetime.date(2026, 1, 1)
+        schedules = [
+            Schedule(date=start + datetime.timedelta(days=i // 2), user_id=self.users[i % 2].id, is_locked=False)
+            for i in range(20000)
+        ]
+        self.db.save_schedules(schedules)
+        self.db.save_schedules(schedules)
+        self.assertEqual(len(self.db.get_all_schedules()), 20000)
+
+    def test_migration_dedupes_existing_database(self):
+        self.db.engine.dispose()
+        legacy_path = os.path.join(self.tmp.name, "legacy.db")
+        conn = sqlite3.connect(legacy_path)
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, code VARCHAR NOT NULL UNIQUE, "
+                     "group_type VARCHAR(13), color VARCHAR, preferences JSON, name VARCHAR, "
+                     "position VARCHAR, contact VARCHAR, is_active BOOLEAN)")
+        conn.execute("CREATE TABLE schedules (id INTEGER PRIMARY KEY, date DATE NOT NULL, "
+                     "user_id INTEGER NOT NULL REFERENCES users(id), is_locked BOOLEAN)")
+        conn.execute("INSERT INTO users (id, code) VALUES (1, 'A')")
+        conn.executemany("INSERT INTO schedules (date, user_id, is_locked) VALUES (?, ?, ?)",
+                         [("2026-01-05", 1, 0), ("2026-01-05", 1, 1), ("2026-01-06", 1, 0),
+                          ("2026-01-06", 1, 0)])
+        conn.commit()
+        conn.close()
+
+        db = DBManager(legacy_path)
+        try:
+            # The locked copy survives even though the unlocked one has the lower id
+            rows = {s.date: s.is_locked for s in db.get_all_schedules()}
+            self.assertEqual(rows, {datetime.date(2026, 1, 5): True, datetime.date(2026, 1, 6): False})
+            db.save_schedules([Schedule(date=datetime.date(2026, 1, 5), user_id=1, is_locked=True)])
+            rows = {s.date: s.is_locked for s in db.get_all_schedules()}
+            self.assertTrue(rows[datetime.date(2026, 1, 5)])
+            self.assertEqual(len(rows), 2)
+
+            indexes = {ix['name'] for ix in inspect(db.engine).get_indexes("schedules")}
+            self.assertTrue({ix.name for ix in Schedule.__table__.indexes} <= indexes)
+        finally:
+            db.engine.dispose()
+
+
+class TestReplaceSchedules(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DBManager(os.path.join(self.tmp.name, "schedule.db"))
+        self.db.init_default_users()
+        self.users = self.db.get_all_users()
+        self.start = datetime.date(2026, 3, 2)
+
+    def tearDown(self):
+        self.db.engine.dispose()
+        self.tmp.cleanup()
+
+    def _plan(self, pairs):
+        return [Schedule(date=self.start + datetime.timedelta(days=day), user_id=self.users[u].id, is_locked=locked)
+                for day, u, locked in pairs]
+
+    def test_only_changes_are_written(self):
+        first = self._plan([(0, 0, False), (0, 1, False), (1, 2, False), (1, 3, False), (2, 4, False)])
+        delta = self.db.replace_schedules(first)
+        self.assertEqual(len(delta.inserts), 5)
+        ids_before = {(s.date, s.user_id): s.id for s in self.db.get_all_schedules()}
+
+        second = self._plan([(0, 0, True), (0, 1, False), (1, 2, False), (1, 5, False), (2, 4, False)])
+        delta = self.db.replace_schedules(second)
+        self.assertEqual(delta.inserts, [(self.start + datetime.timedelta(days=1), self.users[5].id, False)])
+        self.assertEqual(delta.deletes, [(self.start + datetime.timedelta(days=1), self.users[3].id)])
+        self.assertEqual(delta.lock_flips, [(self.start, self.users[0].id, True)])
+
+        after = {(s.date, s.user_id): s for s in self.db.get_all_schedules()}
+        self.assertEqual(len(after), 5)
+        self.assertTrue(after[(self.start, self.users[0].id)].is_locked)
+        for key in ((self.start, self.users[1].id), (self.start + datetime.timedelta(days=2), self.users[4].id)):
+            self.assertEqual(after[key].id, ids_before[key])
+
+        self.assertTrue(self.db.replace_schedules(second).is_empty())
+
+    def test_rows_outside_range_untouched(self):
+        self.db.replace_schedules(self._plan([(0, 0, False), (5, 1, False)]))
+        self.db.replace_schedules(self._plan([(1, 2, False), (2, 3, False)]))
+        dates = sorted(s.date for s in self.db.get_all_schedules())
+        self.assertEqual(dates, [self.start + datetime.timedelta(days=d) for d in (0, 1, 2, 5)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+import os
+import tempfile
+import datetime
+from unittest import mock
+from sqlalchemy import text
+from src.db_manager import DBManager
+
+
+class TestDBProfiles(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "schedule.db")
+        patcher = mock.patch.object(DBManager, "SETTINGS_FILE", os.path.join(self.tmp.name, "db_settings.json"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _pragma(self, db, name):
+        with db.engine.connect() as conn:
+            return conn.execute(text(f"PRAGMA {name}")).scalar()
+
+    def test_performance_pragmas(self):
+        db = DBManager(self.db_path, profile="performance")
+        try:
+            self.assertEqual(self._pragma(db, "journal_mode"), "wal")
+            self.assertEqual(self._pragma(db, "synchronous"), 1)  # NORMAL
+            self.assertEqual(self._pragma(db, "temp_store"), 2)  # MEMORY
+            self.assertEqual(self._pragma(db, "cache_size"), -65536)
+        finally:
+            db.engine.dispose()
+
+    def test_switch_profile_persists(self):
+        self.assertEqual(DBManager.load_profile(), DBManager.DEFAULT_PROFILE)
+        db = DBManager(self.db_path)
+        db.init_default_users()
+        user = db.get_all_users()[0]
+        try:
+            db.set_profile("performance")
+            self.assertEqual(self._pragma(db, "journal_mode"), "wal")
+            db.add_schedule(datetime.date(2026, 1, 5), user.id)
+            self.assertEqual(len(db.get_all_schedules()), 1)
+
+            db.set_profile("standard")
+            self.assertEqual(self._pragma(db, "journal_mode"), "delete")
+            self.assertEqual(DBManager.load_profile(), "standard")
+        finally:
+            db.engine.dispose()
+
+        with self.assertRaises(ValueError):
+            DBManager(self.db_path).set_profile("unknown")
+
+
+if __name__ == '__main__':
+    unittest.main()
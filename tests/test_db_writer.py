@@ -0,0 +1,89 @@
+import unittest
+import os
+import tempfile
+import datetime
+from unittest import mock
+from src.db_manager import DBManager
+from src.db_writer import DBWriter
+from src.schedule_delta import ScheduleDelta
+
+
+class TestDBWriter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        patcher = mock.patch.object(DBManager, "SETTINGS_FILE", os.path.join(self.tmp.name, "db_settings.json"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.db = DBManager(os.path.join(self.tmp.name, "schedule.db"))
+        self.db.init_default_users()
+        self.users = self.db.get_all_users()
+        self.done = []
+        self.failed = []
+        self.writer = DBWriter(self.db,
+                               on_done=lambda c, r: self.done.append((c, r)),
+                               on_failed=lambda c, m: self.failed.append((c, m)))
+
+    def tearDown(self):
+        self.writer.stop()
+        self.db.engine.dispose()
+        self.tmp.cleanup()
+
+    def _rows(self):
+        return sorted((s.date, s.user_id, s.is_locked) for s in self.db.get_all_schedules())
+
+    def test_small_writes_share_one_transaction(self):
+        d = datetime.date(2026, 3, 2)
+        a, b = self.users[0].id, self.users[1].id
+        # Queued before the thread starts, so they are adjacent
+        self.writer.submit("add_schedule", d, a)
+        self.writer.submit("add_schedule", d, b, is_locked=True)
+        self.writer.submit("delete_schedule", d, a)
+        self.writer.submit("replace_schedules", [])
+        self.writer.submit("add_schedule", d, a)
+
+        with mock.patch.object(self.db, "write_batch", wraps=self.db.write_batch) as batches:
+            self.writer.start()
+            self.writer.join()
+        self.assertEqual(batches.call_count, 3)
+
+        self.assertEqual([c.method for c, _ in self.done],
+                         ["add_schedule", "add_schedule", "delete_schedule", "replace_schedules", "add_schedule"])
+        self.assertEqual(self.done[1][1].inserts, [(d, b, True)])
+        self.assertEqual(self.done[2][1].deletes, [(d, a)])
+        self.assertEqual(self._rows(), [(d, a, False), (d, b, True)])
+        self.assertEqual(self.failed, [])
+
+    def test_failure_is_isolated(self):
+        d = datetime.date(2026, 3, 2)
+        a, b = self.users[0].id, self.users[1].id
+        self.writer.submit("add_schedule", d, a)
+        # Duplicate key: violates the unique (date, user_id) index
+        bad = self.writer.submit("apply_schedule_delta", ScheduleDelta(inserts=[(d, b, False), (d, b, False)]),
+                                 context={"error": "x"})
+        self.writer.submit("add_schedule", d, b)
+        self.writer.start()
+        self.writer.join()
+
+        self.assertEqual(len(self.failed), 1)
+        self.assertIs(self.failed[0][0], bad)
+        self.assertEqual(bad.context["error"], "x")
+        self.assertEqual(self._rows(), [(d, a, False), (d, b, False)])
+
+    def test_reconnects_after_profile_switch(self):
+        d = datetime.date(2026, 3, 2)
+        self.writer.start()
+        self.writer.submit("add_schedule", d, self.users[0].id)
+        self.writer.join()
+        self.db.set_profile("performance")
+        self.writer.submit("add_schedule", d, self.users[1].id)
+        self.writer.join()
+        self.assertEqual(len(self._rows()), 2)
+        self.assertEqual(self.failed, [])
+
+    def test_rejects_unknown_methods(self):
+        with self.assertRaises(ValueError):
+            self.writer.submit("delete_user", 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+import os
+import tempfile
+import datetime
+import sqlite3
+from sqlalchemy import func
+from src.db_manager import DBManager
+from src.models import User, Schedule
+
+
+class TestDutyStats(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DBManager(os.path.join(self.tmp.name, "schedule.db"))
+        self.db.init_default_users()
+        self.users = self.db.get_all_users()
+
+    def tearDown(self):
+        self.db.engine.dispose()
+        self.tmp.cleanup()
+
+    def _from_schedules(self, db):
+        """The original full-scan queries, as the reference."""
+        session = db.get_session()
+        totals = dict(session.query(User.code, func.count(Schedule.id))
+                      .join(Schedule, User.id == Schedule.user_id).group_by(User.code).all())
+        weekend = dict(session.query(User.code, func.count(Schedule.id))
+                       .join(Schedule, User.id == Schedule.user_id)
+                       .filter(func.strftime('%w', Schedule.date).in_(['0', '6']))
+                       .group_by(User.code).all())
+        last = dict(session.query(User.code, func.max(Schedule.date))
+                    .join(Schedule, User.id == Schedule.user_id).group_by(User.code).all())
+        session.close()
+        return totals, weekend, last
+
+    def _from_stats(self, db):
+        return db.get_history_counts(), db.get_weekend_history_counts(), db.get_last_duty_dates()
+
+    def test_writes_keep_stats_current(self):
+        a, b = self.users[0].id, self.users[1].id
+        d = datetime.date(2025, 12, 27)  # Saturday
+        self.db.add_schedule(d, a)
+        self.db.add_schedule(d + datetime.timedelta(days=1), a)
+        self.db.add_schedule(d + datetime.timedelta(days=6), a)  # 2026-01-02
+        self.db.save_schedules([Schedule(date=d, user_id=b, is_locked=True)])
+        self.assertEqual(self._from_stats(self.db), self._from_schedules(self.db))
+        self.assertEqual(self.db.get_yearly_duty_counts(2025), {"A": 2, "B": 1})
+        self.assertEqual(self.db.get_weekend_history_counts()["A"], 2)
+
+        self.db.replace_schedules([Schedule(date=d + datetime.timedelta(days=i), user_id=b, is_locked=False)
+                                   for i in range(7)])
+        self.assertEqual(self._from_stats(self.db), self._from_schedules(self.db))
+
+        self.db.delete_schedule(d + datetime.timedelta(days=6), b)
+        self.db.clear_range_schedules(d, d + datetime.timedelta(days=2), keep_locked=False)
+        self.assertEqual(self._from_stats(self.db), self._from_schedules(self.db))
+        self.assertEqual(self.db.get_last_duty_dates()["B"], datetime.date(2026, 1, 1))
+
+        self.db.delete_user(b)
+        self.assertEqual(self._from_stats(self.db), self._from_schedules(self.db))
+        self.assertEqual(self.db.get_history_counts(), {})
+
+    def test_existing_database_is_backfilled(self):
+        self.db.save_schedules([
+            Schedule(date=datetime.date(2024, 1, 1) + datetime.timedelta(days=i // 2),
+                     user_id=self.users[i % len(self.users)].id, is_locked=False)
+            for i in range(1000)
+        ])
+        expected = self._from_schedules(self.db)
+        self.db.engine.dispose()
+
+        # Simulate a schedule.db from before the aggregate table existed
+        conn = sqlite3.connect(self.db.db_path)
+        conn.execute("DROP TABLE user_duty_stats")
+        for name in DBManager.DUTY_STATS_TRIGGERS:
+            conn.execute(f"DROP TRIGGER {name}")
+        conn.commit()
+        conn.close()
+
+        db = DBManager(self.db.db_path)
+        try:
+            self.assertEqual(self._from_stats(db), expected)
+        finally:
+            db.engine.dispose()
+
+
+if __name__ == '__main__':
+    unittest.main()
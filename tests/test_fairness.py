@@ -0,0 +1,112 @@
+import unittest
+import datetime
+import itertools
+import numpy as np
+from src import fairness
+from src.statistics_manager import StatisticsManager
+from src.models import User
+from src.schedule_records import ScheduleRecord
+
+
+def brute_runs(row):
+    best = run = 0
+    for v in row:
+        run = run + 1 if v else 0
+        best = max(best, run)
+    return best
+
+
+def brute_gap(row):
+    days = [i for i, v in enumerate(row) if v]
+    gaps = [b - a - 1 for a, b in zip(days, days[1:])]
+    return min(gaps) if gaps else np.inf
+
+
+def brute_gini(values):
+    n = len(values)
+    total = sum(values)
+    if total == 0:
+        return 0.0
+    return sum(abs(a - b) for a, b in itertools.product(values, values)) / (2 * n * total)
+
+
+class TestFairness(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.occ = (rng.random((8, 6, 40)) < 0.3).astype(np.int8)
+        self.weekend = (np.arange(40) % 7) >= 5
+
+    def test_metrics_match_loops(self):
+        m = fairness.evaluate(self.occ, self.weekend)
+        for p in range(self.occ.shape[0]):
+            plan = self.occ[p]
+            totals = plan.sum(axis=1)
+            weekend = plan[:, self.weekend].sum(axis=1)
+            self.assertAlmostEqual(m["gini"][p], brute_gini(totals.tolist()))
+            self.assertAlmostEqual(m["std"][p], np.std(totals))
+            for u in range(plan.shape[0]):
+                self.assertEqual(m["max_consecutive"][p, u], brute_runs(plan[u]))
+                self.assertEqual(m["min_rest_gap"][p, u], brute_gap(plan[u]))
+                partners = [int((plan[u] & plan[v]).sum()) for v in range(plan.shape[0]) if v != u]
+                expected = max(partners) / totals[u] if totals[u] else 0.0
+                self.assertAlmostEqual(m["pair_repetition"][p, u], expected)
+                self.assertAlmostEqual(m["weekend_share_deviation"][p, u],
+                                       weekend[u] / weekend.sum() - 1 / plan.shape[0])
+
+        # A batch scores the same as its plans one at a time
+        batch = fairness.score(self.occ, self.weekend)
+        single = [fairness.score(self.occ[p], self.weekend) for p in range(self.occ.shape[0])]
+        np.testing.assert_allclose(batch, single)
+
+    def test_sparse_plan_metrics_match_dense(self):
+        rng = np.random.default_rng(5)
+        n_users, n_plans, n_days = 9, 30, 56
+        plans = np.stack([np.stack([rng.choice(n_users, 2, replace=False) for _ in range(n_days)])
+                          for _ in range(n_plans)])
+        plans[rng.random(plans.shape) < 0.1] = -1
+        weekend = np.arange(n_days) % 7 >= 5
+        # Only users 1..6 count, as with a loop pool
+        pool = np.arange(1, 7)
+        user_rows = np.full(n_users, -1)
+        user_rows[pool] = np.arange(len(pool))
+        base = np.arange(len(pool))
+
+        sparse = fairness.evaluate_plans(plans, weekend, len(pool), user_rows, base_totals=base)
+        dense = fairness.evaluate(fairness.plans_to_occupancy(plans, n_users)[:, pool], weekend, base_totals=base)
+        for name, value in dense.items():
+            np.testing.assert_allclose(sparse[name], value, err_msg=name)
+
+    def test_plans_to_occupancy(self):
+        plans = np.array([[[0, 2], [1, -1]], [[2, 1], [-1, -1]]])
+        occ = fairness.plans_to_occupancy(plans, 3)
+        self.assertEqual(occ.shape, (2, 3, 2))
+        self.assertEqual(occ[0].tolist(), [[1, 0], [0, 1], [1, 0]])
+        self.assertEqual(occ[1].tolist(), [[0, 0], [1, 0], [1, 0]])
+
+    def test_even_rotation_scores_better(self):
+        n_users, n_days = 4, 28
+        even = np.zeros((n_users, n_days), dtype=np.int8)
+        even[np.arange(n_days) % n_users, np.arange(n_days)] = 1
+        lumpy = np.zeros_like(even)
+        lumpy[0, :14] = 1
+        lumpy[1, 14:] = 1
+        weekend = np.arange(n_days) % 7 >= 5
+        self.assertLess(fairness.score(even, weekend), fairness.score(lumpy, weekend))
+        self.assertEqual(fairness.evaluate(even, weekend)["gini"], 0.0)
+        self.assertEqual(fairness.evaluate(lumpy, weekend)["worst_max_consecutive"], 14)
+
+    def test_statistics_report(self):
+        users = [User(id=i + 1, code=code, name=code) for i, code in enumerate("ABC")]
+        start = datetime.date(2026, 3, 2)  # Monday
+        schedules = [ScheduleRecord(None, start + datetime.timedelta(days=d), users[d % 3].id, False, users[d % 3])
+                     for d in range(14)]
+        report = StatisticsManager(schedules, users).get_fairness_report(start, start + datetime.timedelta(days=13))
+        self.assertEqual(set(report["users"]), {"A", "B", "C"})
+        self.assertEqual(report["users"]["A"]["totals"], 5)
+        self.assertEqual(report["users"]["A"]["min_rest_gap"], 2)
+        self.assertEqual(report["worst_max_consecutive"], 1)
+        self.assertGreater(report["gini"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,192 @@
+import unittest
+import datetime
+from unittest import mock
+from src.scheduler import Scheduler
+from src.balanced_scheduler import BalancedScheduler
+from src.incremental_planner import IncrementalPlanner
+from src.schedule_delta import ScheduleDelta
+from scheduling_fixtures import START_DATE, make_users, make_rules, make_lock
+
+
+class TestIncrementalPlanner(unittest.TestCase):
+    def setUp(self):
+        self.users = make_users()
+        self.user_map = {u.code: u for u in self.users}
+        self.rules = make_rules()
+        self.start_date = START_DATE
+        self.end_date = self.start_date + datetime.timedelta(weeks=8, days=-1)
+
+    def _plan(self, rules, locks):
+        scheduler = Scheduler(self.users, self.start_date, rules=rules)
+        return scheduler.generate_range(self.start_date, self.end_date, locks)
+
+    def _cursor_at(self, rules, monday):
+        scheduler = Scheduler(self.users, self.start_date, rules=rules)
+        if monday > self.start_date:
+            scheduler.generate_range(self.start_date, monday - datetime.timedelta(days=1))
+        return scheduler.new_loop_index
+
+    @staticmethod
+    def _applied(rows, delta):
+        rows = {(d, uid): locked for d, uid, locked in rows}
+        for key in delta.deletes:
+            rows.pop(key, None)
+        for d, uid, locked in delta.lock_flips + delta.inserts:
+            rows[(d, uid)] = locked
+        return {(d, uid, locked) for (d, uid), locked in rows.items()}
+
+    def _lock(self, d, code):
+        return make_lock(self.users, d, code)
+
+    def _assert_delta_reaches_full_replan(self, rules, changed_date, code, loop_index=0):
+        stored = self._plan(rules, [])
+        lock = self._lock(changed_date, code)
+        # Stored rows after the drag-drop wrote the locked row
+        current = [s for s in stored if not (s.date == changed_date and s.user_id == lock.user_id)] + [lock]
+
+        planner = IncrementalPlanner(self.users, rules=rules)
+        delta = planner.replan(changed_date, current, self.end_date, loop_index=loop_index)
+
+        expected = {(s.date, s.user_id, bool(s.is_locked)) for s in self._plan(rules, [lock])}
+        rows = {(s.date, s.user_id, bool(s.is_locked)) for s in current}
+        rows = {r for r in rows if (r[0], r[1]) not in set(delta.deletes)}
+        flips = {(d, uid): locked for d, uid, locked in delta.lock_flips}
+        rows = {(d, uid, flips.get((d, uid), locked)) for d, uid, locked in rows}
+        rows.update(delta.inserts)
+        self.assertEqual(rows, expected)
+        return delta
+
+    def test_anchor_change_stays_in_week(self):
+        changed = self.start_date + datetime.timedelta(days=8) # Tuesday of week 2
+        delta = self._assert_delta_reaches_full_replan(self.rules, changed, "H")
+        week_end = changed + datetime.timedelta(days=5)
+        self.assertTrue(delta.touched_dates())
+        self.assertTrue(all(changed <= d <= week_end for d in delta.touched_dates()))
+
+    def test_without_anchor_replans_until_realigned(self):
+        rules = dict(self.rules)
+        del rules["loop_start_date"]
+        changed = self.start_date + datetime.timedelta(days=8)
+        # One week of draws (7 slots) precedes the changed week
+        self._assert_delta_reaches_full_replan(rules, changed, "H", loop_index=7)
+
+    def test_duplicate_pool_codes_wait_for_the_cursor(self):
+        # Equal weekly output does not mean the cursors agree when codes repeat
+        rules = dict(self.rules, loop_pool=["I", "E", "I", "E"])
+        del rules["loop_start_date"]
+        stored = self._plan(rules, [])
+        planner = IncrementalPlanner(self.users, rules=rules)
+        for day in range(21):
+            changed = self.start_date + datetime.timedelta(days=day)
+            monday = changed - datetime.timedelta(days=changed.weekday())
+            for code in "DEI":
+                lock = self._lock(changed, code)
+                window = [s for s in stored if s.date >= monday]
+                delta = planner.plan_edit(ScheduleDelta(inserts=[(changed, lock.user_id, True)]),
+                                          window, self.end_date, loop_index=self._cursor_at(rules, monday))
+                expected = {(s.date, s.user_id, bool(s.is_locked)) for s in self._plan(rules, [lock])
+                            if s.date >= monday}
+                self.assertEqual(self._applied(IncrementalPlanner._rows(window), delta), expected, (changed, code))
+
+    def test_cleared_day_stays_empty(self):
+        stored = self._plan(self.rules, [])
+        changed = self.start_date + datetime.timedelta(days=9)  # Wednesday of week 2
+        removed = [(s.date, s.user_id) for s in stored if s.date == changed]
+        planner = IncrementalPlanner(self.users, rules=self.rules)
+        delta = planner.plan_edit(ScheduleDelta(deletes=removed), stored, self.end_date)
+
+        rows = self._applied(IncrementalPlanner._rows(stored), delta)
+        self.assertFalse([r for r in rows if r[0] == changed])
+        # The skipped draws move to the following days of the week only
+        week_end = changed + datetime.timedelta(days=4)
+        self.assertTrue(all(changed <= d <= week_end for d in delta.touched_dates()))
+        self.assertTrue(delta.inserts)
+
+    def test_removed_user_is_not_refilled(self):
+        stored = self._plan(self.rules, [])
+        changed = self.start_date + datetime.timedelta(days=7)  # Monday of week 2: A (fixed) + one draw
+        fixed_user = self.user_map["A"].id
+        planner = IncrementalPlanner(self.users, rules=self.rules)
+        delta = planner.plan_edit(ScheduleDelta(deletes=[(changed, fixed_user)]), stored, self.end_date)
+
+        day = {uid: locked for d, uid, locked in self._applied(IncrementalPlanner._rows(stored), delta)
+               if d == changed}
+        # The remaining user is locked in place, the fixed user is not put back
+        self.assertEqual(len(day), 1)
+        self.assertNotIn(fixed_user, day)
+        self.assertTrue(all(day.values()))
+
+    def test_move_across_weeks_replans_both_weeks(self):
+        stored = self._plan(self.rules, [])
+        source = self.start_date + datetime.timedelta(days=5)  # Saturday of week 1 (loop draws)
+        target = self.start_date + datetime.timedelta(days=15)  # Tuesday of week 3
+        user_id = next(s.user_id for s in stored if s.date == source)
+        planner = IncrementalPlanner(self.users, rules=self.rules)
+        edit = ScheduleDelta(inserts=[(target, user_id, True)], deletes=[(source, user_id)])
+        delta = planner.plan_edit(edit, stored, self.end_date)
+
+        rows = self._applied(IncrementalPlanner._rows(stored), delta)
+        self.assertNotIn(user_id, {uid for d, uid, _ in rows if d == source})
+        self.assertIn((target, user_id, True), rows)
+        self.assertEqual(len([r for r in rows if r[0] == target]), 2)
+        expected_target = {(s.date, s.user_id, bool(s.is_locked)) for s in self._plan(
+            self.rules, [self._lock(target, self.users[user_id - 1].code)]) if s.date == target}
+        self.assertEqual({r for r in rows if r[0] == target}, expected_target)
+        # Week 2 keeps its rows: the anchor realigns every Monday
+        monday_2 = self.start_date + datetime.timedelta(days=7)
+        week_2 = [d for d in delta.touched_dates() if monday_2 <= d < monday_2 + datetime.timedelta(days=7)]
+        self.assertEqual(week_2, [])
+
+    def _balanced_plan(self):
+        # History makes the balanced engine leave the pool order
+        history = {"I": 12, "E": 9, "F": 0, "D": 3, "G": 6}
+        scheduler = BalancedScheduler(self.users, self.start_date, rules=self.rules, history_counts=history)
+        return scheduler.generate_range(self.start_date, self.end_date)
+
+    def test_drop_on_balanced_plan_changes_only_that_day(self):
+        stored = self._balanced_plan()
+        monday = self.start_date + datetime.timedelta(days=7)
+        week = {(s.date, s.user_id, bool(s.is_locked)) for s in stored
+                if monday <= s.date < monday + datetime.timedelta(days=7)}
+        cyclic = {(s.date, s.user_id, bool(s.is_locked)) for s in self._plan(self.rules, [])
+                  if monday <= s.date < monday + datetime.timedelta(days=7)}
+        self.assertNotEqual(week, cyclic)
+
+        user_id = self.user_map["H"].id
+        planner = IncrementalPlanner(self.users, rules=self.rules)
+        for loop_index in (None, 0):
+            delta = planner.plan_edit(ScheduleDelta(inserts=[(monday, user_id, True)]), stored,
+                                      self.end_date, loop_index=loop_index)
+            self.assertEqual(delta.inserts, [(monday, user_id, True)])
+            self.assertEqual(delta.touched_dates(), [monday])
+
+    def test_move_across_weeks_leaves_weeks_between(self):
+        end_date = self.start_date + datetime.timedelta(weeks=11, days=-1)
+        cyclic = Scheduler(self.users, self.start_date, rules=self.rules).generate_range(self.start_date, end_date)
+        history = {"I": 12, "E": 9, "F": 0, "D": 3, "G": 6}
+        balanced = BalancedScheduler(self.users, self.start_date, rules=self.rules,
+                                     history_counts=history).generate_range(self.start_date, end_date)
+        source = self.start_date + datetime.timedelta(days=1)  # Tuesday of week 0
+        target = self.start_date + datetime.timedelta(weeks=10, days=1)  # Tuesday of week 10
+        # Cyclic plan in the edited weeks, balanced plan in between
+        between = (self.start_date + datetime.timedelta(weeks=1), target - datetime.timedelta(days=1))
+        stored = [s for s in cyclic if not between[0] <= s.date <= between[1]]
+        stored += [s for s in balanced if between[0] <= s.date <= between[1]]
+
+        user_id = next(s.user_id for s in stored if s.date == source and s.user_id != self.user_map["C"].id)
+        edit = ScheduleDelta(inserts=[(target, user_id, True)], deletes=[(source, user_id)])
+        planner = IncrementalPlanner(self.users, rules=self.rules)
+        with mock.patch.object(Scheduler, "_fill_week", autospec=True, side_effect=Scheduler._fill_week) as fill:
+            delta = planner.plan_edit(edit, stored, end_date, loop_index=None)
+
+        self.assertTrue(delta.touched_dates())
+        self.assertFalse([d for d in delta.touched_dates() if between[0] <= d <= between[1]])
+        self.assertEqual({call.args[1] for call in fill.call_args_list},
+                         {self.start_date, self.start_date + datetime.timedelta(weeks=10)})
+        rows = self._applied(IncrementalPlanner._rows(stored), delta)
+        self.assertIn((target, user_id, True), rows)
+        self.assertNotIn(user_id, {uid for d, uid, _ in rows if d == source})
+
+
+if __name__ == '__main__':
+    unittest.main()
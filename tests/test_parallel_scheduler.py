@@ -0,0 +1,45 @@
+import unittest
+import datetime
+from src.scheduler import Scheduler
+from src.parallel_scheduler import generate_range_parallel
+from scheduling_fixtures import START_DATE, make_users, make_rules, make_lock
+
+
+class TestParallelScheduler(unittest.TestCase):
+    def setUp(self):
+        self.users = make_users()
+        self.rules = make_rules()
+        self.start_date = START_DATE
+        self.week_starts = [self.start_date + datetime.timedelta(weeks=w) for w in range(30)]
+
+        self.existing = [make_lock(self.users, self.start_date + datetime.timedelta(days=offset), code)
+                         for offset, code in [(3, "D"), (60, "I"), (150, "E")]]
+
+    def _sequential(self, rules):
+        scheduler = Scheduler(self.users, self.start_date, loop_index=2, rules=rules)
+        end = self.week_starts[-1] + datetime.timedelta(days=6)
+        schedules = scheduler.generate_range(self.start_date, end, self.existing)
+        return [(s.date, s.user_id, s.is_locked) for s in schedules], scheduler.new_loop_index
+
+    def test_parallel_matches_sequential(self):
+        expected, expected_index = self._sequential(self.rules)
+        schedules, loop_index = generate_range_parallel(
+            self.users, self.rules, self.week_starts, self.existing,
+            loop_index=2, max_workers=2, chunk_weeks=8)
+        self.assertEqual([(s.date, s.user_id, s.is_locked) for s in schedules], expected)
+        self.assertEqual(loop_index, expected_index)
+        self.assertTrue(all(s.user is not None for s in schedules))
+
+    def test_without_anchor_runs_sequentially(self):
+        rules = dict(self.rules)
+        del rules["loop_start_date"]
+        expected, expected_index = self._sequential(rules)
+        schedules, loop_index = generate_range_parallel(
+            self.users, rules, self.week_starts, self.existing,
+            loop_index=2, max_workers=2, chunk_weeks=8)
+        self.assertEqual([(s.date, s.user_id, s.is_locked) for s in schedules], expected)
+        self.assertEqual(loop_index, expected_index)
+
+
+if __name__ == '__main__':
+    unittest.main()
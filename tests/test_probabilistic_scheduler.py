@@ -0,0 +1,89 @@
+import unittest
+import datetime
+import numpy as np
+from collections import defaultdict
+from src.probabilistic_scheduler import AliasTable, ProbabilisticScheduler
+from scheduling_fixtures import START_DATE, make_users, make_rules
+
+
+class TestAliasTable(unittest.TestCase):
+    def test_distribution_and_update(self):
+        rng = np.random.default_rng(0)
+        weights = np.array([1.0, 0.0, 3.0, 6.0, 2.0, 8.0, 0.5])
+        table = AliasTable(weights, block_size=3)
+        draws = table.sample(rng, 200000)
+        freq = np.bincount(draws, minlength=len(weights)) / len(draws)
+        np.testing.assert_allclose(freq, weights / weights.sum(), atol=0.01)
+
+        table.update([1, 5], [4.0, 0.0])
+        weights[[1, 5]] = [4.0, 0.0]
+        draws = table.sample(rng, 200000)
+        freq = np.bincount(draws, minlength=len(weights)) / len(draws)
+        np.testing.assert_allclose(freq, weights / weights.sum(), atol=0.01)
+
+    def test_all_zero(self):
+        table = AliasTable(np.zeros(4))
+        self.assertTrue((table.sample(np.random.default_rng(0), 5) == -1).all())
+
+
+class TestProbabilisticScheduler(unittest.TestCase):
+    def setUp(self):
+        self.users = make_users()
+        self.rules = make_rules(loop_pool=["I", "E", "F", "D", "G", "H"])
+        self.start_date = START_DATE
+        self.end_date = datetime.date(2026, 6, 28)
+
+    def _scheduler(self, seed=7, **kwargs):
+        return ProbabilisticScheduler(self.users, self.start_date, rules=self.rules, seed=seed, **kwargs)
+
+    def _by_date(self, schedules):
+        result = defaultdict(list)
+        for s in schedules:
+            result[s.date].append(s.user.code)
+        return result
+
+    def test_seed_reproducible(self):
+        first = self._by_date(self._scheduler().generate_range(self.start_date, self.end_date))
+        second = self._by_date(self._scheduler().generate_range(self.start_date, self.end_date))
+        self.assertEqual(first, second)
+
+    def test_rules_blackout_and_sunday(self):
+        blackout = self.start_date + datetime.timedelta(days=5)
+        self.users[4].preferences = {"blackout_dates": [blackout.strftime("%Y-%m-%d")]} # E
+        by_date = self._by_date(self._scheduler().generate_range(self.start_date, self.end_date))
+        self.assertNotIn("E", by_date[blackout])
+        for d, codes in by_date.items():
+            self.assertEqual(len(codes), 2)
+            self.assertEqual(len(set(codes)), 2)
+            if d.weekday() == 0:
+                self.assertIn("A", codes)
+            if d.weekday() == 6:
+                self.assertEqual(sorted(codes), sorted(by_date[d - datetime.timedelta(days=1)]))
+
+    def test_history_deficit_evens_out(self):
+        history = {"I": 40, "E": 0, "F": 0, "D": 0, "G": 0, "H": 0}
+        scheduler = self._scheduler(history_counts=history)
+        by_date = self._by_date(scheduler.generate_range(self.start_date, self.start_date + datetime.timedelta(weeks=8)))
+        self.assertFalse(any("I" in codes for codes in by_date.values()))
+
+    def test_sample_plans(self):
+        scheduler = self._scheduler()
+        locked_date = self.start_date + datetime.timedelta(days=5)
+        locked = [s for s in scheduler.generate_range(locked_date, locked_date) if s.date == locked_date][:1]
+
+        plans = scheduler.sample_plans(self.start_date, self.end_date, 200, locked)
+        self.assertEqual(plans.shape, (200, 175, 2))
+        self.assertTrue((plans >= 0).all())
+        self.assertFalse((plans[:, :, 0] == plans[:, :, 1]).any())
+        np.testing.assert_array_equal(plans[:, 6::7], plans[:, 5::7])
+        locked_idx = scheduler.users.index(locked[0].user)
+        self.assertTrue((plans[:, 5] == locked_idx).any(axis=1).all())
+        # Monday fixed user in every plan
+        self.assertTrue((plans[:, 0::7, 0] == 0).all())
+
+        best = scheduler.best_plan(self.start_date, self.end_date, 50)
+        self.assertEqual(len(best), 175 * 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import unittest
+import os
+import re
+import inspect
+import tempfile
+import datetime
+import sqlite3
+from contextlib import contextmanager
+from sqlalchemy import event
+from src.db_manager import DBManager
+from src.models import Schedule
+from src.schedule_delta import ScheduleDelta
+
+# Methods that read or rewrite the whole schedules table by design
+FULL_SCAN_ALLOWED = {"get_all_schedules", "reset_users", "rebuild_duty_stats"}
+
+FULL_SCAN = re.compile(r"^SCAN (schedules|user_duty_stats)\b(?!.*USING (COVERING )?INDEX)")
+
+
+@contextmanager
+def capture_statements(engine):
+    """Collect (sql, params) for every statement run on the engine inside the block."""
+    captured = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if executemany:
+            parameters = parameters[0] if parameters else ()
+        captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield captured
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def full_table_scans(db_path, statements):
+    """Run EXPLAIN QUERY PLAN on each statement; return (sql, plan line) for full scans of schedules."""
+    scans = []
+    conn = sqlite3.connect(db_path)
+    try:
+        for sql, params in statements:
+            if not sql.lstrip().upper().startswith(("SELECT", "INSERT", "UPDATE", "DELETE")):
+                continue
+            for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params or ()):
+                if FULL_SCAN.search(row[3]):
+                    scans.append((sql, row[3]))
+    finally:
+        conn.close()
+    return scans
+
+
+class TestQueryPlans(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "schedule.db")
+        self.db = DBManager(self.db_path)
+        self.db.init_default_users()
+        self.users = self.db.get_all_users()
+
+        start = datetime.date(2026, 1, 1)
+        self.db.save_schedules([
+            Schedule(date=start + datetime.timedelta(days=i // 2), user_id=self.users[i % len(self.users)].id,
+                     is_locked=(i % 7 == 0))
+            for i in range(2000)
+        ])
+
+    def tearDown(self):
+        self.db.engine.dispose()
+        self.tmp.cleanup()
+
+    def _calls(self):
+        a = datetime.date(2026, 3, 1)
+        b = datetime.date(2026, 3, 31)
+        uid = self.users[0].id
+        return {
+            "init_db": lambda: self.db.init_db(),
+            "init_default_users": lambda: self.db.init_default_users(),
+            "add_user": lambda: self.db.add_user("ZZ"),
+            "update_user": lambda: self.db.update_user(uid, name="A1"),
+            "clear_all_preferences": lambda: self.db.clear_all_preferences(),
+            "get_all_users": lambda: self.db.get_all_users(),
+            "get_schedules_by_range": lambda: self.db.get_schedules_by_range(a, b),
+            "get_locked_schedules": lambda: self.db.get_locked_schedules(a, b),
+            "get_all_schedules": lambda: self.db.get_all_schedules(),
+            "get_schedule_records": lambda: self.db.get_schedule_records(a, b),
+            "get_schedule_array": lambda: self.db.get_schedule_array(a, b),
+            "add_schedule": lambda: self.db.add_schedule(a, uid, is_locked=True),
+            "delete_schedule": lambda: self.db.delete_schedule(a, uid),
+            "delete_day_schedule": lambda: self.db.delete_day_schedule(a),
+            "save_schedules": lambda: self.db.save_schedules([Schedule(date=a, user_id=uid, is_locked=False)]),
+            "clear_range_schedules": lambda: self.db.clear_range_schedules(a, b),
+            "replace_schedules": lambda: self.db.replace_schedules([Schedule(date=b, user_id=uid, is_locked=False)]),
+            "apply_schedule_delta": lambda: self.db.apply_schedule_delta(
+                ScheduleDelta([(b, self.users[1].id, False)], [(b, uid)], [])),
+            "get_history_counts": lambda: self.db.get_history_counts(),
+            "get_weekend_history_counts": lambda: self.db.get_weekend_history_counts(),
+            "get_last_duty_dates": lambda: self.db.get_last_duty_dates(),
+            "get_yearly_duty_counts": lambda: self.db.get_yearly_duty_counts(2026),
+            "get_monthly_counts": lambda: self.db.get_monthly_counts(2026, 3),
+            "get_annual_counts": lambda: self.db.get_annual_counts(2026),
+            "get_weekend_counts": lambda: self.db.get_weekend_counts(2026),
+            "rebuild_duty_stats": lambda: self.db.rebuild_duty_stats(),
+            "changed_months_since": lambda: self.db.changed_months_since(0),
+            "get_users_on_duty_between": lambda: self.db.get_users_on_duty_between(a, b),
+            "delete_user": lambda: self.db.delete_user(self.users[-1].id),
+            "reset_users": lambda: self.db.reset_users(4),
+        }
+
+    def test_every_query_uses_an_index(self):
+        calls = self._calls()
+
+        public = {name for name, _ in inspect.getmembers(DBManager, inspect.isfunction)
+                  if not name.startswith("_")}
+        # Session helpers and connection settings run no queries of their own
+        public -= {"get_session", "session_scope", "write_batch", "load_profile", "save_profile", "set_profile"}
+        self.assertEqual(public - set(calls), set(), "New DBManager methods need a query plan check")
+
+        for name, call in calls.items():
+            with capture_statements(self.db.engine) as statements:
+                call()
+            if name in FULL_SCAN_ALLOWED:
+                continue
+            with self.subTest(method=name):
+                self.assertEqual(full_table_scans(self.db_path, statements), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+import os
+import tempfile
+import datetime
+import sqlite3
+from src.db_manager import DBManager
+from src.models import Schedule
+from src.statistics_manager import StatisticsManager
+
+
+class TestScheduleCalendarColumns(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "schedule.db")
+        self.db = DBManager(self.db_path)
+        self.db.init_default_users()
+        self.users = self.db.get_all_users()
+        # Spans ISO year boundaries (2020-12-28 is ISO 2020-W53, 2021-01-03 too)
+        start = datetime.date(2020, 12, 20)
+        self.db.save_schedules([
+            Schedule(date=start + datetime.timedelta(days=i // 2), user_id=self.users[i % len(self.users)].id,
+                     is_locked=False)
+            for i in range(1600)
+        ])
+
+    def tearDown(self):
+        self.db.engine.dispose()
+        self.tmp.cleanup()
+
+    def _check_columns(self, schedules):
+        for s in schedules:
+            iso_year, iso_week, _ = s.date.isocalendar()
+            self.assertEqual((s.weekday, s.year, s.month, s.iso_year, s.iso_week),
+                             (s.date.weekday(), s.date.year, s.date.month, iso_year, iso_week))
+
+    def test_columns_match_python_calendar(self):
+        self._check_columns(self.db.get_all_schedules())
+
+    def test_db_statistics_match_in_memory(self):
+        schedules = self.db.get_all_schedules()
+        in_memory = StatisticsManager(schedules, self.users)
+        from_db = StatisticsManager(schedules, self.users, self.db)
+        for year, month in ((2020, 12), (2021, 2), (2022, 1)):
+            self.assertEqual(from_db.get_monthly_stats(year, month), in_memory.get_monthly_stats(year, month))
+            self.assertEqual(from_db.get_weekend_stats(year, month), in_memory.get_weekend_stats(year, month))
+        for year in (2020, 2021, 2022):
+            self.assertEqual(from_db.get_annual_stats(year), in_memory.get_annual_stats(year))
+            self.assertEqual(from_db.get_weekend_stats(year), in_memory.get_weekend_stats(year))
+
+    def test_existing_database_gets_columns(self):
+        self.db.engine.dispose()
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE legacy AS SELECT id, date, user_id, is_locked FROM schedules")
+        conn.execute("DROP TABLE schedules")
+        conn.execute("CREATE TABLE schedules (id INTEGER PRIMARY KEY, date DATE NOT NULL, "
+                     "user_id INTEGER NOT NULL REFERENCES users(id), is_locked BOOLEAN)")
+        conn.execute("INSERT INTO schedules SELECT * FROM legacy")
+        conn.execute("DROP TABLE legacy")
+        conn.commit()
+        conn.close()
+
+        db = DBManager(self.db_path)
+        try:
+            schedules = db.get_all_schedules()
+            self.assertEqual(len(schedules), 1600)
+            self._check_columns(schedules)
+        finally:
+            db.engine.dispose()
+
+
+if __name__ == '__main__':
+    unittest.main()
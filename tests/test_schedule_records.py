@@ -0,0 +1,60 @@
+import unittest
+import os
+import tempfile
+import datetime
+import numpy as np
+from src.db_manager import DBManager
+from src.models import Schedule
+from src.schedule_records import SCHEDULE_DTYPE
+
+
+class TestScheduleRecords(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DBManager(os.path.join(self.tmp.name, "schedule.db"))
+        self.db.init_default_users()
+        self.users = self.db.get_all_users()
+        start = datetime.date(2025, 12, 29)
+        self.db.save_schedules([
+            Schedule(date=start + datetime.timedelta(days=i // 2), user_id=self.users[i % len(self.users)].id,
+                     is_locked=(i % 5 == 0))
+            for i in range(200)
+        ])
+
+    def tearDown(self):
+        self.db.engine.dispose()
+        self.tmp.cleanup()
+
+    def _orm_rows(self, start, end):
+        return sorted((s.id, s.date, s.user_id, s.is_locked, s.user.code)
+                      for s in self.db.get_schedules_by_range(start, end))
+
+    def test_records_match_orm(self):
+        start, end = datetime.date(2026, 1, 10), datetime.date(2026, 2, 20)
+        user_map = {u.id: u for u in self.users}
+        records = self.db.get_schedule_records(start, end, user_map)
+        self.assertEqual(sorted((r.id, r.date, r.user_id, r.is_locked, r.user.code) for r in records),
+                         self._orm_rows(start, end))
+        self.assertIs(records[0].user, user_map[records[0].user_id])
+        self.assertEqual([(r.date, r.user_id) for r in records], sorted((r.date, r.user_id) for r in records))
+
+        # Without a user cache the users are loaded once
+        self.assertEqual(len(self.db.get_schedule_records()), 200)
+        with self.assertRaises(AttributeError):
+            records[0].extra = 1
+
+    def test_array_matches_orm(self):
+        start, end = datetime.date(2026, 1, 10), datetime.date(2026, 2, 20)
+        arr = self.db.get_schedule_array(start, end)
+        self.assertEqual(arr.dtype, SCHEDULE_DTYPE)
+        got = sorted((int(r["id"]), r["date"].astype(object), int(r["user_id"]), bool(r["is_locked"])) for r in arr)
+        self.assertEqual(got, [row[:4] for row in self._orm_rows(start, end)])
+        self.assertTrue(np.all(np.diff(arr["date"].astype(np.int64)) >= 0))
+
+        empty = self.db.get_schedule_array(datetime.date(2030, 1, 1), datetime.date(2030, 1, 31))
+        self.assertEqual(empty.shape, (0,))
+        self.assertEqual(empty.dtype, SCHEDULE_DTYPE)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+import os
+import tempfile
+import datetime
+from unittest import mock
+from src.db_manager import DBManager
+from src.models import Schedule
+from src.schedule_window import ScheduleWindow, months_between
+
+
+class TestScheduleWindow(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DBManager(os.path.join(self.tmp.name, "schedule.db"))
+        self.db.init_default_users()
+        self.users = self.db.get_all_users()
+        start = datetime.date(2024, 1, 1)
+        self.db.save_schedules([
+            Schedule(date=start + datetime.timedelta(days=i // 2), user_id=self.users[i % len(self.users)].id,
+                     is_locked=False)
+            for i in range(2 * 366 * 3)
+        ])
+        self.window = ScheduleWindow(self.db, self.users, max_months=6)
+        self.loads = mock.patch.object(self.db, "get_schedule_records", wraps=self.db.get_schedule_records)
+        self.loader = self.loads.start()
+
+    def tearDown(self):
+        self.loads.stop()
+        self.db.engine.dispose()
+        self.tmp.cleanup()
+
+    def test_range_matches_database(self):
+        start, end = datetime.date(2025, 1, 27), datetime.date(2025, 3, 9)
+        got = sorted((s.date, s.user_id) for s in self.window.get_range(start, end))
+        # Three consecutive months, one query
+        self.assertEqual(self.loader.call_count, 1)
+        expected = sorted((s.date, s.user_id) for s in self.db.get_schedules_by_range(start, end))
+        self.assertEqual(got, expected)
+
+        users_by_id = {u.id: u for u in self.users}
+        for s in self.window.get_month(2025, 2):
+            self.assertIs(s.user, users_by_id[s.user_id])
+
+    def test_navigation_hits_cache_and_lru_is_bounded(self):
+        self.window.get_range(datetime.date(2025, 5, 26), datetime.date(2025, 7, 6))
+        self.window.prefetch(datetime.date(2025, 5, 26), datetime.date(2025, 7, 6))
+        calls = self.loader.call_count
+        # Back one month and forward again: already prefetched
+        self.window.get_range(datetime.date(2025, 4, 28), datetime.date(2025, 6, 8))
+        self.window.get_range(datetime.date(2025, 6, 30), datetime.date(2025, 8, 10))
+        self.assertEqual(self.loader.call_count, calls)
+
+        self.window.get_year(2024)
+        self.assertEqual(len(self.window.cached_months()), 12)  # a single request is never split
+        self.window.get_month(2026, 1)
+        self.assertLessEqual(len(self.window.cached_months()), 12)
+        self.window.get_month(2026, 2)
+        self.assertLessEqual(len(self.window.cached_months()), 6)
+
+    def test_invalidate(self):
+        d = datetime.date(2025, 3, 10)
+        self.window.get_month(2025, 3)
+        self.db.add_schedule(d, self.users[0].id)
+        self.assertEqual(len([s for s in self.window.get_month(2025, 3) if s.date == d]), 2)
+        self.window.invalidate([d])
+        self.assertEqual(len([s for s in self.window.get_month(2025, 3) if s.date == d]), 3)
+
+    def test_apply_write_deltas(self):
+        d = datetime.date(2025, 3, 10)
+        a, b = self.users[0].id, self.users[-1].id
+        self.window.get_year(2025)
+        calls = self.loader.call_count
+
+        delta = self.db.delete_day_schedule(d)
+        delta.merge(self.db.add_schedule(d, b, is_locked=True))
+        delta.merge(self.db.save_schedules([Schedule(date=d + datetime.timedelta(days=1), user_id=b, is_locked=True)]))
+        delta.merge(self.db.clear_range_schedules(datetime.date(2025, 6, 2), datetime.date(2025, 6, 8)))
+        delta.merge(self.db.delete_schedule(datetime.date(2030, 1, 1), a))  # not cached, no-op
+        self.assertEqual(self.window.apply_delta(delta)[0], d)
+
+        got = sorted((s.date, s.user_id, s.is_locked) for s in self.window.get_year(2025))
+        # Edits were applied in memory, not reloaded
+        self.assertEqual(self.loader.call_count, calls)
+        expected = sorted((s.date, s.user_id, s.is_locked) for s in self.db.get_schedules_by_range(
+            datetime.date(2025, 1, 1), datetime.date(2025, 12, 31)))
+        self.assertEqual(got, expected)
+        self.assertIs([s for s in self.window.get_range(d, d)][0].user, self.users[-1])
+
+    def test_months_between(self):
+        self.assertEqual(months_between(datetime.date(2024, 11, 30), datetime.date(2025, 2, 1)),
+                         [(2024, 11), (2024, 12), (2025, 1), (2025, 2)])
+
+
+if __name__ == '__main__':
+    unittest.main()
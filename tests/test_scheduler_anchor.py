@@ -0,0 +1,53 @@
+import unittest
+import datetime
+from src.scheduler import Scheduler
+from scheduling_fixtures import START_DATE, make_users, make_rules
+
+ANCHOR_DATE = datetime.date(2026, 1, 7)
+
+
+class TestSchedulerAnchor(unittest.TestCase):
+    def setUp(self):
+        self.users = make_users()
+        # Wednesday anchor and a second loop day so the walk crosses partial weeks
+        self.rules = make_rules(
+            days={
+                "0": {"type": "fixed", "users": ["A"]},
+                "1": {"type": "fixed", "users": ["C"]},
+                "2": {"type": "fixed", "users": ["B", "C"]},
+                "3": {"type": "loop", "users": []},
+                "4": {"type": "rotation", "users": ["A", "B"]},
+                "5": {"type": "loop", "users": []},
+                "6": {"type": "follow_saturday", "users": []}
+            },
+            loop_start_date=ANCHOR_DATE.strftime("%Y-%m-%d"))
+
+    def _walk_anchor(self, scheduler, target_date):
+        """Reference implementation: walk day by day from the anchor."""
+        step = 1 if target_date >= ANCHOR_DATE else -1
+        lo, hi = min(ANCHOR_DATE, target_date), max(ANCHOR_DATE, target_date)
+        delta = 0
+        curr = lo
+        while curr < hi:
+            delta += scheduler._get_consumed_slots_for_day(curr)
+            curr += datetime.timedelta(days=1)
+        return (step * delta) % 5
+
+    def test_closed_form_matches_day_walk(self):
+        scheduler = Scheduler(self.users, START_DATE, rules=self.rules)
+        for offset in list(range(-30, 30)) + [-3653, -400, 401, 3652]:
+            target = ANCHOR_DATE + datetime.timedelta(days=offset)
+            self.assertEqual(
+                scheduler._calculate_anchor_loop_index(target),
+                self._walk_anchor(scheduler, target),
+                f"Anchor mismatch for {target}"
+            )
+
+    def test_weekday_consumption(self):
+        scheduler = Scheduler(self.users, START_DATE, rules=self.rules)
+        self.assertEqual(scheduler._weekday_consumption, (1, 1, 0, 2, 1, 2, 0))
+        self.assertEqual(scheduler._weekly_consumption, 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
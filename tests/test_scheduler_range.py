@@ -0,0 +1,106 @@
+import unittest
+import datetime
+from src.scheduler import Scheduler, VectorizedScheduler
+from scheduling_fixtures import START_DATE, make_users, make_rules, make_lock
+
+
+class TestSchedulerRange(unittest.TestCase):
+    def setUp(self):
+        self.users = make_users()
+        self.rules = make_rules()
+        self.start_date = START_DATE
+
+        # A few locked slots, including one that collides with the loop pool
+        self.existing = [make_lock(self.users, self.start_date + datetime.timedelta(days=offset), code)
+                         for offset, code in [(3, "D"), (12, "I"), (40, "E"), (41, "F")]]
+
+    def _weekly(self, rules, weeks):
+        result = []
+        loop_index = 0
+        for w in range(weeks):
+            monday = self.start_date + datetime.timedelta(weeks=w)
+            scheduler = Scheduler(self.users, monday, loop_index=loop_index, rules=rules)
+            result.extend(scheduler.generate_schedule(self.existing))
+            loop_index = scheduler.new_loop_index
+        return result, loop_index
+
+    def _assert_range_matches_weekly(self, rules, weeks=20):
+        expected, expected_index = self._weekly(rules, weeks)
+
+        scheduler = Scheduler(self.users, self.start_date, loop_index=0, rules=rules)
+        end = self.start_date + datetime.timedelta(weeks=weeks, days=-1)
+        actual = scheduler.generate_range(self.start_date, end, self.existing)
+
+        self.assertEqual(
+            [(s.date, s.user_id, s.is_locked) for s in expected],
+            [(s.date, s.user_id, s.is_locked) for s in actual]
+        )
+        self.assertEqual(scheduler.new_loop_index, expected_index)
+
+    def test_range_matches_weekly_with_anchor(self):
+        self._assert_range_matches_weekly(self.rules)
+
+    def test_range_matches_weekly_without_anchor(self):
+        rules = dict(self.rules)
+        del rules["loop_start_date"]
+        self._assert_range_matches_weekly(rules)
+
+    def test_range_covers_whole_weeks(self):
+        scheduler = Scheduler(self.users, self.start_date, rules=self.rules)
+        # Wednesday to the following Tuesday touches two weeks
+        schedules = scheduler.generate_range(datetime.date(2026, 1, 7), datetime.date(2026, 1, 13))
+        dates = sorted({s.date for s in schedules})
+        self.assertEqual(dates[0], datetime.date(2026, 1, 5))
+        self.assertEqual(dates[-1], datetime.date(2026, 1, 18))
+
+    def test_long_horizon_fills_each_state_once(self):
+        scheduler = Scheduler(self.users, self.start_date, rules=self.rules)
+        fill_calls = []
+        original_fill = scheduler._fill_week
+
+        def counting_fill(*args):
+            fill_calls.append(args[0])
+            return original_fill(*args)
+
+        scheduler._fill_week = counting_fill
+        end = self.start_date + datetime.timedelta(weeks=520, days=-1)
+        schedules = scheduler.generate_range(self.start_date, end, self.existing)
+
+        locked_weeks = {s.date - datetime.timedelta(days=s.date.weekday()) for s in self.existing}
+        # One fill per (cursor position, rotation parity) state, plus the locked weeks
+        states = 2 * len(self.rules["loop_pool"])
+        self.assertLessEqual(len(fill_calls), states + len(locked_weeks))
+        self.assertEqual(len(schedules), 520 * 7 * 2)
+
+        # Tiled weeks match a freshly generated week
+        monday = self.start_date + datetime.timedelta(weeks=333)
+        fresh = Scheduler(self.users, monday, rules=self.rules).generate_schedule()
+        tiled = [s for s in schedules if monday <= s.date < monday + datetime.timedelta(days=7)]
+        self.assertEqual([(s.date, s.user_id) for s in fresh], [(s.date, s.user_id) for s in tiled])
+
+    def test_vectorized_matches_range(self):
+        end = self.start_date + datetime.timedelta(weeks=60, days=-1)
+        expected = Scheduler(self.users, self.start_date, rules=self.rules).generate_range(
+            self.start_date, end, self.existing)
+
+        scheduler = VectorizedScheduler(self.users, self.start_date, rules=self.rules)
+        actual = scheduler.generate_range(self.start_date, end, self.existing)
+        self.assertEqual(
+            [(s.date, s.user_id, s.is_locked) for s in expected],
+            [(s.date, s.user_id, s.is_locked) for s in actual]
+        )
+
+    def test_vectorized_matrix_shape(self):
+        scheduler = VectorizedScheduler(self.users, self.start_date, rules=self.rules)
+        matrix = scheduler.generate_matrix(self.start_date, self.start_date + datetime.timedelta(days=20))
+        self.assertEqual(matrix.shape, (21, 2))
+        self.assertEqual(matrix.dtype.name, "int32")
+        # Monday: fixed A plus one loop user
+        self.assertEqual(self.users[matrix[0, 0]].code, "A")
+        self.assertEqual(self.users[matrix[0, 1]].code, "I")
+        # Sunday copies Saturday
+        self.assertEqual(matrix[6].tolist(), matrix[5].tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
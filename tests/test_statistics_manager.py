@@ -0,0 +1,143 @@
+import unittest
+import os
+import random
+import tempfile
+import datetime
+from collections import Counter
+from unittest import mock
+from src.db_manager import DBManager
+from src.models import Schedule
+from src.statistics_manager import StatisticsManager
+from src.duty_cube import DutyCube
+
+
+class TestStatisticsCube(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DBManager(os.path.join(self.tmp.name, "schedule.db"))
+        self.db.init_default_users()
+        self.users = self.db.get_all_users()
+        rng = random.Random(7)
+        start = datetime.date(2025, 11, 1)
+        rows = {}
+        for day in range(500):
+            d = start + datetime.timedelta(days=day)
+            for user in rng.sample(self.users, 2):
+                rows[(d, user.id)] = Schedule(date=d, user_id=user.id, is_locked=False)
+        self.db.save_schedules(list(rows.values()))
+        user_map = {u.id: u for u in self.users}
+        self.schedules = self.db.get_schedule_records(None, None, user_map)
+
+    def tearDown(self):
+        self.db.engine.dispose()
+        self.tmp.cleanup()
+
+    def _brute(self, predicate):
+        counts = Counter(s.user.code for s in self.schedules if predicate(s.date))
+        return {u.code: counts.get(u.code, 0) for u in self.users}
+
+    def test_counts_match_brute_force(self):
+        manager = StatisticsManager(self.schedules, self.users)
+        for year, month in [(2025, 11), (2026, 2), (2026, 12), (2027, 3), (2024, 5)]:
+            with self.subTest(year=year, month=month):
+                self.assertEqual(manager.get_monthly_stats(year, month),
+                                 self._brute(lambda d: (d.year, d.month) == (year, month)))
+                self.assertEqual(manager.get_weekend_stats(year, month),
+                                 self._brute(lambda d: (d.year, d.month) == (year, month) and d.weekday() >= 5))
+        for year in (2025, 2026, 2027):
+            with self.subTest(year=year):
+                self.assertEqual(manager.get_annual_stats(year), self._brute(lambda d: d.year == year))
+                self.assertEqual(manager.get_weekend_stats(year),
+                                 self._brute(lambda d: d.year == year and d.weekday() >= 5))
+
+        a, b = datetime.date(2026, 1, 20), datetime.date(2026, 4, 2)
+        self.assertEqual(manager.get_range_stats(a, b), self._brute(lambda d: a <= d <= b))
+        # Built once and shared by every query
+        self.assertIs(manager.cube, manager.cube)
+
+    def test_period_uses_cube_and_database_outside_it(self):
+        year_schedules = [s for s in self.schedules if s.date.year == 2026]
+        manager = StatisticsManager(year_schedules, self.users, self.db,
+                                    period=(datetime.date(2026, 1, 1), datetime.date(2026, 12, 31)))
+        self.assertEqual(manager.get_annual_stats(2026), self._with_db_codes(self.db.get_annual_counts(2026)))
+        self.assertEqual(manager.cube.cube.shape, (len(self.users), 365))
+        # 2025 is not in the loaded period, so the database answers
+        self.assertEqual(manager.get_monthly_stats(2025, 12),
+                         self._brute(lambda d: (d.year, d.month) == (2025, 12)))
+
+    def _with_db_codes(self, counts):
+        return {u.code: counts.get(u.code, 0) for u in self.users}
+
+    def _brute_trend(self, start, end):
+        days = (end - start).days + 1
+        trend = {u.code: [0] * days for u in self.users}
+        running = Counter()
+        by_date = Counter((s.date, s.user.code) for s in self.schedules)
+        for i in range(days):
+            d = start + datetime.timedelta(days=i)
+            for u in self.users:
+                running[u.code] += by_date.get((d, u.code), 0)
+                trend[u.code][i] = running[u.code]
+        return trend
+
+    def test_trend_matches_daily_loop(self):
+        manager = StatisticsManager(self.schedules, self.users)
+        # Starts before the first schedule: the cube is rebuilt to cover the range
+        start, end = datetime.date(2025, 10, 20), datetime.date(2026, 3, 31)
+        trend, dates = manager.get_long_term_trend(start, end)
+        expected = self._brute_trend(start, end)
+        self.assertEqual(len(dates), (end - start).days + 1)
+        for code, counts in expected.items():
+            self.assertEqual(trend[code].tolist(), counts)
+
+        weekly, week_dates = manager.get_long_term_trend(start, end, resolution="week")
+        self.assertTrue(all(d.weekday() == 6 for d in week_dates[:-1]))
+        self.assertEqual(week_dates[-1], end)
+        for code, counts in expected.items():
+            self.assertEqual(weekly[code].tolist(), [counts[(d - start).days] for d in week_dates])
+
+    def test_multi_year_trend_from_database(self):
+        year_schedules = [s for s in self.schedules if s.date.year == 2026]
+        manager = StatisticsManager(year_schedules, self.users, self.db,
+                                    period=(datetime.date(2026, 1, 1), datetime.date(2026, 12, 31)))
+        start, end = datetime.date(2025, 1, 1), datetime.date(2027, 3, 31)
+        trend, dates = manager.get_long_term_trend(start, end, resolution="auto")
+        self.assertEqual(StatisticsManager.auto_resolution(start, end), "month")
+        self.assertEqual(len(dates), 27)
+        self.assertEqual(dates[1], datetime.date(2025, 2, 28))
+        expected = self._brute_trend(start, end)
+        for code, counts in expected.items():
+            self.assertEqual(trend[code].tolist(), [counts[(d - start).days] for d in dates])
+
+    def test_sql_backend_caches_by_data_version(self):
+        manager = StatisticsManager(None, self.users, self.db, backend="sql")
+        expected = self._brute(lambda d: (d.year, d.month) == (2026, 2))
+        with mock.patch.object(self.db, "get_monthly_counts", wraps=self.db.get_monthly_counts) as query:
+            self.assertEqual(manager.get_monthly_stats(2026, 2), expected)
+            manager.get_monthly_variance(2026, 2)
+            self.assertEqual(query.call_count, 1)
+
+            d = datetime.date(2026, 2, 3)
+            missing = next(u for u in self.users if u.code not in {s.user.code for s in self.schedules if s.date == d})
+            version = self.db.data_version
+            self.db.add_schedule(d, missing.id)
+            self.assertGreater(self.db.data_version, version)
+            self.assertEqual(manager.get_monthly_stats(2026, 2)[missing.code], expected[missing.code] + 1)
+            self.assertEqual(query.call_count, 2)
+
+        # Empty writes leave the version alone
+        version = self.db.data_version
+        self.db.add_schedule(d, missing.id)
+        self.assertEqual(self.db.data_version, version)
+
+        self.assertEqual(manager.get_weekend_stats(2026),
+                         self._brute(lambda d: d.year == 2026 and d.weekday() >= 5))
+
+    def test_empty_cube(self):
+        cube = DutyCube.from_schedules([], ["A", "B"])
+        self.assertEqual(cube.to_dict(cube.counts(datetime.date(2026, 1, 1), datetime.date(2026, 12, 31))),
+                         {"A": 0, "B": 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+import os
+import tempfile
+import datetime
+from src.db_manager import DBManager
+from src.stats_cache import StatsCache
+
+
+class TestStatsCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DBManager(os.path.join(self.tmp.name, "schedule.db"))
+        self.db.init_default_users()
+        self.users = self.db.get_all_users()
+        self.cache = StatsCache(self.db)
+        self.computed = []
+
+    def tearDown(self):
+        self.db.engine.dispose()
+        self.tmp.cleanup()
+
+    def _get(self, query, year, month, **kwargs):
+        def compute():
+            self.computed.append((query, year, month))
+            return len(self.computed)
+        return self.cache.get(query, year, month, compute, **kwargs)
+
+    def _fill(self):
+        self._get("monthly", 2026, 3)
+        self._get("monthly", 2026, 4)
+        self._get("annual", 2026, None)
+        self._get("annual", 2025, None)
+        self._get("trend", 2026, 1, start=datetime.date(2024, 1, 1), end=datetime.date(2026, 1, 31))
+        self.computed.clear()
+
+    def test_hits_until_a_write(self):
+        first = self._get("monthly", 2026, 3)
+        self.assertEqual(self._get("monthly", 2026, 3), first)
+        self.assertEqual(len(self.computed), 1)
+
+    def test_write_drops_only_touched_months(self):
+        self._fill()
+        self.db.add_schedule(datetime.date(2026, 3, 10), self.users[0].id)
+        for args in [("monthly", 2026, 3), ("monthly", 2026, 4), ("annual", 2026, None),
+                     ("annual", 2025, None)]:
+            self._get(*args)
+        self._get("trend", 2026, 1, start=datetime.date(2024, 1, 1), end=datetime.date(2026, 1, 31))
+        self.assertEqual(self.computed, [("monthly", 2026, 3), ("annual", 2026, None)])
+
+        # A multi-month range depends on every month inside it
+        self.computed.clear()
+        self.db.delete_schedule(datetime.date(2025, 6, 1), self.users[0].id)  # nothing deleted
+        self.db.add_schedule(datetime.date(2025, 6, 1), self.users[1].id)
+        self._get("annual", 2025, None)
+        self._get("trend", 2026, 1, start=datetime.date(2024, 1, 1), end=datetime.date(2026, 1, 31))
+        self._get("monthly", 2026, 4)
+        self.assertEqual(self.computed, [("annual", 2025, None), ("trend", 2026, 1)])
+
+    def test_user_deletion_clears_everything(self):
+        self._fill()
+        self.db.delete_user(self.users[-1].id)
+        self.assertIsNone(self.db.changed_months_since(0))
+        self._get("monthly", 2026, 4)
+        self._get("annual", 2025, None)
+        self.assertEqual(len(self.computed), 2)
+
+    def test_batch_bumps_version_after_commit(self):
+        with self.db.write_batch():
+            self.db.add_schedule(datetime.date(2026, 3, 10), self.users[0].id)
+            # A read before the commit must not be cached as current
+            self._get("monthly", 2026, 3)
+            self.assertEqual(self.db.data_version, 0)
+        self.assertEqual(self.db.changed_months_since(0), {(2026, 3)})
+        self._get("monthly", 2026, 3)
+        self.assertEqual(len(self.computed), 2)
+
+    def test_failed_batch_keeps_version(self):
+        with self.assertRaises(RuntimeError):
+            with self.db.write_batch():
+                self.db.add_schedule(datetime.date(2026, 3, 10), self.users[0].id)
+                raise RuntimeError("abort")
+        self.assertEqual(self.db.data_version, 0)
+
+    def test_rename_clears_everything(self):
+        self._fill()
+        self.db.update_user(self.users[0].id, color="#000000")
+        self._get("monthly", 2026, 3)
+        self.assertEqual(self.computed, [])
+        self.db.update_user(self.users[0].id, code="Z")
+        self._get("monthly", 2026, 3)
+        self._get("annual", 2025, None)
+        self.assertEqual(len(self.computed), 2)
+
+    def test_month_versions_are_bounded(self):
+        self._get("monthly", 2000, 1)
+        version = self.db.data_version
+        day = datetime.date(2000, 1, 1)
+        for i in range(DBManager.MAX_TRACKED_MONTHS + 10):
+            self.db._bump_data_version([day + datetime.timedelta(days=31 * i)])
+        self.assertEqual(len(self.db.month_versions), DBManager.MAX_TRACKED_MONTHS)
+        # The evicted months are unknown to older caches: they must clear fully
+        self.assertIsNone(self.db.changed_months_since(version))
+        latest = self.db.data_version - 1
+        self.assertEqual(len(self.db.changed_months_since(latest)), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()